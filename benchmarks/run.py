@@ -0,0 +1,192 @@
+"""Microbenchmarks for the Socket.IO packet codec and client managers.
+
+Run ``python benchmarks/run.py --help`` for usage information.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+
+import socketio_v4  # noqa: E402
+from socketio_v4 import packet  # noqa: E402
+
+TEXT_PAYLOAD = ['my event', {
+    'id': 12345,
+    'user': 'someone@example.com',
+    'tags': ['foo', 'bar', 'baz'],
+    'values': list(range(20)),
+    'nested': {'a': 1, 'b': [True, False, None], 'c': 'text' * 8},
+}]
+BINARY_PAYLOAD = ['my event', {
+    'id': 12345,
+    'image': b'\x00' * 1024,
+    'chunks': [b'\x01' * 256, b'\x02' * 256],
+}]
+FANOUT_SIZES = [1000, 10000, 100000]
+ROOM_COUNTS = [1000, 10000, 100000]
+
+
+def measure(func, number, repeat=3):
+    """Return the best time per call of ``func`` in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - start) / number
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def bench_packet():
+    results = {}
+    for name, data in [('text', TEXT_PAYLOAD), ('binary', BINARY_PAYLOAD)]:
+        pkt = packet.Packet(packet.EVENT, data=data, namespace='/foo', id=7)
+        encoded = pkt.encode()
+        results['packet.encode.' + name] = measure(
+            lambda: packet.Packet(packet.EVENT, data=data, namespace='/foo',
+                                  id=7).encode(), 5000)
+
+        if isinstance(encoded, list):
+            def decode(encoded=encoded):
+                pkt = packet.Packet(encoded_packet=encoded[0])
+                for attachment in encoded[1:]:
+                    pkt.add_attachment(attachment)
+        else:
+            def decode(encoded=encoded):
+                packet.Packet(encoded_packet=encoded)
+        results['packet.decode.' + name] = measure(decode, 5000)
+    return results
+
+
+def _populate(manager, participants, namespace='/'):
+    for i in range(participants):
+        manager.connect('sid{}'.format(i), namespace)
+
+
+def bench_emit(sizes):
+    results = {}
+    server = socketio_v4.Server()
+    server.eio.send = lambda sid, data, binary=False: None
+    for size in sizes:
+        manager = socketio_v4.BaseManager()
+        manager.set_server(server)
+        server.manager = manager
+        _populate(manager, size)
+        results['manager.emit.{}'.format(size)] = measure(
+            lambda: manager.emit('my event', TEXT_PAYLOAD[1], '/'),
+            max(1, 100000 // size))
+    return results
+
+
+def bench_async_emit(sizes):
+    results = {}
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    server = socketio_v4.AsyncServer(async_mode='asgi')
+
+    async def send(sid, data, binary=False):
+        pass
+
+    server.eio.send = send
+    for size in sizes:
+        manager = socketio_v4.AsyncManager()
+        manager.set_server(server)
+        server.manager = manager
+        _populate(manager, size)
+        results['async_manager.emit.{}'.format(size)] = measure(
+            lambda: loop.run_until_complete(
+                manager.emit('my event', TEXT_PAYLOAD[1], '/')),
+            max(1, 100000 // size))
+    loop.close()
+    return results
+
+
+def bench_rooms(counts):
+    results = {}
+    for count in counts:
+        manager = socketio_v4.BaseManager()
+        manager.set_server(socketio_v4.Server())
+        for i in range(count):
+            manager.enter_room('sid{}'.format(i), '/', 'room{}'.format(i))
+        manager.connect('target', '/')
+
+        def enter_leave():
+            manager.enter_room('target', '/', 'extra')
+            manager.leave_room('target', '/', 'extra')
+
+        def connect_disconnect():
+            manager.connect('other', '/')
+            manager.enter_room('other', '/', 'room0')
+            manager.disconnect('other', '/')
+
+        results['manager.enter_leave_room.{}'.format(count)] = measure(
+            enter_leave, 10000)
+        results['manager.disconnect.{}'.format(count)] = measure(
+            connect_disconnect, 1000)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    print('{:<40} {:>12} {:>12} {:>8}'.format('benchmark', 'before',
+                                              'after', 'ratio'))
+    for name, value in sorted(results.items()):
+        before = previous.get(name)
+        if before is None:
+            continue
+        print('{:<40} {:>12.3e} {:>12.3e} {:>8.2f}'.format(
+            name, before, value, value / before))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run the Socket.IO microbenchmarks.')
+    parser.add_argument('--output', help='file where JSON results are saved')
+    parser.add_argument('--compare',
+                        help='JSON results of a previous run to compare to')
+    parser.add_argument('--quick', action='store_true',
+                        help='skip the largest sizes')
+    args = parser.parse_args()
+
+    sizes = FANOUT_SIZES[:-1] if args.quick else FANOUT_SIZES
+    counts = ROOM_COUNTS[:-1] if args.quick else ROOM_COUNTS
+    results = {}
+    results.update(bench_packet())
+    results.update(bench_emit(sizes))
+    results.update(bench_async_emit(sizes))
+    results.update(bench_rooms(counts))
+
+    for name, value in sorted(results.items()):
+        print('{:<40} {:>12.3e} s/op'.format(name, value))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)['results'])
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'revision': git_revision(),
+                       'python': platform.python_version(),
+                       'implementation': platform.python_implementation(),
+                       'timestamp': time.time(),
+                       'results': results}, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,13 @@ import sys
 
 from .client import Client
 from .base_manager import BaseManager
+from .serializer import JSONSerializer, OrjsonSerializer
 from .pubsub_manager import PubSubManager
 from .kombu_manager import KombuManager
 from .redis_manager import RedisManager
 from .kafka_manager import KafkaManager
 from .zmq_manager import ZmqManager
+from .local_manager import LocalManager
 from .server import Server
 from .namespace import Namespace, ClientNamespace
 from .middleware import WSGIApp, Middleware
@@ -18,6 +20,9 @@ if sys.version_info >= (3, 5):  # pragma: no cover
     from .asyncio_namespace import AsyncNamespace, AsyncClientNamespace
     from .asyncio_redis_manager import AsyncRedisManager
     from .asyncio_aiopika_manager import AsyncAioPikaManager
+    from .asyncio_kafka_manager import AsyncKafkaManager
+    from .asyncio_zmq_manager import AsyncZmqManager
+    from .asyncio_local_manager import AsyncLocalManager
     from .asgi import ASGIApp
 else:  # pragma: no cover
     AsyncClient = None
@@ -26,13 +31,18 @@ else:  # pragma: no cover
     AsyncNamespace = None
     AsyncRedisManager = None
     AsyncAioPikaManager = None
+    AsyncKafkaManager = None
+    AsyncZmqManager = None
+    AsyncLocalManager = None
 
 __version__ = '4.6.1'
 
 __all__ = ['__version__', 'Client', 'Server', 'BaseManager', 'PubSubManager',
            'KombuManager', 'RedisManager', 'ZmqManager', 'KafkaManager',
-           'Namespace', 'ClientNamespace', 'WSGIApp', 'Middleware']
+           'LocalManager', 'Namespace', 'ClientNamespace', 'WSGIApp',
+           'Middleware', 'JSONSerializer', 'OrjsonSerializer']
 if AsyncServer is not None:  # pragma: no cover
     __all__ += ['AsyncClient', 'AsyncServer', 'AsyncNamespace',
                 'AsyncClientNamespace', 'AsyncManager', 'AsyncRedisManager',
-                'ASGIApp', 'get_tornado_handler', 'AsyncAioPikaManager']
+                'ASGIApp', 'get_tornado_handler', 'AsyncAioPikaManager',
+                'AsyncKafkaManager', 'AsyncZmqManager', 'AsyncLocalManager']
@@ -47,6 +47,10 @@ class AsyncClient(client.Client):
                  packets. Custom json modules must have ``dumps`` and ``loads``
                  functions that are compatible with the standard library
                  versions.
+    :param serializer: An alternative serializer to use for encoding and
+                       decoding packet payloads, such as
+                       :class:`OrjsonSerializer`. When this is given, the
+                       ``json`` argument is only used by Engine.IO.
 
     The Engine.IO configuration supports the following settings:
 
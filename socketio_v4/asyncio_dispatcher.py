@@ -0,0 +1,91 @@
+import asyncio
+from collections import deque
+import time
+
+from . import dispatcher
+
+
+class AsyncDispatcher(dispatcher.Dispatcher):
+    """Run event handlers in a fixed number of worker tasks.
+
+    The events of each client are kept in a mailbox, and a mailbox is handled
+    by only one worker at a time, so the events of a client are handled in
+    the order in which they were received, while the events of different
+    clients are handled concurrently.
+
+    The arguments are the same as in :class:`Dispatcher`.
+    """
+    def __init__(self, server, workers, queue_size=1000, overflow='block',
+                 ordering='client'):
+        super().__init__(server, workers, queue_size=queue_size,
+                         overflow=overflow, ordering=ordering)
+        self.slots = None
+        self.tasks = []
+
+    async def dispatch(self, sid, namespace, handler, *args):
+        """Queue a handler invocation in the mailbox of a client."""
+        if self.ready is None:
+            # the queue and the semaphore must be created in the running
+            # loop
+            self.ready = asyncio.Queue()
+            self.slots = asyncio.Semaphore(self.queue_size)
+            self.tasks = [self.server.start_background_task(self._worker,
+                                                            self.ready)
+                          for _ in range(self.workers)]
+        if self.overflow != 'block' and self.slots.locked():
+            self.stats['dropped'] += 1
+            self.server.logger.warning('Event queue is full, dropping event '
+                                       'from %s', sid)
+            if self.overflow == 'disconnect':
+                await self.server.disconnect(sid, namespace=namespace)
+            return
+        await self.slots.acquire()
+        key = self._get_key(sid, namespace)
+        item = (time.time(), namespace, handler, args)
+        self.queued += 1
+        mailbox = self.mailboxes.get(key)
+        if mailbox is not None:
+            # the mailbox is already scheduled
+            mailbox.append(item)
+            return
+        mailbox = self.mailboxes[key] = deque([item])
+        self.ready.put_nowait((key, mailbox))
+
+    def discard(self, sid, namespace):
+        """Discard the events of a client in a namespace that are waiting to
+        be handled."""
+        mailbox = self.mailboxes.get(self._get_key(sid, namespace))
+        if not mailbox:
+            return
+        # the mailbox stays scheduled, its worker removes it when it finds it
+        # empty
+        remaining = [item for item in mailbox if item[1] != namespace]
+        discarded = len(mailbox) - len(remaining)
+        mailbox.clear()
+        mailbox.extend(remaining)
+        self.queued -= discarded
+        self.stats['discarded'] += discarded
+        for _ in range(discarded):
+            self.slots.release()
+
+    async def _worker(self, ready):
+        while True:
+            key, mailbox = await ready.get()
+            if not mailbox:
+                del self.mailboxes[key]
+                continue
+            queued, _, handler, args = mailbox.popleft()
+            self.queued -= 1
+            self.slots.release()
+            self.stats['wait'] = time.time() - queued
+            try:
+                await handler(*args)
+            except asyncio.CancelledError:  # pragma: no cover
+                break
+            except Exception:
+                self.server.logger.exception('event handler error')
+            self.stats['processed'] += 1
+            if not mailbox:
+                del self.mailboxes[key]
+                continue
+            ready.put_nowait((key, mailbox))
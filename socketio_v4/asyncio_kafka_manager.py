@@ -0,0 +1,136 @@
+import asyncio
+
+try:
+    import aiokafka
+except ImportError:
+    aiokafka = None
+
+from .asyncio_pubsub_manager import AsyncPubSubManager
+from .kafka_manager import _get_message_key
+
+
+class AsyncKafkaManager(AsyncPubSubManager):
+    """Kafka based client manager for asyncio servers.
+
+    This class implements a Kafka backend for event sharing across multiple
+    processes, using the `aiokafka <https://aiokafka.readthedocs.io/>`_
+    package.
+
+    To use a Kafka backend, initialize the :class:`AsyncServer` instance as
+    follows::
+
+        url = 'kafka://hostname:port'
+        server = socketio_v4.AsyncServer(
+            client_manager=socketio_v4.AsyncKafkaManager(url))
+
+    :param url: The connection URL for the Kafka server. For a default Kafka
+                store running on the same host, use ``kafka://``.
+    :param channel: The channel name (topic) on which the server sends and
+                    receives notifications. Must be the same in all the
+                    servers.
+    :param write_only: If set ot ``True``, only initialize to emit events. The
+                       default of ``False`` initializes the class for emitting
+                       and receiving.
+    :param codec: The codec used to encode the messages sent to the other
+                  servers. Can be ``'pickle'`` (the default), ``'json'`` or
+                  ``'msgpack'``. Must be the same in all the servers.
+    :param forward_encoded: If set to ``True``, events without a callback
+                            are encoded once by the server that emits them,
+                            and the receiving servers forward the encoded
+                            packets to their clients. Servers running older
+                            releases cannot handle these messages, so this
+                            option must only be enabled once all the servers
+                            have been upgraded. The default is ``False``.
+    :param max_pending: The maximum number of published messages that can be
+                        waiting for delivery. Publishing does not wait for each
+                        message to be delivered, it only waits for the
+                        outstanding deliveries when this limit is reached.
+    :param listen_batch_size: The maximum number of received messages that
+                              are processed in a single wake up of the
+                              listener.
+    :param producer_options: additional keyword arguments to be passed to
+                             ``AIOKafkaProducer()``, such as ``linger_ms``,
+                             ``max_batch_size`` or ``compression_type``.
+    :param consumer_options: additional keyword arguments to be passed to
+                             ``AIOKafkaConsumer()``. Every server must
+                             receive every message, so servers must not share
+                             a consumer group.
+    """
+    name = 'asynckafka'
+
+    def __init__(self, url='kafka://localhost:9092', channel='socketio_v4',
+                 write_only=False, logger=None, codec='pickle',
+                 max_pending=100, listen_batch_size=100,
+                 producer_options=None, consumer_options=None,
+                 forward_encoded=False):
+        if aiokafka is None:
+            raise RuntimeError('aiokafka package is not installed '
+                               '(Run "pip install aiokafka" in your '
+                               'virtualenv).')
+        super().__init__(channel=channel, write_only=write_only, logger=logger,
+                         codec=codec, forward_encoded=forward_encoded)
+        self.kafka_url = url[8:] if url != 'kafka://' else 'localhost:9092'
+        self.max_pending = max_pending
+        self.listen_batch_size = listen_batch_size
+        self.producer_options = producer_options or {}
+        self.consumer_options = consumer_options or {}
+        self.producer = None
+        self.consumer = None
+        self.pending_deliveries = []
+        self.delivery_errors = 0
+
+    async def flush(self):
+        """Wait until all the published messages are delivered.
+
+        Note: this method is a coroutine.
+        """
+        if self.producer is not None:
+            await self.producer.flush()
+        await self._wait_for_deliveries()
+
+    async def _wait_for_deliveries(self):
+        pending = self.pending_deliveries
+        self.pending_deliveries = []
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, Exception):
+                self.delivery_errors += 1
+                self._get_logger().error(
+                    'Cannot deliver message to kafka: %s', result)
+
+    async def _publish(self, data):
+        if self.producer is None:
+            producer = aiokafka.AIOKafkaProducer(
+                bootstrap_servers=self.kafka_url, **self.producer_options)
+            await producer.start()
+            self.producer = producer
+        # send() only adds the message to the producer's batches, the
+        # delivery is awaited later, together with other messages
+        self.pending_deliveries.append(await self.producer.send(
+            self.channel, value=self._encode_message(data),
+            key=_get_message_key(data)))
+        if len(self.pending_deliveries) >= self.max_pending:
+            await self._wait_for_deliveries()
+
+    async def _consumer(self):
+        if self.consumer is None:
+            consumer = aiokafka.AIOKafkaConsumer(
+                self.channel, bootstrap_servers=self.kafka_url,
+                **self.consumer_options)
+            await consumer.start()
+            self.consumer = consumer
+        return self.consumer
+
+    async def _listen(self):
+        consumer = await self._consumer()
+        return (await consumer.getone()).value
+
+    async def _listen_batch(self):
+        consumer = await self._consumer()
+        while True:
+            batches = await consumer.getmany(
+                timeout_ms=1000, max_records=self.listen_batch_size)
+            messages = [message.value for partition_messages
+                        in batches.values()
+                        for message in partition_messages]
+            if messages:
+                return messages
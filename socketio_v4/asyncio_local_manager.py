@@ -0,0 +1,146 @@
+import asyncio
+import os
+import socket
+
+from .asyncio_pubsub_manager import AsyncPubSubManager
+from .local_manager import _get_peers, _get_socket_dir, _is_stale_peer
+
+
+class AsyncLocalManager(AsyncPubSubManager):
+    """Client manager for multiple asyncio workers running on the same host.
+
+    This class shares events between the worker processes of a single host
+    without an external message queue. Each worker listens on a Unix domain
+    datagram socket created in a shared directory, and messages are sent
+    directly to the sockets of all the workers. To use the local backend,
+    initialize the :class:`AsyncServer` instance of each worker as follows::
+
+        server = socketio_v4.AsyncServer(
+            client_manager=socketio_v4.AsyncLocalManager())
+
+    See :class:`LocalManager` for the limitations of this backend.
+
+    :param path: The directory where the sockets of the workers are created.
+                 All the workers must use the same directory, which must be
+                 owned by the user that runs them and not writable by other
+                 users. The default is a directory named after the user and
+                 the channel in ``$XDG_RUNTIME_DIR``, or in the temporary
+                 directory of the system if that variable is not set.
+    :param channel: The channel name. It is used to name the default socket
+                    directory, so that multiple applications can run on the
+                    same host.
+    :param write_only: If set to ``True``, only initialize to emit events. The
+                       default of ``False`` initializes the class for emitting
+                       and receiving.
+    :param codec: The codec used to encode the messages sent to the other
+                  workers. Can be ``'pickle'`` (the default), ``'json'`` or
+                  ``'msgpack'``. Must be the same in all the workers.
+    :param forward_encoded: If set to ``True``, events without a callback
+                            are encoded once by the server that emits them,
+                            and the receiving servers forward the encoded
+                            packets to their clients. Servers running older
+                            releases cannot handle these messages, so this
+                            option must only be enabled once all the servers
+                            have been upgraded. The default is ``False``.
+    :param max_message_size: The size in bytes of the largest message that
+                             can be sent or received.
+    :param send_timeout: The time in seconds to wait for a worker that is not
+                         reading its messages before the message is dropped
+                         for that worker.
+    :param listen_batch_size: The maximum number of received messages that
+                              are processed in a single wake up of the
+                              listener.
+    """
+    name = 'asynclocal'
+
+    def __init__(self, path=None, channel='socketio_v4', write_only=False,
+                 logger=None, codec='pickle', max_message_size=1024 * 1024,
+                 send_timeout=5, listen_batch_size=100,
+                 forward_encoded=False):
+        if not hasattr(socket, 'AF_UNIX'):  # pragma: no cover
+            raise RuntimeError('Unix domain sockets are not supported on '
+                               'this platform.')
+        super().__init__(channel=channel, write_only=write_only, logger=logger,
+                         codec=codec, forward_encoded=forward_encoded)
+        self.socket_dir = _get_socket_dir(path, channel)
+        self.socket_path = os.path.join(self.socket_dir,
+                                        self.host_id + '.sock')
+        self.max_message_size = max_message_size
+        self.send_timeout = send_timeout
+        self.listen_batch_size = listen_batch_size
+        self.sender = None
+        self.receiver = None
+
+    def close(self):
+        """Stop receiving messages and remove the socket of this worker."""
+        if self.receiver is not None:
+            self.receiver.close()
+            self.receiver = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:  # pragma: no cover
+                pass
+        if self.sender is not None:
+            self.sender.close()
+            self.sender = None
+
+    async def _sendto(self, message, peer):
+        """Send a message to a worker socket, waiting while the socket of the
+        worker is full."""
+        deadline = asyncio.get_event_loop().time() + self.send_timeout
+        while True:
+            try:
+                return self.sender.sendto(message, peer)
+            except BlockingIOError:
+                if asyncio.get_event_loop().time() >= deadline:
+                    raise socket.timeout()
+                await asyncio.sleep(0.01)
+
+    async def _publish(self, data):
+        if self.sender is None:
+            self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.sender.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF,
+                                   self.max_message_size)
+            self.sender.setblocking(False)
+        message = self._encode_message(data)
+        for peer in _get_peers(self.socket_dir):
+            try:
+                await self._sendto(message, peer)
+            except socket.timeout:
+                self._get_logger().error(
+                    'Worker socket %s is not reading, message dropped', peer)
+            except OSError as exc:
+                if _is_stale_peer(exc):
+                    # the worker that owned this socket exited without
+                    # removing it
+                    try:
+                        os.unlink(peer)
+                    except OSError:  # pragma: no cover
+                        pass
+                else:
+                    self._get_logger().error(
+                        'Cannot send message to worker socket %s: %s', peer,
+                        exc)
+
+    def _bind(self):
+        self.receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                 self.max_message_size)
+        self.receiver.setblocking(False)
+        self.receiver.bind(self.socket_path)
+
+    async def _listen(self):
+        if self.receiver is None:
+            self._bind()
+        return await asyncio.get_event_loop().sock_recv(
+            self.receiver, self.max_message_size)
+
+    async def _listen_batch(self):
+        messages = [await self._listen()]
+        # collect the messages that are already waiting in the socket
+        while len(messages) < self.listen_batch_size:
+            try:
+                messages.append(self.receiver.recv(self.max_message_size))
+            except BlockingIOError:
+                break
+        return messages
@@ -20,16 +20,79 @@ class AsyncManager(BaseManager):
         tasks = []
         if not isinstance(skip_sid, list):
             skip_sid = [skip_sid]
-        for sid in self.get_participants(namespace, room):
-            if sid not in skip_sid:
-                if callback is not None:
+        if callback is not None:
+            # each recipient gets its own ack id, so the packet has to be
+            # encoded individually for every client
+            for sid in self.get_participants(namespace, room):
+                if sid not in skip_sid:
                     id = self._generate_ack_id(sid, namespace, callback)
-                else:
-                    id = None
-                tasks.append(self.server._emit_internal(sid, event, data,
-                                                        namespace, id))
+                    tasks.append(self.server._emit_internal(
+                        sid, event, data, namespace, id))
+        else:
+            # without callbacks the packet is the same for all recipients, so
+            # it is encoded only once
+            encoded_packet = None
+            for sid in self.get_participants(namespace, room):
+                if sid not in skip_sid:
+                    if encoded_packet is None:
+                        encoded_packet = self.server._event_packet(
+                            event, data, namespace).encode()
+                    tasks.append(self.server._send_encoded_packet(
+                        sid, encoded_packet))
         if tasks == []:  # pragma: no cover
             return
+        await asyncio.wait([asyncio.ensure_future(task) for task in tasks])
+
+    async def emit_encoded(self, encoded_packet, namespace, room=None,
+                           skip_sid=None):
+        """Send an event packet that is already encoded to a single client,
+        a room, or all the clients connected to the namespace.
+
+        Note: this method is a coroutine.
+        """
+        if namespace not in self.rooms or room not in self.rooms[namespace]:
+            return
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+        tasks = [asyncio.ensure_future(
+                 self.server._send_encoded_packet(sid, encoded_packet))
+                 for sid in self.get_participants(namespace, room)
+                 if sid not in skip_sid]
+        if tasks == []:
+            return
+        await asyncio.wait(tasks)
+
+    async def emit_many(self, events, namespace, skip_sid=None, **kwargs):
+        """Emit a batch of events to their recipients.
+
+        ``events`` is a list of ``(event, data, room)`` tuples. Each event is
+        encoded once, and then the packets addressed to each client are
+        sent to it in the order in which they were given.
+
+        Note: this method is a coroutine.
+        """
+        tasks = [asyncio.ensure_future(
+                 self.server._send_encoded_packets(sid, encoded_packets))
+                 for sid, encoded_packets in self._group_by_recipient(
+                     events, namespace, skip_sid)]
+        if tasks == []:
+            return
+        await asyncio.wait(tasks)
+
+    async def emit_many_encoded(self, packets, namespace, skip_sid=None):
+        """Send a batch of event packets that are already encoded to their
+        recipients.
+
+        ``packets`` is a list of ``(encoded_packet, room)`` tuples.
+
+        Note: this method is a coroutine.
+        """
+        tasks = [asyncio.ensure_future(
+                 self.server._send_encoded_packets(sid, encoded_packets))
+                 for sid, encoded_packets in self._group_by_recipient(
+                     packets, namespace, skip_sid, encoded=True)]
+        if tasks == []:
+            return
         await asyncio.wait(tasks)
 
     async def close_room(self, room, namespace):
@@ -46,12 +109,10 @@ class AsyncManager(BaseManager):
         """
         callback = None
         try:
-            callback = self.callbacks[sid][namespace][id]
+            callback = self._pop_callback(sid, namespace, id)
         except KeyError:
             # if we get an unknown callback we just ignore it
             self._get_logger().warning('Unknown callback received, ignoring.')
-        else:
-            del self.callbacks[sid][namespace][id]
         if callback is not None:
             ret = callback(*data)
             if asyncio.iscoroutine(ret):
@@ -41,6 +41,11 @@ class AsyncNamespace(namespace.Namespace):
                 ret = handler(*args)
             return ret
 
+    def _get_event_handlers(self):
+        if type(self).trigger_event != AsyncNamespace.trigger_event:
+            return None
+        return self._find_event_handlers()
+
     async def emit(self, event, data=None, room=None, skip_sid=None,
                    namespace=None, callback=None):
         """Emit a custom event to one or more connected clients.
@@ -56,6 +61,18 @@ class AsyncNamespace(namespace.Namespace):
                                       namespace=namespace or self.namespace,
                                       callback=callback)
 
+    async def emit_many(self, events, skip_sid=None, namespace=None):
+        """Emit a batch of custom events to connected clients.
+
+        The only difference with the :func:`socketio_v4.Server.emit_many`
+        method is that when the ``namespace`` argument is not given the
+        namespace associated with the class is used.
+
+        Note: this method is a coroutine.
+        """
+        return await self.server.emit_many(
+            events, skip_sid=skip_sid, namespace=namespace or self.namespace)
+
     async def send(self, data, room=None, skip_sid=None, namespace=None,
                    callback=None):
         """Send a message to one or more connected clients.
@@ -1,5 +1,5 @@
 import asyncio
-import pickle
+import time
 from urllib.parse import urlparse
 
 try:
@@ -47,11 +47,42 @@ class AsyncRedisManager(AsyncPubSubManager):  # pragma: no cover
     :param write_only: If set ot ``True``, only initialize to emit events. The
                        default of ``False`` initializes the class for emitting
                        and receiving.
+    :param codec: The codec used to encode the messages sent to the other
+                  servers. Can be ``'pickle'`` (the default), ``'json'`` or
+                  ``'msgpack'``. Must be the same in all the servers.
+    :param forward_encoded: If set to ``True``, events without a callback
+                            are encoded once by the server that emits them,
+                            and the receiving servers forward the encoded
+                            packets to their clients. Servers running older
+                            releases cannot handle these messages, so this
+                            option must only be enabled once all the servers
+                            have been upgraded. The default is ``False``.
+    :param shards: The number of sub-channels used to route the messages
+                   addressed to rooms, so that each server only receives the
+                   messages for rooms that have local participants. The
+                   default of ``0`` disables routing.
+    :param unicast: If set to ``True``, messages addressed to a single client
+                    are only sent to the server that hosts it.
+    :param host_timeout: The time in seconds after which the clients of a
+                         server that stopped sending heartbeats are removed
+                         from the directory used by ``unicast``. The default
+                         is ``60``, and ``0`` disables the expiration.
+    :param listen_batch_size: The maximum number of received messages that
+                              are processed in a single wake up of the
+                              listener.
+    :param listen_queue_size: The maximum number of received messages that
+                              can be waiting to be processed. When this limit
+                              is reached, the listener stops reading from
+                              Redis until there is room, and the messages
+                              are buffered by the Redis server.
     """
     name = 'aioredis'
+    supports_routing = True
 
     def __init__(self, url='redis://localhost:6379/0', channel='socketio_v4',
-                 write_only=False, logger=None):
+                 write_only=False, logger=None, codec='pickle', shards=0,
+                 unicast=False, listen_batch_size=100, listen_queue_size=1000,
+                 forward_encoded=False, host_timeout=60):
         if aioredis is None:
             raise RuntimeError('Redis package is not installed '
                                '(Run "pip install aioredis" in your '
@@ -61,9 +92,19 @@ class AsyncRedisManager(AsyncPubSubManager):  # pragma: no cover
         ) = _parse_redis_url(url)
         self.pub = None
         self.sub = None
-        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.receiver = None
+        self.listen_batch_size = listen_batch_size
+        self.listen_queue_size = listen_queue_size
+        self.listener_task = None
+        self.listener_messages = None
+        self.listener_stats = {'received': 0, 'batches': 0, 'lag': 0,
+                               'full': 0}
+        super().__init__(channel=channel, write_only=write_only, logger=logger,
+                         codec=codec, shards=shards, unicast=unicast,
+                         forward_encoded=forward_encoded,
+                         host_timeout=host_timeout)
 
-    async def _publish(self, data):
+    async def _publish(self, data, channel=None):
         retry = True
         while True:
             try:
@@ -72,8 +113,8 @@ class AsyncRedisManager(AsyncPubSubManager):  # pragma: no cover
                         (self.host, self.port), db=self.db,
                         password=self.password, ssl=self.ssl
                     )
-                return await self.pub.publish(self.channel,
-                                              pickle.dumps(data))
+                return await self.pub.publish(channel or self.channel,
+                                              self._encode_message(data))
             except (aioredis.RedisError, OSError):
                 if retry:
                     self._get_logger().error('Cannot publish to redis... '
@@ -85,7 +126,44 @@ class AsyncRedisManager(AsyncPubSubManager):  # pragma: no cover
                                              'giving up')
                     break
 
-    async def _listen(self):
+    async def _subscribe(self, channel):
+        if self.sub is None:
+            # the listener subscribes to all the room channels when it
+            # connects
+            return
+        try:
+            await self.sub.subscribe(self.receiver.channel(channel))
+        except (aioredis.RedisError, OSError):
+            self._get_logger().error('Cannot subscribe to redis channel '
+                                     + channel)
+
+    async def _unsubscribe(self, channel):
+        if self.sub is None:
+            return
+        try:
+            await self.sub.unsubscribe(channel)
+        except (aioredis.RedisError, OSError):
+            self._get_logger().error('Cannot unsubscribe from redis '
+                                     'channel ' + channel)
+
+    def get_listener_stats(self):
+        """Return the statistics of the listener.
+
+        The returned dictionary has the number of messages received and of
+        batches of messages processed, the number of received messages
+        waiting to be processed, the number of times the reader had to wait
+        because the queue of received messages was full, and the lag, which
+        is the time in seconds the oldest message of the last batch waited to
+        be processed.
+        """
+        stats = dict(self.listener_stats)
+        stats['pending'] = self.listener_messages.qsize() \
+            if self.listener_messages is not None else 0
+        return stats
+
+    async def _read_messages(self):
+        """Receive the messages from the subscribed channels and put them in
+        the listener queue."""
         retry_sleep = 1
         while True:
             try:
@@ -94,8 +172,26 @@ class AsyncRedisManager(AsyncPubSubManager):  # pragma: no cover
                         (self.host, self.port), db=self.db,
                         password=self.password, ssl=self.ssl
                     )
-                self.ch = (await self.sub.subscribe(self.channel))[0]
-                return await self.ch.get()
+                    # a single receiver collects the messages from the main
+                    # channel and from all the room channels, and the
+                    # subscriptions are only renewed after a reconnection
+                    self.receiver = aioredis.pubsub.Receiver()
+                    await self.sub.subscribe(*[
+                        self.receiver.channel(channel)
+                        for channel in self._get_subscriptions()])
+                    retry_sleep = 1
+                    if self.unicast:
+                        # the directory may have missed announcements while
+                        # this server was not subscribed
+                        await self._request_directory()
+                async for _, message in self.receiver.iter():
+                    if self.listener_messages.full():
+                        # the listener is falling behind
+                        self.listener_stats['full'] += 1
+                    await self.listener_messages.put(
+                        (time.monotonic(), message))
+                    self.listener_stats['received'] += 1
+                raise OSError('Redis subscription closed')
             except (aioredis.RedisError, OSError):
                 self._get_logger().error('Cannot receive from redis... '
                                          'retrying in '
@@ -105,3 +201,26 @@ class AsyncRedisManager(AsyncPubSubManager):  # pragma: no cover
                 retry_sleep *= 2
                 if retry_sleep > 60:
                     retry_sleep = 60
+
+    async def _next_messages(self, max_count):
+        if self.listener_task is None:
+            self.listener_messages = asyncio.Queue(
+                maxsize=self.listen_queue_size)
+            self.listener_task = asyncio.ensure_future(self._read_messages())
+        received, message = await self.listener_messages.get()
+        lag = time.monotonic() - received
+        messages = [message]
+        while len(messages) < max_count:
+            try:
+                messages.append(self.listener_messages.get_nowait()[1])
+            except asyncio.QueueEmpty:
+                break
+        self.listener_stats['batches'] += 1
+        self.listener_stats['lag'] = lag
+        return messages
+
+    async def _listen(self):
+        return (await self._next_messages(1))[0]
+
+    async def _listen_batch(self):
+        return await self._next_messages(self.listen_batch_size)
@@ -3,6 +3,7 @@ import asyncio
 import engineio_v3
 import six
 
+from . import asyncio_dispatcher
 from . import asyncio_manager
 from . import exceptions
 from . import packet
@@ -27,9 +28,50 @@ class AsyncServer(server.Server):
                  packets. Custom json modules must have ``dumps`` and ``loads``
                  functions that are compatible with the standard library
                  versions.
+    :param serializer: An alternative serializer to use for encoding and
+                       decoding packet payloads, such as
+                       :class:`OrjsonSerializer`. When this is given, the
+                       ``json`` argument is only used by Engine.IO.
     :param async_handlers: If set to ``True``, event handlers are executed in
                            separate threads. To run handlers synchronously,
                            set to ``False``. The default is ``True``.
+    :param handler_workers: When ``async_handlers`` is ``True``, the number of
+                            worker tasks that run the event handlers. The
+                            events of different clients are handled in
+                            parallel, while the events of a client are
+                            handled one at a time, in the order they were
+                            received. The default of ``None`` starts a new
+                            task for each event.
+    :param handler_queue_size: The maximum number of events waiting for a
+                               handler worker. The default is 1000.
+    :param handler_overflow: What to do when an event arrives and the maximum
+                             number of events are waiting. Use ``'block'`` (the
+                             default) to stop reading from the client until
+                             there is room in the queue, ``'drop'`` to
+                             discard the event, or ``'disconnect'`` to discard
+                             the event and disconnect the client.
+    :param handler_ordering: With ``handler_workers``, use ``'client'`` (the
+                             default) to handle all the events of a client in
+                             order, or ``'namespace'`` to only keep the order
+                             of the events of a client in each namespace.
+    :param text_only: Set to ``True`` if the application never emits binary
+                      payloads. This skips the inspection of outgoing
+                      payloads looking for binary components, which makes
+                      emitting large payloads faster. The default is
+                      ``False``.
+    :param log_categories: The categories of activity that are logged when
+                           logging is enabled. The available categories are
+                           ``'emit'``, ``'receive'``, ``'rooms'`` and
+                           ``'pubsub'``. The default is to log all of them.
+    :param log_sample_rates: A dictionary with the fraction of the messages of
+                             each category that are logged, as a number
+                             between 0 and 1. The default is to log all the
+                             messages.
+    :param callback_timeout: The time in seconds after which the callbacks of
+                             emitted events that were not acknowledged by the
+                             client are discarded. The default of ``None``
+                             keeps the callbacks until they are acknowledged
+                             or the client disconnects.
     :param kwargs: Connection parameters for the underlying Engine.IO server.
 
     The Engine.IO configuration supports the following settings:
@@ -69,12 +111,14 @@ class AsyncServer(server.Server):
                             when ``engineio_v3_logger`` is ``False``.
     """
     def __init__(self, client_manager=None, logger=False, json=None,
-                 async_handlers=True, **kwargs):
+                 async_handlers=True, text_only=False, serializer=None,
+                 **kwargs):
         if client_manager is None:
             client_manager = asyncio_manager.AsyncManager()
         super().__init__(client_manager=client_manager, logger=logger,
                          binary=False, json=json,
-                         async_handlers=async_handlers, **kwargs)
+                         async_handlers=async_handlers, text_only=text_only,
+                         serializer=serializer, **kwargs)
 
     def is_asyncio_based(self):
         return True
@@ -129,8 +173,9 @@ class AsyncServer(server.Server):
         """
         namespace = namespace or '/'
         room = to or room
-        self.logger.info('emitting event "%s" to %s [%s]', event,
-                         room or 'all', namespace)
+        if self.log.emit:
+            self.log.emit('emitting event "%s" to %s [%s]', event,
+                          room or 'all', namespace)
         await self.manager.emit(event, data, namespace, room=room,
                                 skip_sid=skip_sid, callback=callback,
                                 **kwargs)
@@ -177,6 +222,41 @@ class AsyncServer(server.Server):
                         skip_sid=skip_sid, namespace=namespace,
                         callback=callback, **kwargs)
 
+    async def emit_many(self, events, skip_sid=None, namespace=None,
+                        **kwargs):
+        """Emit a batch of custom events to connected clients.
+
+        :param events: A list of ``(event, data, to)`` tuples, each describing
+                       one event with the same meaning as the arguments of
+                       the same name in :func:`emit`. Set ``to`` to ``None``
+                       to broadcast an event to all connected clients.
+        :param skip_sid: The session ID of a client to skip when broadcasting
+                         the events. To skip multiple sids, pass a list.
+        :param namespace: The Socket.IO namespace for the events. If this
+                          argument is omitted the events are emitted to the
+                          default namespace.
+        :param ignore_queue: Only used when a message queue is configured. If
+                             set to ``True``, the events are emitted to the
+                             clients directly, without going through the
+                             queue. It is recommended to always leave this
+                             parameter with its default value of ``False``.
+
+        This is more efficient than calling :func:`emit` once per event,
+        because each event is encoded only once and all the events addressed
+        to a client are sent to it from a single task. Each packet is still
+        handed to the Engine.IO server on its own, so a client receives as
+        many Engine.IO messages as events are addressed to it. When a message
+        queue is configured, the whole batch is published as a single message.
+        Callbacks are not supported for batched events.
+
+        Note: this method is a coroutine.
+        """
+        namespace = namespace or '/'
+        if self.log.emit:
+            self.log.emit('emitting %d events [%s]', len(events), namespace)
+        await self.manager.emit_many(events, namespace, skip_sid=skip_sid,
+                                     **kwargs)
+
     async def call(self, event, data=None, to=None, sid=None, namespace=None,
                    timeout=60, **kwargs):
         """Emit a custom event to a client and wait for the response.
@@ -246,7 +326,8 @@ class AsyncServer(server.Server):
         Note: this method is a coroutine.
         """
         namespace = namespace or '/'
-        self.logger.info('room %s is closing [%s]', room, namespace)
+        if self.log.rooms:
+            self.log.rooms('room %s is closing [%s]', room, namespace)
         await self.manager.close_room(room, namespace)
 
     async def get_session(self, sid, namespace=None):
@@ -342,6 +423,7 @@ class AsyncServer(server.Server):
                                                        namespace=namespace))
             await self._trigger_event('disconnect', namespace, sid)
             self.manager.disconnect(sid, namespace=namespace)
+            self._discard_events(sid, namespace)
             if namespace == '/':
                 await self.eio.disconnect(sid)
 
@@ -386,6 +468,11 @@ class AsyncServer(server.Server):
 
     async def _emit_internal(self, sid, event, data, namespace=None, id=None):
         """Send a message to a client."""
+        await self._send_packet(sid, self._event_packet(event, data,
+                                                        namespace, id))
+
+    def _event_packet(self, event, data, namespace=None, id=None):
+        """Build the Socket.IO packet for an event."""
         # tuples are expanded to multiple arguments, everything else is sent
         # as a single argument
         if isinstance(data, tuple):
@@ -394,13 +481,16 @@ class AsyncServer(server.Server):
             data = [data]
         else:
             data = []
-        await self._send_packet(sid, packet.Packet(
-            packet.EVENT, namespace=namespace, data=[event] + data, id=id,
-            binary=None))
+        return packet.Packet(packet.EVENT, namespace=namespace,
+                             data=[event] + data, id=id,
+                             binary=False if self.text_only else None)
 
     async def _send_packet(self, sid, pkt):
         """Send a Socket.IO packet to a client."""
-        encoded_packet = pkt.encode()
+        await self._send_encoded_packet(sid, pkt.encode())
+
+    async def _send_encoded_packet(self, sid, encoded_packet):
+        """Send an already encoded Socket.IO packet to a client."""
         if isinstance(encoded_packet, list):
             binary = False
             for ep in encoded_packet:
@@ -409,6 +499,15 @@ class AsyncServer(server.Server):
         else:
             await self.eio.send(sid, encoded_packet, binary=False)
 
+    async def _send_encoded_packets(self, sid, encoded_packets):
+        """Send a list of already encoded Socket.IO packets to a client.
+
+        The Engine.IO server does not accept a batch of packets, so they are
+        sent one by one, in order.
+        """
+        for encoded_packet in encoded_packets:
+            await self._send_encoded_packet(sid, encoded_packet)
+
     async def _handle_connect(self, sid, namespace):
         """Handle a client connection request."""
         namespace = namespace or '/'
@@ -452,21 +551,28 @@ class AsyncServer(server.Server):
                 self.manager.pre_disconnect(sid, namespace=n)
                 await self._trigger_event('disconnect', n, sid)
                 self.manager.disconnect(sid, n)
+                self._discard_events(sid, n)
         if namespace == '/' and self.manager.is_connected(sid, namespace):
             self.manager.pre_disconnect(sid, namespace='/')
             await self._trigger_event('disconnect', '/', sid)
             self.manager.disconnect(sid, '/')
+            self._discard_events(sid, '/')
 
     async def _handle_event(self, sid, namespace, id, data):
         """Handle an incoming client event."""
         namespace = namespace or '/'
-        self.logger.info('received event "%s" from %s [%s]', data[0], sid,
-                         namespace)
+        if self.log.receive:
+            self.log.receive('received event "%s" from %s [%s]', data[0], sid,
+                             namespace)
         if not self.manager.is_connected(sid, namespace):
             self.logger.warning('%s is not connected to namespace %s',
                                 sid, namespace)
             return
-        if self.async_handlers:
+        if self.dispatcher is not None:
+            await self.dispatcher.dispatch(sid, namespace,
+                                           self._handle_event_internal, self,
+                                           sid, data, namespace, id)
+        elif self.async_handlers:
             self.start_background_task(self._handle_event_internal, self, sid,
                                        data, namespace, id)
         else:
@@ -483,35 +589,37 @@ class AsyncServer(server.Server):
                 data = list(r)
             else:
                 data = [r]
-            await server._send_packet(sid, packet.Packet(packet.ACK,
-                                                         namespace=namespace,
-                                                         id=id, data=data,
-                                                         binary=None))
+            await server._send_packet(sid, packet.Packet(
+                packet.ACK, namespace=namespace, id=id, data=data,
+                binary=False if self.text_only else None))
 
     async def _handle_ack(self, sid, namespace, id, data):
         """Handle ACK packets from the client."""
         namespace = namespace or '/'
-        self.logger.info('received ack from %s [%s]', sid, namespace)
+        if self.log.receive:
+            self.log.receive('received ack from %s [%s]', sid, namespace)
         await self.manager.trigger_callback(sid, namespace, id, data)
 
+    def _is_coroutine(self, handler):
+        return asyncio.iscoroutinefunction(handler) is True
+
     async def _trigger_event(self, event, namespace, *args):
         """Invoke an application event handler."""
-        # first see if we have an explicit handler for the event
-        if namespace in self.handlers and event in self.handlers[namespace]:
-            if asyncio.iscoroutinefunction(self.handlers[namespace][event]) \
-                    is True:
-                try:
-                    ret = await self.handlers[namespace][event](*args)
-                except asyncio.CancelledError:  # pragma: no cover
-                    ret = None
-            else:
-                ret = self.handlers[namespace][event](*args)
-            return ret
-
-        # or else, forward the event to a namepsace handler if one exists
-        elif namespace in self.namespace_handlers:
-            return await self.namespace_handlers[namespace].trigger_event(
-                event, *args)
+        try:
+            handler, is_coroutine = self._event_table[(namespace, event)]
+        except KeyError:
+            # a namespace handler that does not have a method for the event
+            # can still handle it if it overrides trigger_event()
+            if namespace in self.namespace_handlers:
+                return await self.namespace_handlers[namespace].trigger_event(
+                    event, *args)
+            return
+        if is_coroutine:
+            try:
+                return await handler(*args)
+            except asyncio.CancelledError:  # pragma: no cover
+                return None
+        return handler(*args)
 
     async def _handle_eio_connect(self, sid, environ):
         """Handle the Engine.IO connection event."""
@@ -559,3 +667,6 @@ class AsyncServer(server.Server):
 
     def _engineio_v3_server_class(self):
         return engineio_v3.AsyncServer
+
+    def _dispatcher_class(self):
+        return asyncio_dispatcher.AsyncDispatcher
@@ -0,0 +1,115 @@
+try:
+    import zmq
+    import zmq.asyncio
+except ImportError:
+    zmq = None
+
+from .asyncio_pubsub_manager import AsyncPubSubManager
+from .zmq_manager import _parse_zmq_url
+
+
+class AsyncZmqManager(AsyncPubSubManager):
+    """zmq based client manager for asyncio servers.
+
+    NOTE: this zmq implementation should be considered experimental at this
+    time.
+
+    This class implements a zmq backend for event sharing across multiple
+    processes, using the asyncio support in pyzmq. To use a zmq backend,
+    initialize the :class:`AsyncServer` instance as follows::
+
+        url = 'zmq+tcp://hostname:port1+port2'
+        server = socketio_v4.AsyncServer(
+            client_manager=socketio_v4.AsyncZmqManager(url))
+
+    A zmq message broker must be running for this manager to work. See
+    :class:`ZmqManager` for an example broker.
+
+    :param url: The connection URL for the zmq message broker,
+                which will need to be provided and running.
+    :param channel: The channel name on which the server sends and receives
+                    notifications. Must be the same in all the servers.
+    :param write_only: If set to ``True``, only initialize to emit events. The
+                       default of ``False`` initializes the class for emitting
+                       and receiving.
+    :param codec: The codec used to encode the messages sent to the other
+                  servers. Can be ``'pickle'`` (the default), ``'json'`` or
+                  ``'msgpack'``. Must be the same in all the servers.
+    :param forward_encoded: If set to ``True``, events without a callback
+                            are encoded once by the server that emits them,
+                            and the receiving servers forward the encoded
+                            packets to their clients. Servers running older
+                            releases cannot handle these messages, so this
+                            option must only be enabled once all the servers
+                            have been upgraded. The default is ``False``.
+    :param max_pending: The maximum number of published messages that can be
+                        queued in the socket while the broker is not accepting
+                        them. When the limit is reached, publishing waits.
+    :param listen_batch_size: The maximum number of received messages that
+                              are processed in a single wake up of the
+                              listener.
+    """
+    name = 'asynczmq'
+
+    def __init__(self, url='zmq+tcp://localhost:5555+5556',
+                 channel='socketio_v4', write_only=False, logger=None,
+                 codec='pickle', max_pending=1000, listen_batch_size=100,
+                 forward_encoded=False):
+        if zmq is None:
+            raise RuntimeError('zmq package is not installed '
+                               '(Run "pip install pyzmq" in your '
+                               'virtualenv).')
+        sink_url, sub_url = _parse_zmq_url(url)
+        context = zmq.asyncio.Context.instance()
+
+        # the high water mark makes send() wait when the broker falls behind
+        self.sink = context.socket(zmq.PUSH)
+        self.sink.setsockopt(zmq.SNDHWM, max_pending)
+        self.sink.connect(sink_url)
+
+        self.sub = context.socket(zmq.SUB)
+        self.sub.setsockopt_string(zmq.SUBSCRIBE, u'')
+        self.sub.connect(sub_url)
+
+        self.listen_batch_size = listen_batch_size
+        super().__init__(channel=channel, write_only=write_only, logger=logger,
+                         codec=codec, forward_encoded=forward_encoded)
+
+    async def _publish(self, data):
+        return await self.sink.send(self._encode_message(
+            {
+                'type': 'message',
+                'channel': self.channel,
+                'data': data
+            }
+        ))
+
+    def _unwrap(self, message):
+        """Return the payload of a message received from the broker, or
+        ``None`` if the message is not for this channel."""
+        message = self._decode_message(message)
+        if isinstance(message, dict) and \
+                message.get('type') == 'message' and \
+                message.get('channel') == self.channel and \
+                'data' in message:
+            return message['data']
+
+    async def _listen(self):
+        while True:
+            data = self._unwrap(await self.sub.recv())
+            if data is not None:
+                return data
+
+    async def _listen_batch(self):
+        while True:
+            messages = [await self.sub.recv()]
+            # collect the messages that are already waiting in the socket
+            while len(messages) < self.listen_batch_size:
+                try:
+                    messages.append(await self.sub.recv(flags=zmq.NOBLOCK))
+                except zmq.Again:
+                    break
+            batch = [data for data in map(self._unwrap, messages)
+                     if data is not None]
+            if batch:
+                return batch
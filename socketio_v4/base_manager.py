@@ -1,5 +1,7 @@
+import heapq
 import itertools
 import logging
+import time
 
 import six
 
@@ -14,12 +16,35 @@ class BaseManager(object):
     stored in a memory structure, making it appropriate only for single process
     services. More sophisticated storage backends can be implemented by
     subclasses.
+
+    Room membership is indexed in both directions. The ``rooms`` attribute
+    maps each namespace and room to its participants, while ``sid_rooms``
+    maps each namespace and client to the rooms it is in, so that subclasses
+    can look up the rooms of a client without scanning the whole namespace.
+
+    Callbacks that are never acknowledged are discarded once they are older
+    than ``callback_timeout`` seconds, if this attribute is set.
+
+    Rooms with at least ``snapshot_threshold`` participants keep a snapshot
+    of their participants that is shared by all the emits until the room
+    changes. Smaller rooms, such as the room of each client, are copied on
+    every emit instead, so that they do not use memory for a snapshot.
     """
+    snapshot_threshold = 16
+
     def __init__(self):
         self.logger = None
         self.server = None
         self.rooms = {}
+        self.sid_rooms = {}
         self.callbacks = {}
+        self.callback_timeout = None
+        self.callback_stats = {'expired': 0}
+        self._callback_deadlines = []
+        self._ack_ids = itertools.count(1)
+        self._room_snapshots = {}
+        self._room_versions = {}
+        self._room_version_counter = itertools.count(1)
         self.pending_disconnect = {}
 
     def set_server(self, server):
@@ -36,9 +61,29 @@ class BaseManager(object):
         return six.iterkeys(self.rooms)
 
     def get_participants(self, namespace, room):
-        """Return an iterable with the active participants in a room."""
-        for sid, active in six.iteritems(self.rooms[namespace][room].copy()):
-            yield sid
+        """Return an iterable with the active participants in a room.
+
+        The participants are taken from an immutable snapshot of the room
+        that is shared by all callers until the room membership changes, so
+        the room can be modified while the returned iterable is consumed.
+        """
+        participants = self.rooms[namespace][room]
+        if len(participants) < self.snapshot_threshold:
+            return iter(tuple(participants))
+        key = (namespace, room)
+        # the snapshot is stored along with the version of the room it was
+        # taken from, and it is only reused while the version is current, so
+        # a snapshot taken while another thread was changing the room is
+        # never returned after the change
+        version = self._room_versions.get(key)
+        try:
+            snapshot_version, snapshot = self._room_snapshots[key]
+        except KeyError:
+            snapshot_version = None
+        if snapshot_version is None or snapshot_version != version:
+            snapshot = tuple(participants)
+            self._room_snapshots[key] = (version, snapshot)
+        return iter(snapshot)
 
     def connect(self, sid, namespace):
         """Register a client connection to a namespace."""
@@ -73,10 +118,10 @@ class BaseManager(object):
         """Register a client disconnect from a namespace."""
         if namespace not in self.rooms:
             return
-        rooms = []
-        for room_name, room in six.iteritems(self.rooms[namespace].copy()):
-            if sid in room:
-                rooms.append(room_name)
+        try:
+            rooms = list(self.sid_rooms[namespace][sid])
+        except KeyError:
+            rooms = []
         for room in rooms:
             self.leave_room(sid, namespace, room)
         if sid in self.callbacks and namespace in self.callbacks[sid]:
@@ -96,18 +141,40 @@ class BaseManager(object):
         if room not in self.rooms[namespace]:
             self.rooms[namespace][room] = {}
         self.rooms[namespace][room][sid] = True
+        self._room_changed(namespace, room)
+        if namespace not in self.sid_rooms:
+            self.sid_rooms[namespace] = {}
+        if sid not in self.sid_rooms[namespace]:
+            self.sid_rooms[namespace][sid] = {}
+        self.sid_rooms[namespace][sid][room] = True
 
     def leave_room(self, sid, namespace, room):
         """Remove a client from a room."""
         try:
             del self.rooms[namespace][room][sid]
+            self._room_changed(namespace, room)
             if len(self.rooms[namespace][room]) == 0:
                 del self.rooms[namespace][room]
+                self._room_versions.pop((namespace, room), None)
+                self._room_snapshots.pop((namespace, room), None)
                 if len(self.rooms[namespace]) == 0:
                     del self.rooms[namespace]
+            del self.sid_rooms[namespace][sid][room]
+            if len(self.sid_rooms[namespace][sid]) == 0:
+                del self.sid_rooms[namespace][sid]
+                if len(self.sid_rooms[namespace]) == 0:
+                    del self.sid_rooms[namespace]
         except KeyError:
             pass
 
+    def _room_changed(self, namespace, room):
+        """Invalidate the participant snapshot of a room."""
+        # versions come from a single counter, so a room that is deleted and
+        # created again never reuses the version of an old snapshot
+        self._room_versions[(namespace, room)] = \
+            next(self._room_version_counter)
+        self._room_snapshots.pop((namespace, room), None)
+
     def close_room(self, room, namespace):
         """Remove all participants from a room."""
         try:
@@ -118,55 +185,190 @@ class BaseManager(object):
 
     def get_rooms(self, sid, namespace):
         """Return the rooms a client is in."""
-        r = []
         try:
-            for room_name, room in six.iteritems(self.rooms[namespace]):
-                if room_name is not None and sid in room and room[sid]:
-                    r.append(room_name)
+            return [room for room in self.sid_rooms[namespace][sid]
+                    if room is not None]
         except KeyError:
-            pass
-        return r
+            return []
 
     def emit(self, event, data, namespace, room=None, skip_sid=None,
              callback=None, **kwargs):
         """Emit a message to a single client, a room, or all the clients
         connected to the namespace."""
+        if namespace not in self.rooms or room not in self.rooms[namespace]:
+            return
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+        if callback is not None:
+            # each recipient gets its own ack id, so the packet has to be
+            # encoded individually for every client
+            for sid in self.get_participants(namespace, room):
+                if sid not in skip_sid:
+                    id = self._generate_ack_id(sid, namespace, callback)
+                    self.server._emit_internal(sid, event, data, namespace,
+                                               id)
+            return
+        # without callbacks the packet is the same for all recipients, so it
+        # is encoded only once, and only if there is someone to send it to
+        encoded_packet = None
+        for sid in self.get_participants(namespace, room):
+            if sid not in skip_sid:
+                if encoded_packet is None:
+                    encoded_packet = self.server._event_packet(
+                        event, data, namespace).encode()
+                self.server._send_encoded_packet(sid, encoded_packet)
+
+    def emit_encoded(self, encoded_packet, namespace, room=None,
+                     skip_sid=None):
+        """Send an event packet that is already encoded to a single client,
+        a room, or all the clients connected to the namespace.
+
+        This is used to deliver events that were encoded by another server.
+        """
         if namespace not in self.rooms or room not in self.rooms[namespace]:
             return
         if not isinstance(skip_sid, list):
             skip_sid = [skip_sid]
         for sid in self.get_participants(namespace, room):
             if sid not in skip_sid:
-                if callback is not None:
-                    id = self._generate_ack_id(sid, namespace, callback)
-                else:
-                    id = None
-                self.server._emit_internal(sid, event, data, namespace, id)
+                self.server._send_encoded_packet(sid, encoded_packet)
+
+    def emit_many(self, events, namespace, skip_sid=None, **kwargs):
+        """Emit a batch of events to their recipients.
+
+        ``events`` is a list of ``(event, data, room)`` tuples. Each event is
+        encoded once, and then the packets addressed to each client are
+        sent to it in the order in which they were given.
+        """
+        for sid, encoded_packets in self._group_by_recipient(
+                events, namespace, skip_sid):
+            self.server._send_encoded_packets(sid, encoded_packets)
+
+    def emit_many_encoded(self, packets, namespace, skip_sid=None):
+        """Send a batch of event packets that are already encoded to their
+        recipients.
+
+        ``packets`` is a list of ``(encoded_packet, room)`` tuples.
+        """
+        for sid, encoded_packets in self._group_by_recipient(
+                packets, namespace, skip_sid, encoded=True):
+            self.server._send_encoded_packets(sid, encoded_packets)
 
     def trigger_callback(self, sid, namespace, id, data):
         """Invoke an application callback."""
         callback = None
         try:
-            callback = self.callbacks[sid][namespace][id]
+            callback = self._pop_callback(sid, namespace, id)
         except KeyError:
             # if we get an unknown callback we just ignore it
             self._get_logger().warning('Unknown callback received, ignoring.')
-        else:
-            del self.callbacks[sid][namespace][id]
         if callback is not None:
             callback(*data)
 
+    def get_callback_stats(self):
+        """Return the statistics of the event callbacks.
+
+        The returned dictionary has the number of callbacks that are waiting
+        to be acknowledged, and the number of callbacks that expired without
+        being acknowledged.
+        """
+        self._expire_callbacks(time.time())
+        pending = 0
+        for namespaces in six.itervalues(self.callbacks):
+            for ids in six.itervalues(namespaces):
+                pending += len(ids)
+        return {'pending': pending,
+                'expired': self.callback_stats['expired']}
+
+    def _group_by_recipient(self, events, namespace, skip_sid=None,
+                            encoded=False):
+        """Encode a batch of events and group the resulting packets by
+        recipient.
+
+        If ``encoded`` is ``True``, ``events`` is a list of
+        ``(encoded_packet, room)`` tuples that do not need to be encoded.
+        The return value is a list of ``(sid, encoded_packets)`` tuples.
+        """
+        if namespace not in self.rooms:
+            return []
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+        recipients = {}
+        for event in events:
+            if encoded:
+                encoded_packet, room = event
+            else:
+                event, data, room = event
+                encoded_packet = None
+            if room not in self.rooms[namespace]:
+                continue
+            for sid in self.get_participants(namespace, room):
+                if sid not in skip_sid:
+                    if encoded_packet is None:
+                        encoded_packet = self.server._event_packet(
+                            event, data, namespace).encode()
+                    if sid not in recipients:
+                        recipients[sid] = []
+                    recipients[sid].append(encoded_packet)
+        return list(six.iteritems(recipients))
+
     def _generate_ack_id(self, sid, namespace, callback):
-        """Generate a unique identifier for an ACK packet."""
+        """Generate a unique identifier for an ACK packet.
+
+        The identifiers come from a single counter for the whole manager, so
+        they are never reused, even after the callbacks of a client or room
+        are removed. A late ACK for a callback that is gone is then reported
+        as unknown, instead of invoking a newer callback.
+        """
         namespace = namespace or '/'
         if sid not in self.callbacks:
             self.callbacks[sid] = {}
         if namespace not in self.callbacks[sid]:
-            self.callbacks[sid][namespace] = {0: itertools.count(1)}
-        id = six.next(self.callbacks[sid][namespace][0])
+            self.callbacks[sid][namespace] = {}
+        id = six.next(self._ack_ids)
         self.callbacks[sid][namespace][id] = callback
+        if self.callback_timeout:
+            now = time.time()
+            self._expire_callbacks(now)
+            heapq.heappush(self._callback_deadlines, (
+                now + self.callback_timeout, id, sid, namespace))
         return id
 
+    def _pop_callback(self, sid, namespace, id):
+        """Remove a callback and return it.
+
+        The entry of the client is also removed when it has no other
+        callbacks, so that callbacks addressed to rooms or to clients of other
+        servers do not leave it behind.
+        """
+        ids = self.callbacks[sid][namespace]
+        callback = ids.pop(id)
+        if not ids:
+            del self.callbacks[sid][namespace]
+            if not self.callbacks[sid]:
+                del self.callbacks[sid]
+        return callback
+
+    def _expire_callbacks(self, now):
+        """Discard the callbacks that were not acknowledged before their
+        deadline."""
+        deadlines = self._callback_deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, id, sid, namespace = heapq.heappop(deadlines)
+            if id not in self.callbacks.get(sid, {}).get(namespace, {}):
+                # the callback was already invoked, or the client is gone
+                continue
+            self._pop_callback(sid, namespace, id)
+            self.callback_stats['expired'] += 1
+            self._get_logger().info('Callback %s for %s expired', id, sid)
+
+    def _get_log(self, category):
+        """Return the function that logs the messages of a category, or
+        ``None`` if the category is disabled in the server."""
+        if self.logger or self.server is None:
+            return self._get_logger().info
+        return getattr(self.server.log, category)
+
     def _get_logger(self):
         """Get the appropriate logger
 
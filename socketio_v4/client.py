@@ -68,6 +68,10 @@ class Client(object):
                  packets. Custom json modules must have ``dumps`` and ``loads``
                  functions that are compatible with the standard library
                  versions.
+    :param serializer: An alternative serializer to use for encoding and
+                       decoding packet payloads, such as
+                       :class:`OrjsonSerializer`. When this is given, the
+                       ``json`` argument is only used by Engine.IO.
 
     The Engine.IO configuration supports the following settings:
 
@@ -86,7 +90,7 @@ class Client(object):
     def __init__(self, reconnection=True, reconnection_attempts=0,
                  reconnection_delay=1, reconnection_delay_max=5,
                  randomization_factor=0.5, logger=False, binary=False,
-                 json=None, **kwargs):
+                 json=None, serializer=None, **kwargs):
         global original_signal_handler
         if original_signal_handler is None and \
                 threading.current_thread() == threading.main_thread():
@@ -106,6 +110,8 @@ class Client(object):
         if json is not None:
             packet.Packet.json = json
             engineio_v3_options['json'] = json
+        if serializer is not None:
+            packet.Packet.serializer = serializer
 
         self.eio = self._engineio_v3_client_class()(**engineio_v3_options)
         self.eio.on('connect', self._handle_eio_connect)
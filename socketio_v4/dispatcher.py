@@ -0,0 +1,153 @@
+from collections import deque
+import threading
+import time
+
+
+class Dispatcher(object):
+    """Run event handlers in a fixed number of worker threads.
+
+    The workers are started once, with the async model selected by the
+    server, so handling an event does not require starting a new thread or
+    greenlet.
+
+    The events of each client are kept in a mailbox, and a mailbox is handled
+    by only one worker at a time, so the events of a client are handled in
+    the order in which they were received, while the events of different
+    clients are handled in parallel. After each event the mailbox goes back
+    to the end of the list of mailboxes that are ready, so that a busy client
+    does not hold a worker for itself.
+
+    :param server: The :class:`Server` instance.
+    :param workers: The number of worker threads.
+    :param queue_size: The maximum number of events waiting in the mailboxes.
+    :param overflow: What to do with an event that arrives when the maximum
+                     number of events are waiting. ``'block'`` makes the
+                     client reader wait until there is room, ``'drop'``
+                     discards the event, and ``'disconnect'`` discards the
+                     event and disconnects the client.
+    :param ordering: ``'client'`` to handle all the events of a client in
+                     order, or ``'namespace'`` to only keep the order of the
+                     events of a client in each namespace, which allows the
+                     events of a client in different namespaces to be handled
+                     in parallel.
+    """
+    overflow_policies = ['block', 'drop', 'disconnect']
+    ordering_policies = ['client', 'namespace']
+
+    def __init__(self, server, workers, queue_size=1000, overflow='block',
+                 ordering='client'):
+        if overflow not in self.overflow_policies:
+            raise ValueError('Invalid overflow policy')
+        if ordering not in self.ordering_policies:
+            raise ValueError('Invalid ordering policy')
+        self.server = server
+        self.workers = workers
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.ordering = ordering
+        self.mailboxes = {}
+        self.ready = None
+        self.threads = []
+        self.lock = threading.Lock()
+        self.slots = None
+        self.queued = 0
+        self.stats = {'processed': 0, 'dropped': 0, 'discarded': 0,
+                      'wait': 0}
+
+    def get_stats(self):
+        """Return the statistics of the dispatcher.
+
+        The returned dictionary has the number of events waiting to be
+        handled and of mailboxes that have events, the number of events
+        processed, dropped because the dispatcher was full and discarded
+        because the client disconnected, and the time in seconds the last
+        processed event waited in its mailbox.
+        """
+        stats = dict(self.stats)
+        stats['queued'] = self.queued
+        stats['mailboxes'] = len(self.mailboxes)
+        return stats
+
+    def dispatch(self, sid, namespace, handler, *args):
+        """Queue a handler invocation in the mailbox of a client."""
+        if self.ready is None:
+            self._start()
+        try:
+            # a token takes a slot, blocking with the async model of the
+            # server when the dispatcher is full
+            self.slots.put(None, block=self.overflow == 'block')
+        except Exception:  # the queue is full
+            self.stats['dropped'] += 1
+            self.server.logger.warning('Event queue is full, dropping event '
+                                       'from %s', sid)
+            if self.overflow == 'disconnect':
+                self.server.disconnect(sid, namespace=namespace)
+            return
+        key = self._get_key(sid, namespace)
+        item = (time.time(), namespace, handler, args)
+        with self.lock:
+            self.queued += 1
+            mailbox = self.mailboxes.get(key)
+            if mailbox is not None:
+                # the mailbox is already scheduled
+                mailbox.append(item)
+                return
+            mailbox = self.mailboxes[key] = deque([item])
+        self.ready.put((key, mailbox))
+
+    def discard(self, sid, namespace):
+        """Discard the events of a client in a namespace that are waiting to
+        be handled."""
+        key = self._get_key(sid, namespace)
+        with self.lock:
+            mailbox = self.mailboxes.get(key)
+            if not mailbox:
+                return
+            # the mailbox stays scheduled, its worker removes it when it
+            # finds it empty
+            remaining = [item for item in mailbox if item[1] != namespace]
+            discarded = len(mailbox) - len(remaining)
+            mailbox.clear()
+            mailbox.extend(remaining)
+            self.queued -= discarded
+            self.stats['discarded'] += discarded
+        for _ in range(discarded):
+            self.slots.get(block=False)
+
+    def _get_key(self, sid, namespace):
+        if self.ordering == 'namespace':
+            return (sid, namespace)
+        return sid
+
+    def _start(self):
+        with self.lock:
+            if self.ready is not None:
+                return
+            self.slots = self.server.eio.create_queue(self.queue_size)
+            ready = self.server.eio.create_queue()
+            self.threads = [self.server.start_background_task(self._worker,
+                                                              ready)
+                            for _ in range(self.workers)]
+            self.ready = ready
+
+    def _worker(self, ready):
+        while True:
+            key, mailbox = ready.get()
+            with self.lock:
+                if not mailbox:
+                    del self.mailboxes[key]
+                    continue
+                queued, _, handler, args = mailbox.popleft()
+                self.queued -= 1
+            self.slots.get(block=False)
+            self.stats['wait'] = time.time() - queued
+            try:
+                handler(*args)
+            except Exception:
+                self.server.logger.exception('event handler error')
+            self.stats['processed'] += 1
+            with self.lock:
+                if not mailbox:
+                    del self.mailboxes[key]
+                    continue
+            ready.put((key, mailbox))
@@ -0,0 +1,59 @@
+import itertools
+
+
+class Instrumentation(object):
+    """Log the activity of a server, grouped in categories.
+
+    Each category is an attribute that holds the function that logs its
+    messages, or ``None`` when the category is disabled. The categories are
+    resolved once, when this object is created, so that a disabled category
+    can be skipped with a single check::
+
+        if self.log.emit:
+            self.log.emit('emitting event "%s"', event)
+
+    The messages are logged at the ``INFO`` level, and their arguments are
+    only formatted by the logger if the message is going to be emitted. The
+    level of the logger is checked by the logger on each message, so it can
+    be changed after the server is created.
+
+    :param logger: The logger that receives the messages.
+    :param categories: The categories to log. The available categories are
+                       ``'emit'``, ``'receive'``, ``'rooms'`` and
+                       ``'pubsub'``. The default is to log all of them.
+    :param sample_rates: A dictionary with the fraction of the messages of a
+                         category that are logged, as a number between 0 and
+                         1. A rate of ``0.01`` logs one of every hundred
+                         messages. Categories that are not in the dictionary
+                         log all their messages.
+    """
+    categories = ('emit', 'receive', 'rooms', 'pubsub')
+
+    def __init__(self, logger, categories=None, sample_rates=None):
+        if categories is None:
+            categories = self.categories
+        sample_rates = sample_rates or {}
+        for category in list(categories) + list(sample_rates):
+            if category not in self.categories:
+                raise ValueError('Invalid log category ' + category)
+        self.logger = logger
+        for category in self.categories:
+            log = None
+            if category in categories:
+                log = self._get_log_function(sample_rates.get(category, 1))
+            setattr(self, category, log)
+
+    def _get_log_function(self, sample_rate):
+        info = getattr(self.logger, 'info', None)
+        if sample_rate <= 0 or info is None:
+            return None
+        if sample_rate >= 1:
+            return info
+        every = int(round(1 / sample_rate))
+        counter = itertools.count()
+
+        def sampled_log(msg, *args):
+            if next(counter) % every == 0:
+                info(msg, *args)
+
+        return sampled_log
@@ -1,5 +1,6 @@
 import logging
-import pickle
+import threading
+import time
 
 try:
     import kafka
@@ -11,6 +12,18 @@ from .pubsub_manager import PubSubManager
 logger = logging.getLogger('socketio_v4')
 
 
+def _get_message_key(data):
+    """Return the partitioning key of a message.
+
+    Messages for the same namespace and room go to the same partition of the
+    topic, so that they are received in the order they were sent.
+    """
+    key = data.get('namespace') or '/'
+    if data.get('room') is not None:
+        key += '\x00' + str(data['room'])
+    return key.encode('utf-8')
+
+
 class KafkaManager(PubSubManager):  # pragma: no cover
     """Kafka based client manager.
 
@@ -31,28 +44,104 @@ class KafkaManager(PubSubManager):  # pragma: no cover
     :param write_only: If set ot ``True``, only initialize to emit events. The
                        default of ``False`` initializes the class for emitting
                        and receiving.
+    :param codec: The codec used to encode the messages sent to the other
+                  servers. Can be ``'pickle'`` (the default), ``'json'`` or
+                  ``'msgpack'``. Must be the same in all the servers.
+    :param forward_encoded: If set to ``True``, events without a callback
+                            are encoded once by the server that emits them,
+                            and the receiving servers forward the encoded
+                            packets to their clients. Servers running older
+                            releases cannot handle these messages, so this
+                            option must only be enabled once all the servers
+                            have been upgraded. The default is ``False``.
+    :param flush_interval: How often, in seconds, the producer is flushed. The
+                           default of ``0`` flushes after every message, so
+                           each emit waits for the broker. A positive value
+                           lets the producer batch messages and flushes them
+                           periodically from a background task, and ``None``
+                           leaves flushing to the producer's own linger and
+                           batch size settings, and to its close at exit.
+    :param producer_options: additional keyword arguments to be passed to
+                             ``KafkaProducer()``, such as ``linger_ms``,
+                             ``batch_size`` or ``compression_type``.
+    :param consumer_options: additional keyword arguments to be passed to
+                             ``KafkaConsumer()``. Messages are keyed by
+                             namespace and room, so partitioned topics keep
+                             the order of the messages of each room. Every
+                             server must receive every message, so servers
+                             must not share a consumer group.
+    :param on_delivery_error: a function that is called with the exception
+                              when a message cannot be delivered to Kafka.
+                              Failed deliveries are also logged and counted in
+                              the ``delivery_errors`` attribute.
     """
     name = 'kafka'
 
     def __init__(self, url='kafka://localhost:9092', channel='socketio_v4',
-                 write_only=False):
+                 write_only=False, codec='pickle', flush_interval=0,
+                 producer_options=None, consumer_options=None,
+                 on_delivery_error=None, forward_encoded=False):
         if kafka is None:
             raise RuntimeError('kafka-python package is not installed '
                                '(Run "pip install kafka-python" in your '
                                'virtualenv).')
 
         super(KafkaManager, self).__init__(channel=channel,
-                                           write_only=write_only)
+                                           write_only=write_only,
+                                           codec=codec,
+                                           forward_encoded=forward_encoded)
 
         self.kafka_url = url[8:] if url != 'kafka://' else 'localhost:9092'
-        self.producer = kafka.KafkaProducer(bootstrap_servers=self.kafka_url)
+        self.flush_interval = flush_interval
+        self.on_delivery_error = on_delivery_error
+        self.delivery_errors = 0
+        self.flusher = None
+        self.producer = kafka.KafkaProducer(bootstrap_servers=self.kafka_url,
+                                            **(producer_options or {}))
         self.consumer = kafka.KafkaConsumer(self.channel,
-                                            bootstrap_servers=self.kafka_url)
+                                            bootstrap_servers=self.kafka_url,
+                                            **(consumer_options or {}))
 
-    def _publish(self, data):
-        self.producer.send(self.channel, value=pickle.dumps(data))
+    def flush(self):
+        """Wait until all the messages sent to Kafka are delivered."""
         self.producer.flush()
 
+    def _publish(self, data):
+        future = self.producer.send(self.channel,
+                                    value=self._encode_message(data),
+                                    key=_get_message_key(data))
+        future.add_errback(self._delivery_error)
+        if self.flush_interval == 0:
+            self.producer.flush()
+        elif self.flush_interval and self.flusher is None:
+            self._start_flusher()
+
+    def _delivery_error(self, exc):
+        self.delivery_errors += 1
+        logger.error('Cannot deliver message to kafka: %s', exc)
+        if self.on_delivery_error is not None:
+            self.on_delivery_error(exc)
+
+    def _start_flusher(self):
+        if self.server is not None:
+            sleep = self.server.sleep
+            start = self.server.start_background_task
+        else:
+            sleep = time.sleep
+
+            def start(target):
+                thread = threading.Thread(target=target)
+                thread.daemon = True
+                thread.start()
+                return thread
+
+        def flusher():
+            while True:
+                sleep(self.flush_interval)
+                self.producer.flush()
+
+        self.flusher = start(flusher)
+
     def _kafka_listen(self):
         for message in self.consumer:
             yield message
@@ -60,4 +149,4 @@ class KafkaManager(PubSubManager):  # pragma: no cover
     def _listen(self):
         for message in self._kafka_listen():
             if message.topic == self.channel:
-                yield pickle.loads(message.value)
+                yield message.value
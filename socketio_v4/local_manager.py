@@ -0,0 +1,187 @@
+import errno
+import glob
+import os
+import socket
+import stat
+import tempfile
+
+from .pubsub_manager import PubSubManager
+
+
+def _get_socket_dir(path, channel):
+    """Return the directory where the sockets of the workers are created.
+
+    The directory is created with access for its owner only. Since any
+    process that can write to it can receive the events of the server,
+    directories that belong to another user or that other users can write to
+    are refused.
+    """
+    default = path is None
+    if default:
+        # the user runtime directory is private, the temporary directory is
+        # shared with other users and the directory is named after the user
+        base = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+        path = os.path.join(
+            base, 'socketio_v4-{}-{}'.format(os.getuid(), channel))
+    try:
+        os.makedirs(path, 0o700)
+    except OSError as exc:
+        if exc.errno != errno.EEXIST:
+            raise
+    # a symbolic link in the shared temporary directory could have been
+    # planted by another user
+    info = os.lstat(path) if default else os.stat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or \
+            info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise RuntimeError('The socket directory ' + path + ' must be a '
+                           'directory owned by the current user and not '
+                           'writable by other users.')
+    return path
+
+
+def _get_peers(socket_dir):
+    """Return the socket paths of all the workers attached to the
+    directory."""
+    return glob.glob(os.path.join(socket_dir, '*.sock'))
+
+
+def _is_stale_peer(exc):
+    """Return ``True`` if a send error means that the worker that owned the
+    socket is gone."""
+    return getattr(exc, 'errno', None) in (errno.ECONNREFUSED, errno.ENOENT)
+
+
+class LocalManager(PubSubManager):
+    """Client manager for multiple workers running on the same host.
+
+    This class shares events between the worker processes of a single host
+    without an external message queue. Each worker listens on a Unix domain
+    datagram socket created in a shared directory, and messages are sent
+    directly to the sockets of all the workers. To use the local backend,
+    initialize the :class:`Server` instance of each worker as follows::
+
+        server = socketio_v4.Server(client_manager=socketio_v4.LocalManager())
+
+    This backend requires Unix domain sockets, so it is not available on
+    Windows. The size of a message is limited by the size of the socket send
+    buffer of the host, messages that are too large are logged and dropped.
+
+    :param path: The directory where the sockets of the workers are created.
+                 All the workers must use the same directory, which must be
+                 owned by the user that runs them and not writable by other
+                 users. The default is a directory named after the user and
+                 the channel in ``$XDG_RUNTIME_DIR``, or in the temporary
+                 directory of the system if that variable is not set.
+    :param channel: The channel name. It is used to name the default socket
+                    directory, so that multiple applications can run on the
+                    same host.
+    :param write_only: If set to ``True``, only initialize to emit events. The
+                       default of ``False`` initializes the class for emitting
+                       and receiving.
+    :param codec: The codec used to encode the messages sent to the other
+                  workers. Can be ``'pickle'`` (the default), ``'json'`` or
+                  ``'msgpack'``. Must be the same in all the workers.
+    :param forward_encoded: If set to ``True``, events without a callback
+                            are encoded once by the server that emits them,
+                            and the receiving servers forward the encoded
+                            packets to their clients. Servers running older
+                            releases cannot handle these messages, so this
+                            option must only be enabled once all the servers
+                            have been upgraded. The default is ``False``.
+    :param max_message_size: The size in bytes of the largest message that
+                             can be sent or received.
+    :param send_timeout: The time in seconds to wait for a worker that is not
+                         reading its messages before the message is dropped
+                         for that worker.
+    """
+    name = 'local'
+
+    def __init__(self, path=None, channel='socketio_v4', write_only=False,
+                 logger=None, codec='pickle', max_message_size=1024 * 1024,
+                 send_timeout=5, forward_encoded=False):
+        if not hasattr(socket, 'AF_UNIX'):  # pragma: no cover
+            raise RuntimeError('Unix domain sockets are not supported on '
+                               'this platform.')
+        super(LocalManager, self).__init__(channel=channel,
+                                           write_only=write_only,
+                                           logger=logger, codec=codec,
+                                           forward_encoded=forward_encoded)
+        self.socket_dir = _get_socket_dir(path, channel)
+        self.socket_path = os.path.join(self.socket_dir,
+                                        self.host_id + '.sock')
+        self.max_message_size = max_message_size
+        self.send_timeout = send_timeout
+        self.sender = None
+        self.receiver = None
+
+    def initialize(self):
+        super(LocalManager, self).initialize()
+
+        monkey_patched = True
+        if self.server.async_mode == 'eventlet':
+            from eventlet.patcher import is_monkey_patched
+            monkey_patched = is_monkey_patched('socket')
+        elif 'gevent' in self.server.async_mode:
+            from gevent.monkey import is_module_patched
+            monkey_patched = is_module_patched('socket')
+        if not monkey_patched:
+            raise RuntimeError(
+                'The local manager requires a monkey patched socket library '
+                'to work with ' + self.server.async_mode)
+
+    def close(self):
+        """Stop receiving messages and remove the socket of this worker."""
+        if self.receiver is not None:
+            self.receiver.close()
+            self.receiver = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:  # pragma: no cover
+                pass
+        if self.sender is not None:
+            self.sender.close()
+            self.sender = None
+
+    def _publish(self, data):
+        if self.sender is None:
+            self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.sender.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF,
+                                   self.max_message_size)
+            self.sender.settimeout(self.send_timeout)
+        message = self._encode_message(data)
+        for peer in _get_peers(self.socket_dir):
+            try:
+                self.sender.sendto(message, peer)
+            except socket.timeout:
+                self._get_logger().error(
+                    'Worker socket %s is not reading, message dropped', peer)
+            except (socket.error, OSError) as exc:
+                if _is_stale_peer(exc):
+                    # the worker that owned this socket exited without
+                    # removing it
+                    try:
+                        os.unlink(peer)
+                    except OSError:  # pragma: no cover
+                        pass
+                else:
+                    self._get_logger().error(
+                        'Cannot send message to worker socket %s: %s', peer,
+                        exc)
+
+    def _bind(self):
+        self.receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                 self.max_message_size)
+        self.receiver.bind(self.socket_path)
+
+    def _listen(self):
+        if self.receiver is None:
+            self._bind()
+        while self.receiver is not None:
+            try:
+                message = self.receiver.recv(self.max_message_size)
+            except (socket.error, OSError):
+                if self.receiver is None:
+                    break
+                raise
+            yield message
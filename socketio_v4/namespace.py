@@ -17,6 +17,25 @@ class BaseNamespace(object):
         if hasattr(self, handler_name):
             return getattr(self, handler_name)(*args)
 
+    def _get_event_handlers(self):
+        """Return the handler methods of the namespace, indexed by event name.
+
+        ``None`` is returned if a subclass overrides :meth:`trigger_event`,
+        since in that case the events must be dispatched through it.
+        """
+        if type(self).trigger_event != BaseNamespace.trigger_event:
+            return None
+        return self._find_event_handlers()
+
+    def _find_event_handlers(self):
+        handlers = {}
+        for name in dir(self):
+            if name.startswith('on_'):
+                handler = getattr(self, name)
+                if callable(handler):
+                    handlers[name[3:]] = handler
+        return handlers
+
 
 class Namespace(BaseNamespace):
     """Base class for server-side class-based namespaces.
@@ -49,6 +68,16 @@ class Namespace(BaseNamespace):
                                 namespace=namespace or self.namespace,
                                 callback=callback)
 
+    def emit_many(self, events, skip_sid=None, namespace=None):
+        """Emit a batch of custom events to connected clients.
+
+        The only difference with the :func:`socketio_v4.Server.emit_many`
+        method is that when the ``namespace`` argument is not given the
+        namespace associated with the class is used.
+        """
+        return self.server.emit_many(events, skip_sid=skip_sid,
+                                     namespace=namespace or self.namespace)
+
     def send(self, data, room=None, skip_sid=None, namespace=None,
              callback=None):
         """Send a message to one or more connected clients.
@@ -1,16 +1,27 @@
-import functools
 import json as _json
 
 import six
 
+from . import serializer as _serializer
+
 (CONNECT, DISCONNECT, EVENT, ACK, ERROR, BINARY_EVENT, BINARY_ACK) = \
     (0, 1, 2, 3, 4, 5, 6)
 packet_names = ['CONNECT', 'DISCONNECT', 'EVENT', 'ACK', 'ERROR',
                 'BINARY_EVENT', 'BINARY_ACK']
 
+_json_serializers = {}
+
 
 class Packet(object):
-    """Socket.IO packet."""
+    """Socket.IO packet.
+
+    When ``binary`` is ``None`` the data is inspected to find out if it has
+    binary components. Set ``binary`` to ``False`` when the data is known to
+    be text only, to skip this inspection.
+
+    The payload is serialized with the ``serializer`` class attribute. When
+    it is not set, a serializer based on the ``json`` class attribute is used.
+    """
 
     # the format of the Socket.IO packet is as follows:
     #
@@ -23,6 +34,7 @@ class Packet(object):
     # data: JSON dump of data payload
 
     json = _json
+    serializer = None
 
     def __init__(self, packet_type=EVENT, data=None, namespace=None, id=None,
                  binary=None, encoded_packet=None):
@@ -30,7 +42,15 @@ class Packet(object):
         self.data = data
         self.namespace = namespace
         self.id = id
-        if binary or (binary is None and self._data_is_binary(self.data)):
+        self._deconstructed = None
+        if binary is None and self.data is not None:
+            # the binary check and the extraction of the binary components
+            # are done in a single pass, and the result is kept for encode()
+            data, attachments = self._deconstruct_binary(self.data)
+            if attachments:
+                binary = True
+                self._deconstructed = (self.data, data, attachments)
+        if binary:
             if self.packet_type == EVENT:
                 self.packet_type = BINARY_EVENT
             elif self.packet_type == ACK:
@@ -49,26 +69,36 @@ class Packet(object):
         of packets where the first is the original packet with placeholders for
         the binary components and the remaining ones the binary attachments.
         """
-        encoded_packet = six.text_type(self.packet_type)
+        parts = [six.text_type(self.packet_type)]
         if self.packet_type == BINARY_EVENT or self.packet_type == BINARY_ACK:
-            data, attachments = self._deconstruct_binary(self.data)
-            encoded_packet += six.text_type(len(attachments)) + '-'
+            if self._deconstructed is not None and \
+                    self._deconstructed[0] is self.data:
+                data, attachments = self._deconstructed[1:]
+            else:
+                data, attachments = self._deconstruct_binary(self.data)
+            parts.append(six.text_type(len(attachments)))
+            parts.append('-')
         else:
             data = self.data
             attachments = None
         needs_comma = False
         if self.namespace is not None and self.namespace != '/':
-            encoded_packet += self.namespace
+            parts.append(self.namespace)
             needs_comma = True
         if self.id is not None:
             if needs_comma:
-                encoded_packet += ','
+                parts.append(',')
                 needs_comma = False
-            encoded_packet += six.text_type(self.id)
+            parts.append(six.text_type(self.id))
         if data is not None:
             if needs_comma:
-                encoded_packet += ','
-            encoded_packet += self.json.dumps(data, separators=(',', ':'))
+                parts.append(',')
+            payload = self._get_serializer().dumps(data)
+            if isinstance(payload, six.binary_type):
+                # Engine.IO text messages must be given as str
+                payload = payload.decode('utf-8')
+            parts.append(payload)
+        encoded_packet = ''.join(parts)
         if attachments is not None:
             encoded_packet = [encoded_packet] + attachments
         return encoded_packet
@@ -87,32 +117,53 @@ class Packet(object):
             ep = ''
         self.namespace = None
         self.data = None
-        ep = ep[1:]
-        dash = ep.find('-')
+        # the packet is parsed with a cursor, so that the only substrings
+        # created are the header fields and the payload
+        length = len(ep)
+        i = 1
         attachment_count = 0
-        if dash > 0 and ep[0:dash].isdigit():
-            attachment_count = int(ep[0:dash])
-            ep = ep[dash + 1:]
-        if ep and ep[0:1] == '/':
-            sep = ep.find(',')
+        j = self._skip_digits(ep, i, length)
+        if j > i and j < length and ep[j] == '-':
+            attachment_count = int(ep[i:j])
+            i = j + 1
+        if i < length and ep[i] == '/':
+            sep = ep.find(',', i)
             if sep == -1:
-                self.namespace = ep
-                ep = ''
+                self.namespace = ep[i:]
+                i = length
             else:
-                self.namespace = ep[0:sep]
-                ep = ep[sep + 1:]
+                self.namespace = ep[i:sep]
+                i = sep + 1
             q = self.namespace.find('?')
             if q != -1:
                 self.namespace = self.namespace[0:q]
-        if ep and ep[0].isdigit():
-            self.id = 0
-            while ep and ep[0].isdigit():
-                self.id = self.id * 10 + int(ep[0])
-                ep = ep[1:]
-        if ep:
-            self.data = self.json.loads(ep)
+        j = self._skip_digits(ep, i, length)
+        if j > i:
+            self.id = int(ep[i:j])
+            i = j
+        if i < length:
+            self.data = self._get_serializer().loads(ep[i:])
         return attachment_count
 
+    @staticmethod
+    def _skip_digits(ep, i, length):
+        """Return the position of the first non-digit character at or after
+        position ``i``."""
+        while i < length and ep[i] in '0123456789':
+            i += 1
+        return i
+
+    def _get_serializer(self):
+        """Return the serializer for the packet payload."""
+        if self.serializer is not None:
+            return self.serializer
+        try:
+            return _json_serializers[self.json]
+        except KeyError:
+            _json_serializers[self.json] = _serializer.JSONSerializer(
+                self.json)
+            return _json_serializers[self.json]
+
     def add_attachment(self, attachment):
         if self.attachment_count <= len(self.attachments):
             raise ValueError('Unexpected binary attachment')
@@ -150,30 +201,29 @@ class Packet(object):
         return data, attachments
 
     def _deconstruct_binary_internal(self, data, attachments):
+        # containers are only copied when they have binary components, so
+        # text only data is returned as is, without any allocations
         if isinstance(data, six.binary_type):
             attachments.append(data)
             return {'_placeholder': True, 'num': len(attachments) - 1}
         elif isinstance(data, list):
-            return [self._deconstruct_binary_internal(item, attachments)
-                    for item in data]
+            new_data = None
+            for i, item in enumerate(data):
+                new_item = self._deconstruct_binary_internal(item, attachments)
+                if new_item is not item:
+                    if new_data is None:
+                        new_data = list(data)
+                    new_data[i] = new_item
+            return data if new_data is None else new_data
         elif isinstance(data, dict):
-            return {key: self._deconstruct_binary_internal(value, attachments)
-                    for key, value in six.iteritems(data)}
+            new_data = None
+            for key, value in six.iteritems(data):
+                new_value = self._deconstruct_binary_internal(value,
+                                                              attachments)
+                if new_value is not value:
+                    if new_data is None:
+                        new_data = dict(data)
+                    new_data[key] = new_value
+            return data if new_data is None else new_data
         else:
             return data
-
-    def _data_is_binary(self, data):
-        """Check if the data contains binary components."""
-        if isinstance(data, six.binary_type):
-            return True
-        elif isinstance(data, list):
-            return functools.reduce(
-                lambda a, b: a or b, [self._data_is_binary(item)
-                                      for item in data], False)
-        elif isinstance(data, dict):
-            return functools.reduce(
-                lambda a, b: a or b, [self._data_is_binary(item)
-                                      for item in six.itervalues(data)],
-                False)
-        else:
-            return False
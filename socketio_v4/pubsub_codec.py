@@ -0,0 +1,116 @@
+import json
+import pickle
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+import six
+
+
+class PickleCodec(object):
+    """Pub/sub message codec based on pickle.
+
+    This is the codec used by default, since it can encode any payload, and
+    it is compatible with servers running older versions of this package.
+    Pickled messages start with the protocol opcode, so they do not need an
+    additional format header.
+    """
+    name = 'pickle'
+    format = b'\x80'
+
+    def encode(self, message):
+        return pickle.dumps(message, protocol=2)
+
+    def decode(self, data):
+        return pickle.loads(data)
+
+
+class JSONCodec(object):
+    """Pub/sub message codec based on compact JSON.
+
+    Binary payloads cannot be encoded with this codec, and tuples are
+    received as lists.
+    """
+    name = 'json'
+    format = b'\x01'
+    encoder = json.JSONEncoder(separators=(',', ':'))
+
+    def encode(self, message):
+        return self.format + self.encoder.encode(message).encode('utf-8')
+
+    def decode(self, data):
+        return json.loads(data[1:].decode('utf-8'))
+
+
+class MsgPackCodec(object):
+    """Pub/sub message codec based on
+    `msgpack <https://msgpack.org/>`_.
+
+    Tuples are received as lists.
+    """
+    name = 'msgpack'
+    format = b'\x02'
+
+    def __init__(self):
+        if msgpack is None:
+            raise RuntimeError('msgpack package is not installed '
+                               '(Run "pip install msgpack" in your '
+                               'virtualenv).')
+
+    def encode(self, message):
+        return self.format + msgpack.packb(message, use_bin_type=True)
+
+    def decode(self, data):
+        return msgpack.unpackb(data[1:], raw=False)
+
+
+codecs = {codec.name: codec for codec in [PickleCodec, JSONCodec,
+                                          MsgPackCodec]}
+_decoders = {}
+
+
+def get_codec(codec):
+    """Return a codec instance given its name or the instance itself."""
+    if isinstance(codec, six.string_types):
+        try:
+            return codecs[codec]()
+        except KeyError:
+            raise ValueError('Unknown pub/sub codec: ' + codec)
+    return codec
+
+
+def decode(data, accept_pickle=False, codec=None):
+    """Decode a message received from the pub/sub backend.
+
+    The first byte of the message identifies the codec that was used to
+    encode it, so the message is decoded in a single attempt. If ``codec`` is
+    given, messages that start with its ``format`` byte are decoded with it,
+    and if it does not define a ``format`` all messages are decoded with it.
+    Other messages are decoded with the built-in codec that matches their
+    first byte. Messages that start with ``{`` are assumed to be JSON without
+    a format header, as published by external processes. Pickled messages are
+    only decoded when ``accept_pickle`` is ``True`` or ``codec`` is a pickle
+    codec. If the message cannot be decoded, ``None`` is returned.
+    """
+    if isinstance(data, dict):
+        return data
+    try:
+        if codec is not None:
+            codec_format = getattr(codec, 'format', None)
+            if codec_format is None or data[0:1] == codec_format:
+                return codec.decode(data)
+        if isinstance(data, six.text_type):
+            return json.loads(data)
+        header = data[0:1]
+        if header == b'{':
+            return json.loads(data.decode('utf-8'))
+        if header == PickleCodec.format and not accept_pickle:
+            return None
+        if header not in _decoders:
+            for builtin_codec in six.itervalues(codecs):
+                if builtin_codec.format == header:
+                    _decoders[header] = builtin_codec()
+        return _decoders[header].decode(data)
+    except Exception:
+        return None
@@ -1,14 +1,12 @@
 from functools import partial
 import uuid
 
-import json
-import pickle
-import six
-
+from . import pubsub_codec
 from .base_manager import BaseManager
+from .pubsub_routing import PubSubRouting
 
 
-class PubSubManager(BaseManager):
+class PubSubManager(PubSubRouting, BaseManager):
     """Manage a client list attached to a pub/sub backend.
 
     This is a base class that enables multiple servers to share the list of
@@ -21,20 +19,74 @@ class PubSubManager(BaseManager):
 
     :param channel: The channel name on which the server sends and receives
                     notifications.
+    :param codec: The codec used to encode the messages sent through the
+                  pub/sub backend. It can be ``'pickle'``, ``'json'`` or
+                  ``'msgpack'``, or a custom codec instance. The default is
+                  ``'pickle'``. All the servers must use the same codec.
+    :param shards: The number of sub-channels used to route the messages that
+                   are addressed to a room. When set, each server only
+                   subscribes to the sub-channels of the rooms that have local
+                   participants, so it does not receive messages for rooms
+                   that are hosted entirely in other servers. The default of
+                   ``0`` sends all the messages on the main channel. All the
+                   servers must use the same number of shards, and the
+                   backend must support routing. The room named after each
+                   client counts as a room with local participants.
+    :param unicast: If set to ``True``, the servers announce the clients that
+                    connect to them, and messages addressed to a single
+                    client are published on the private channel of the
+                    server that hosts it, instead of being received by all
+                    the servers. Messages for clients that are not in the
+                    directory are sent as usual. The backend must support
+                    routing.
+    :param forward_encoded: If set to ``True``, events without a callback are
+                            encoded once by the server that emits them, and
+                            the receiving servers forward the encoded packets
+                            to their clients without encoding them again.
+                            Servers running releases that predate this option
+                            cannot handle these messages, so it must only be
+                            enabled once all the servers have been upgraded.
+                            The default is ``False``.
+    :param host_timeout: The time in seconds after which the clients of a
+                         server that stopped sending heartbeats are removed
+                         from the directory of clients used by ``unicast``.
+                         Each server sends a heartbeat every third of this
+                         time. The default is ``60``. Set to ``0`` to keep the
+                         clients in the directory until they disconnect.
     """
+    supports_routing = False
     name = 'pubsub'
 
-    def __init__(self, channel='socketio_v4', write_only=False, logger=None):
+    def __init__(self, channel='socketio_v4', write_only=False, logger=None,
+                 codec='pickle', shards=0, unicast=False,
+                 forward_encoded=False, host_timeout=60):
         super(PubSubManager, self).__init__()
         self.channel = channel
         self.write_only = write_only
         self.host_id = uuid.uuid4().hex
         self.logger = logger
+        self.codec = pubsub_codec.get_codec(codec)
+        if (shards or unicast) and not self.supports_routing:
+            raise ValueError('The {} backend does not support '
+                             'routing'.format(self.name))
+        self.shards = shards
+        self.room_channels = {}
+        self.unicast = unicast
+        self.sid_hosts = {}
+        self.host_sids = {}
+        self.hosts_seen = {}
+        self.host_timeout = host_timeout
+        self.forward_encoded = forward_encoded
+        self.pubsub_log = None
 
     def initialize(self):
         super(PubSubManager, self).initialize()
+        self.pubsub_log = self._get_log('pubsub')
         if not self.write_only:
             self.thread = self.server.start_background_task(self._thread)
+        if self._get_heartbeat_interval():
+            self.heartbeat = self.server.start_background_task(
+                self._heartbeat_thread)
         self._get_logger().info(self.name + ' backend initialized.')
 
     def emit(self, event, data, namespace=None, room=None, skip_sid=None,
@@ -60,12 +112,54 @@ class PubSubManager(BaseManager):
                 raise ValueError('Cannot use callback without a room set.')
             id = self._generate_ack_id(room, namespace, callback)
             callback = (room, namespace, id)
+        message = {'method': 'emit', 'event': event, 'namespace': namespace,
+                   'room': room, 'skip_sid': skip_sid, 'callback': callback,
+                   'host_id': self.host_id}
+        if self.forward_encoded and callback is None and \
+                self.server is not None:
+            # the packet is encoded only once, here, and the receiving
+            # servers forward it to their clients as it is
+            message['packet'] = self.server._event_packet(
+                event, data, namespace).encode()
         else:
-            callback = None
-        self._publish({'method': 'emit', 'event': event, 'data': data,
-                       'namespace': namespace, 'room': room,
-                       'skip_sid': skip_sid, 'callback': callback,
-                       'host_id': self.host_id})
+            message['data'] = data
+        self._publish_to_room(message, namespace, room)
+
+    def emit_many(self, events, namespace=None, skip_sid=None, **kwargs):
+        """Emit a batch of events to their recipients.
+
+        The whole batch is propagated to all the servers that are connected
+        through the message queue as a single message.
+
+        The parameters are the same as in :meth:`.Server.emit_many`.
+        """
+        if kwargs.get('ignore_queue'):
+            return super(PubSubManager, self).emit_many(
+                events, namespace=namespace, skip_sid=skip_sid)
+        namespace = namespace or '/'
+        message = {'method': 'emit_many', 'namespace': namespace,
+                   'skip_sid': skip_sid, 'host_id': self.host_id}
+        if self.forward_encoded and self.server is not None:
+            message['packets'] = [
+                (self.server._event_packet(event, data, namespace).encode(),
+                 room) for event, data, room in events]
+        else:
+            message['events'] = list(events)
+        if not self.shards and not self.unicast:
+            return self._publish(message)
+        # the events are grouped by sub-channel, so that each batch is only
+        # received by the servers that host its rooms
+        key = 'packets' if 'packets' in message else 'events'
+        batches = {}
+        for item in message[key]:
+            channel = self._get_target_channel(namespace, item[-1])
+            if channel not in batches:
+                batches[channel] = []
+            batches[channel].append(item)
+        for channel, items in batches.items():
+            batch = dict(message)
+            batch[key] = items
+            self._publish_to_channel(batch, channel)
 
     def can_disconnect(self, sid, namespace):
         if self.is_connected(sid, namespace):
@@ -73,12 +167,94 @@ class PubSubManager(BaseManager):
             return super().can_disconnect(sid, namespace)
         else:
             # client is in another server, so we post request to the queue
-            self._publish({'method': 'disconnect', 'sid': sid,
-                           'namespace': namespace or '/'})
+            namespace = namespace or '/'
+            self._publish_to_room({'method': 'disconnect', 'sid': sid,
+                                   'namespace': namespace}, namespace, sid)
 
     def close_room(self, room, namespace=None):
-        self._publish({'method': 'close_room', 'room': room,
-                       'namespace': namespace or '/'})
+        namespace = namespace or '/'
+        self._publish_to_room({'method': 'close_room', 'room': room,
+                               'namespace': namespace}, namespace, room)
+
+    def connect(self, sid, namespace):
+        announce = self.unicast and not self._is_local(sid)
+        super(PubSubManager, self).connect(sid, namespace)
+        if announce:
+            message = {'method': 'connected', 'sid': sid,
+                       'host_id': self.host_id}
+            self._publish(message)
+
+    def disconnect(self, sid, namespace):
+        announce = self.unicast and self._is_local(sid)
+        super(PubSubManager, self).disconnect(sid, namespace)
+        if announce and not self._is_local(sid):
+            message = {'method': 'disconnected', 'sid': sid,
+                       'host_id': self.host_id}
+            self._publish(message)
+
+    def enter_room(self, sid, namespace, room):
+        if self._is_routed_room(room) and \
+                room not in self.rooms.get(namespace, {}):
+            # first local participant in the room
+            self._add_room_channel(namespace, room)
+        super(PubSubManager, self).enter_room(sid, namespace, room)
+
+    def leave_room(self, sid, namespace, room):
+        if self._is_routed_room(room) and \
+                self.rooms.get(namespace, {}).get(room) == {sid: True}:
+            # last local participant in the room
+            self._remove_room_channel(namespace, room)
+        super(PubSubManager, self).leave_room(sid, namespace, room)
+
+    def _request_directory(self):
+        """Ask the other servers for the clients they host.
+
+        Backends that support routing invoke this method once the private
+        channel of this server is subscribed.
+        """
+        self._publish({'method': 'directory', 'host_id': self.host_id})
+
+    def _add_room_channel(self, namespace, room):
+        channel = self._get_room_channel(namespace, room)
+        self.room_channels[channel] = self.room_channels.get(channel, 0) + 1
+        if self.room_channels[channel] == 1:
+            self._subscribe(channel)
+
+    def _remove_room_channel(self, namespace, room):
+        channel = self._get_room_channel(namespace, room)
+        if channel not in self.room_channels:
+            return
+        self.room_channels[channel] -= 1
+        if self.room_channels[channel] == 0:
+            del self.room_channels[channel]
+            self._unsubscribe(channel)
+
+    def _publish_to_room(self, data, namespace, room):
+        """Publish a message addressed to a room, on the sub-channel of the
+        room when routing is enabled."""
+        self._publish_to_channel(
+            data, self._get_target_channel(namespace, room))
+
+    def _publish_to_channel(self, data, channel):
+        if channel is None:
+            return self._publish(data)
+        return self._publish(data, channel=channel)
+
+    def _encode_message(self, data):
+        """Encode a message for the pub/sub backend with the configured
+        codec."""
+        return self.codec.encode(data)
+
+    def _decode_message(self, message):
+        """Decode a message received from the pub/sub backend.
+
+        Messages in the format of the configured codec are decoded with it,
+        while the messages in other formats are decoded with the matching
+        built-in codec. Pickled messages are only accepted when the configured
+        codec is pickle. ``None`` is returned for messages that cannot be
+        decoded.
+        """
+        return pubsub_codec.decode(message, codec=self.codec)
 
     def _publish(self, data):
         """Publish a message on the Socket.IO channel.
@@ -89,6 +265,25 @@ class PubSubManager(BaseManager):
         raise NotImplementedError('This method must be implemented in a '
                                   'subclass.')  # pragma: no cover
 
+    def _subscribe(self, channel):
+        """Start receiving the messages published on a sub-channel.
+
+        This method needs to be implemented by the subclasses that support
+        routing. Their ``_publish()`` method must also accept a ``channel``
+        argument.
+        """
+        raise NotImplementedError('This method must be implemented in a '
+                                  'subclass.')  # pragma: no cover
+
+    def _unsubscribe(self, channel):
+        """Stop receiving the messages published on a sub-channel.
+
+        This method needs to be implemented by the subclasses that support
+        routing.
+        """
+        raise NotImplementedError('This method must be implemented in a '
+                                  'subclass.')  # pragma: no cover
+
     def _listen(self):
         """Return the next message published on the Socket.IO channel,
         blocking until a message is available.
@@ -110,12 +305,27 @@ class PubSubManager(BaseManager):
                                *remote_callback)
         else:
             callback = None
+        if 'packet' in message:
+            super(PubSubManager, self).emit_encoded(
+                message['packet'], namespace=message.get('namespace'),
+                room=message.get('room'), skip_sid=message.get('skip_sid'))
+            return
         super(PubSubManager, self).emit(message['event'], message['data'],
                                         namespace=message.get('namespace'),
                                         room=message.get('room'),
                                         skip_sid=message.get('skip_sid'),
                                         callback=callback)
 
+    def _handle_emit_many(self, message):
+        if 'packets' in message:
+            super(PubSubManager, self).emit_many_encoded(
+                message['packets'], namespace=message.get('namespace'),
+                skip_sid=message.get('skip_sid'))
+            return
+        super(PubSubManager, self).emit_many(
+            message['events'], namespace=message.get('namespace'),
+            skip_sid=message.get('skip_sid'))
+
     def _handle_callback(self, message):
         if self.host_id == message.get('host_id'):
             try:
@@ -130,43 +340,65 @@ class PubSubManager(BaseManager):
     def _return_callback(self, host_id, sid, namespace, callback_id, *args):
         # When an event callback is received, the callback is returned back
         # the sender, which is identified by the host_id
-        self._publish({'method': 'callback', 'host_id': host_id,
-                       'sid': sid, 'namespace': namespace, 'id': callback_id,
-                       'args': args})
+        message = {'method': 'callback', 'host_id': host_id, 'sid': sid,
+                   'namespace': namespace, 'id': callback_id, 'args': args}
+        if self.unicast:
+            self._publish_to_channel(message,
+                                     self._get_host_channel(host_id))
+        else:
+            self._publish(message)
 
     def _handle_disconnect(self, message):
         self.server.disconnect(sid=message.get('sid'),
                                namespace=message.get('namespace'),
                                ignore_queue=True)
 
+    def _handle_directory(self, message):
+        # a server that just subscribed asks for the clients of the other
+        # servers, to fill its directory
+        host_id = message.get('host_id')
+        sids = self._get_local_sids()
+        if not self.unicast or host_id is None or host_id == self.host_id \
+                or not sids:
+            return
+        self._publish_to_channel(
+            {'method': 'connected', 'sids': list(sids),
+             'host_id': self.host_id}, self._get_host_channel(host_id))
+
     def _handle_close_room(self, message):
         super(PubSubManager, self).close_room(
             room=message.get('room'), namespace=message.get('namespace'))
 
+    def _heartbeat_thread(self):
+        """Let the other servers know that this server is alive, and remove
+        from the directory the clients of the servers that are not."""
+        interval = self._get_heartbeat_interval()
+        while True:
+            self.server.sleep(interval)
+            self._publish({'method': 'alive', 'host_id': self.host_id})
+            self._expire_hosts()
+
     def _thread(self):
         for message in self._listen():
-            data = None
-            if isinstance(message, dict):
-                data = message
-            else:
-                if isinstance(message, six.binary_type):  # pragma: no cover
-                    try:
-                        data = pickle.loads(message)
-                    except:
-                        pass
-                if data is None:
-                    try:
-                        data = json.loads(message)
-                    except:
-                        pass
+            data = self._decode_message(message)
             if data and 'method' in data:
-                self._get_logger().info('pubsub message: {}'.format(
-                    data['method']))
+                if self.pubsub_log:
+                    self.pubsub_log('pubsub message: %s', data['method'])
                 if data['method'] == 'emit':
                     self._handle_emit(data)
+                elif data['method'] == 'emit_many':
+                    self._handle_emit_many(data)
                 elif data['method'] == 'callback':
                     self._handle_callback(data)
                 elif data['method'] == 'disconnect':
                     self._handle_disconnect(data)
                 elif data['method'] == 'close_room':
                     self._handle_close_room(data)
+                elif data['method'] == 'connected':
+                    self._handle_connected(data)
+                elif data['method'] == 'disconnected':
+                    self._handle_disconnected(data)
+                elif data['method'] == 'alive':
+                    self._handle_alive(data)
+                elif data['method'] == 'directory':
+                    self._handle_directory(data)
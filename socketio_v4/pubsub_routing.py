@@ -0,0 +1,127 @@
+import time
+import zlib
+
+
+class PubSubRouting(object):
+    """Routing of the messages exchanged by the pub/sub managers.
+
+    This class holds the parts of the ``shards`` and ``unicast`` options that
+    do not depend on the backend, and that are shared by
+    :class:`PubSubManager` and :class:`AsyncPubSubManager`. It expects the
+    ``channel``, ``host_id``, ``shards``, ``unicast``, ``write_only``,
+    ``sid_hosts``, ``host_sids``, ``hosts_seen`` and ``host_timeout``
+    attributes to be set by the manager.
+    """
+    def _is_routed_room(self, room):
+        """Check if the sub-channel of a room needs to be subscribed when a
+        client enters or leaves it.
+
+        The room named after a client is also routed when ``unicast`` is
+        set, since the servers that do not have the client in their
+        directory yet publish the messages for it on its sub-channel.
+        """
+        return bool(self.shards) and not self.write_only and room is not None
+
+    def _get_local_sids(self):
+        """Return the clients connected to this server in any namespace."""
+        sids = set()
+        for namespace_sids in self.sid_rooms.values():
+            sids.update(namespace_sids)
+        return sids
+
+    def _is_local(self, sid):
+        """Check if a client is connected to this server in any
+        namespace."""
+        for sids in self.sid_rooms.values():
+            if sid in sids:
+                return True
+        return False
+
+    def _get_subscriptions(self):
+        """Return the list of channels the server needs to listen on."""
+        channels = [self.channel]
+        if self.unicast:
+            channels.append(self._get_host_channel(self.host_id))
+        return channels + list(self.room_channels)
+
+    def _get_host_channel(self, host_id):
+        """Return the private channel of a server."""
+        return '{}@{}'.format(self.channel, host_id)
+
+    def _get_target_channel(self, namespace, room):
+        """Return the channel on which a message addressed to a room is
+        published, or ``None`` for the main channel.
+
+        Rooms that are named after a client are sent to the private channel
+        of the server that hosts the client, when it is known. The other
+        rooms, and clients that are not in the directory, use the sub-channel
+        of the room.
+        """
+        if self.unicast and room is not None:
+            if room in self.sid_hosts:
+                return self._get_host_channel(self.sid_hosts[room])
+            if self._is_local(room):
+                return self._get_host_channel(self.host_id)
+        return self._get_room_channel(namespace, room)
+
+    def _get_room_channel(self, namespace, room):
+        """Return the sub-channel that carries the messages addressed to a
+        room, or ``None`` if they are sent on the main channel."""
+        if not self.shards or room is None:
+            return None
+        key = u'{}\x00{}'.format(namespace, room).encode('utf-8')
+        return '{}#{}'.format(self.channel, zlib.crc32(key) % self.shards)
+
+    def _get_heartbeat_interval(self):
+        """Return the time in seconds between the heartbeats of this server,
+        or ``None`` if it does not send them."""
+        if not self.unicast or self.write_only or not self.host_timeout:
+            return None
+        return self.host_timeout / 3.0
+
+    def _handle_connected(self, message):
+        host_id = message.get('host_id')
+        if host_id == self.host_id:
+            return
+        for sid in message.get('sids') or [message['sid']]:
+            self._forget_sid(sid)
+            self.sid_hosts[sid] = host_id
+            self.host_sids.setdefault(host_id, set()).add(sid)
+        self.hosts_seen[host_id] = time.time()
+
+    def _handle_disconnected(self, message):
+        if self.sid_hosts.get(message['sid']) == message.get('host_id'):
+            self._forget_sid(message['sid'])
+
+    def _handle_alive(self, message):
+        # only the servers that have clients in the directory are tracked
+        host_id = message.get('host_id')
+        if host_id in self.host_sids:
+            self.hosts_seen[host_id] = time.time()
+
+    def _forget_sid(self, sid):
+        """Remove a client from the directory."""
+        host_id = self.sid_hosts.pop(sid, None)
+        if host_id is None:
+            return
+        sids = self.host_sids.get(host_id)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self.host_sids[host_id]
+                self.hosts_seen.pop(host_id, None)
+
+    def _expire_hosts(self):
+        """Remove from the directory the clients of the servers that have
+        not sent a heartbeat within ``host_timeout`` seconds.
+
+        Messages for these clients are then sent on the sub-channels of
+        their rooms, as for clients that were never announced.
+        """
+        deadline = time.time() - self.host_timeout
+        for host_id, seen in list(self.hosts_seen.items()):
+            if seen < deadline:
+                for sid in self.host_sids.pop(host_id, ()):
+                    if self.sid_hosts.get(sid) == host_id:
+                        del self.sid_hosts[sid]
+                del self.hosts_seen[host_id]
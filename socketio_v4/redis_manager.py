@@ -1,11 +1,12 @@
 import logging
-import pickle
+import threading
 import time
 
 try:
     import redis
 except ImportError:
     redis = None
+from six.moves import queue
 
 from .pubsub_manager import PubSubManager
 
@@ -33,13 +34,50 @@ class RedisManager(PubSubManager):  # pragma: no cover
     :param write_only: If set ot ``True``, only initialize to emit events. The
                        default of ``False`` initializes the class for emitting
                        and receiving.
+    :param codec: The codec used to encode the messages sent to the other
+                  servers. Can be ``'pickle'`` (the default), ``'json'`` or
+                  ``'msgpack'``. Must be the same in all the servers.
+    :param forward_encoded: If set to ``True``, events without a callback
+                            are encoded once by the server that emits them,
+                            and the receiving servers forward the encoded
+                            packets to their clients. Servers running older
+                            releases cannot handle these messages, so this
+                            option must only be enabled once all the servers
+                            have been upgraded. The default is ``False``.
+    :param shards: The number of sub-channels used to route the messages
+                   addressed to rooms, so that each server only receives the
+                   messages for rooms that have local participants. The
+                   default of ``0`` disables routing.
+    :param unicast: If set to ``True``, messages addressed to a single client
+                    are only sent to the server that hosts it.
+    :param host_timeout: The time in seconds after which the clients of a
+                         server that stopped sending heartbeats are removed
+                         from the directory used by ``unicast``. The default
+                         is ``60``, and ``0`` disables the expiration.
     :param redis_options: additional keyword arguments to be passed to
                           ``Redis.from_url()``.
+    :param publish_queue_size: The size of the queue of outgoing messages.
+                               When set, messages are published by a
+                               background task, so that emitting does not
+                               wait for Redis, and messages that arrive when
+                               the queue is full are dropped. The default of
+                               ``0`` publishes each message synchronously.
+    :param publish_batch_size: The maximum number of queued messages that are
+                               published together in a single Redis pipeline.
+    :param publish_max_delay: The time in seconds the background publisher
+                              waits for more messages to fill a batch. The
+                              default of ``0`` publishes the messages that are
+                              already queued without waiting.
     """
     name = 'redis'
+    supports_routing = True
 
     def __init__(self, url='redis://localhost:6379/0', channel='socketio_v4',
-                 write_only=False, logger=None, redis_options=None):
+                 write_only=False, logger=None, redis_options=None,
+                 codec='pickle', shards=0, unicast=False,
+                 publish_queue_size=0, publish_batch_size=100,
+                 publish_max_delay=0, forward_encoded=False,
+                 host_timeout=60):
         if redis is None:
             raise RuntimeError('Redis package is not installed '
                                '(Run "pip install redis" in your '
@@ -47,9 +85,21 @@ class RedisManager(PubSubManager):  # pragma: no cover
         self.redis_url = url
         self.redis_options = redis_options or {}
         self._redis_connect()
+        self._pubsub_connect()
+        self.publish_queue_size = publish_queue_size
+        self.publish_batch_size = publish_batch_size
+        self.publish_max_delay = publish_max_delay
+        self.publish_queue = None
+        self.publisher = None
+        self.publisher_lock = threading.Lock()
+        self.publisher_stats = {'published': 0, 'batches': 0, 'dropped': 0}
+        self.unpublished = 0
         super(RedisManager, self).__init__(channel=channel,
                                            write_only=write_only,
-                                           logger=logger)
+                                           logger=logger, codec=codec,
+                                           shards=shards, unicast=unicast,
+                                           forward_encoded=forward_encoded,
+                                           host_timeout=host_timeout)
 
     def initialize(self):
         super(RedisManager, self).initialize()
@@ -69,15 +119,47 @@ class RedisManager(PubSubManager):  # pragma: no cover
     def _redis_connect(self):
         self.redis = redis.Redis.from_url(self.redis_url,
                                           **self.redis_options)
-        self.pubsub = self.redis.pubsub()
 
-    def _publish(self, data):
+    def _pubsub_connect(self):
+        # the listener has its own connection, so that reconnecting the
+        # publisher does not move the subscriptions to a pubsub object that
+        # nobody reads
+        self.pubsub = redis.Redis.from_url(
+            self.redis_url, **self.redis_options).pubsub()
+
+    def get_publisher_stats(self):
+        """Return the statistics of the background publisher.
+
+        The returned dictionary has the number of messages waiting in the
+        queue, and the number of messages published, of pipelines executed
+        and of messages dropped.
+        """
+        stats = dict(self.publisher_stats)
+        stats['queued'] = self.publish_queue.qsize() \
+            if self.publish_queue is not None else 0
+        return stats
+
+    def flush(self):
+        """Wait until all the queued messages are published.
+
+        This is useful in processes that emit through a queued publisher
+        and then exit.
+        """
+        sleep = self.server.sleep if self.server is not None else time.sleep
+        while self.unpublished > 0:
+            sleep(0.01)
+
+    def _publish(self, data, channel=None):
+        if self.publish_queue_size:
+            return self._enqueue(channel or self.channel,
+                                 self._encode_message(data))
         retry = True
         while True:
             try:
                 if not retry:
                     self._redis_connect()
-                return self.redis.publish(self.channel, pickle.dumps(data))
+                return self.redis.publish(channel or self.channel,
+                                          self._encode_message(data))
             except redis.exceptions.ConnectionError:
                 if retry:
                     logger.error('Cannot publish to redis... retrying')
@@ -86,14 +168,96 @@ class RedisManager(PubSubManager):  # pragma: no cover
                     logger.error('Cannot publish to redis... giving up')
                     break
 
+    def _start_publisher(self):
+        if self.server is not None:
+            self.publish_queue = self.server.eio.create_queue(
+                self.publish_queue_size)
+            self.queue_empty = self.server.eio.get_queue_empty_exception()
+            self.publisher = self.server.start_background_task(
+                self._publisher_thread)
+        else:
+            # standalone emitter, not attached to a server
+            self.publish_queue = queue.Queue(self.publish_queue_size)
+            self.queue_empty = queue.Empty
+            self.publisher = threading.Thread(target=self._publisher_thread)
+            self.publisher.daemon = True
+            self.publisher.start()
+
+    def _enqueue(self, channel, message):
+        with self.publisher_lock:
+            if self.publish_queue is None:
+                self._start_publisher()
+            try:
+                self.publish_queue.put((channel, message), block=False)
+            except Exception:  # the queue is full
+                self.publisher_stats['dropped'] += 1
+                logger.warning('Redis publish queue is full, dropping '
+                               'message')
+                return
+            self.unpublished += 1
+
+    def _publisher_thread(self):
+        while True:
+            batch = [self.publish_queue.get()]
+            deadline = time.time() + self.publish_max_delay
+            while len(batch) < self.publish_batch_size:
+                timeout = deadline - time.time()
+                try:
+                    if timeout > 0:
+                        batch.append(self.publish_queue.get(timeout=timeout))
+                    else:
+                        batch.append(self.publish_queue.get(block=False))
+                except self.queue_empty:
+                    break
+            self._publish_batch(batch)
+            with self.publisher_lock:
+                self.unpublished -= len(batch)
+
+    def _publish_batch(self, batch):
+        """Publish a batch of messages in a single Redis round trip."""
+        retry = True
+        while True:
+            try:
+                if not retry:
+                    self._redis_connect()
+                pipeline = self.redis.pipeline(transaction=False)
+                for channel, message in batch:
+                    pipeline.publish(channel, message)
+                pipeline.execute()
+                self.publisher_stats['published'] += len(batch)
+                self.publisher_stats['batches'] += 1
+                return
+            except redis.exceptions.ConnectionError:
+                if retry:
+                    logger.error('Cannot publish to redis... retrying')
+                    retry = False
+                else:
+                    logger.error('Cannot publish to redis... giving up')
+                    self.publisher_stats['dropped'] += len(batch)
+                    return
+
+    def _subscribe(self, channel):
+        try:
+            self.pubsub.subscribe(channel)
+        except redis.exceptions.ConnectionError:
+            # the listener subscribes to all the room channels again when it
+            # reconnects
+            logger.error('Cannot subscribe to redis channel ' + channel)
+
+    def _unsubscribe(self, channel):
+        try:
+            self.pubsub.unsubscribe(channel)
+        except redis.exceptions.ConnectionError:
+            logger.error('Cannot unsubscribe from redis channel ' + channel)
+
     def _redis_listen_with_retries(self):
         retry_sleep = 1
         connect = False
         while True:
             try:
                 if connect:
-                    self._redis_connect()
-                    self.pubsub.subscribe(self.channel)
+                    self._pubsub_connect()
+                    self.pubsub.subscribe(*self._get_subscriptions())
                 for message in self.pubsub.listen():
                     yield message
             except redis.exceptions.ConnectionError:
@@ -107,9 +271,18 @@ class RedisManager(PubSubManager):  # pragma: no cover
 
     def _listen(self):
         channel = self.channel.encode('utf-8')
-        self.pubsub.subscribe(self.channel)
+        # room and host channels are named after the main channel
+        prefixes = (channel + b'#', channel + b'@')
+        host_channel = self._get_host_channel(self.host_id).encode('utf-8')
+        self.pubsub.subscribe(*self._get_subscriptions())
         for message in self._redis_listen_with_retries():
-            if message['channel'] == channel and \
+            if message['type'] == 'subscribe' and \
+                    message['channel'] == host_channel:
+                # also confirmed again after a reconnection, when the
+                # directory may have missed announcements
+                self._request_directory()
+            elif (message['channel'] == channel
+                    or message['channel'].startswith(prefixes)) and \
                     message['type'] == 'message' and 'data' in message:
                 yield message['data']
         self.pubsub.unsubscribe(self.channel)
@@ -0,0 +1,50 @@
+import json as _json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONSerializer(object):
+    """Packet serializer based on a json module.
+
+    A serializer is an object with ``dumps`` and ``loads`` methods. The
+    ``dumps`` method receives the payload of a packet and returns it
+    serialized, either as a ``str`` or as UTF-8 encoded ``bytes``. The
+    ``loads`` method receives a serialized payload and returns the decoded
+    data.
+
+    :param json: The json module to use. Custom json modules must have
+                 ``dumps`` and ``loads`` functions that are compatible with
+                 the standard library versions. The default is the standard
+                 library ``json`` module.
+    """
+    def __init__(self, json=None):
+        self.json = json or _json
+        if self.json is _json:
+            # the encoder instance is created once and reused, instead of
+            # letting json.dumps() build a new one on every call
+            self.dumps = _json.JSONEncoder(separators=(',', ':')).encode
+        self.loads = self.json.loads
+
+    def dumps(self, data):
+        return self.json.dumps(data, separators=(',', ':'))
+
+
+class OrjsonSerializer(object):
+    """Packet serializer based on the `orjson <https://github.com/ijl/orjson>`_
+    package.
+
+    To use this serializer, initialize the :class:`Server` or :class:`Client`
+    instance as follows::
+
+        sio = socketio_v4.Server(serializer=socketio_v4.OrjsonSerializer())
+    """
+    def __init__(self):
+        if orjson is None:
+            raise RuntimeError('orjson package is not installed '
+                               '(Run "pip install orjson" in your '
+                               'virtualenv).')
+        self.dumps = orjson.dumps
+        self.loads = orjson.loads
@@ -4,7 +4,9 @@ import engineio_v3
 import six
 
 from . import base_manager
+from . import dispatcher
 from . import exceptions
+from . import instrumentation
 from . import namespace
 from . import packet
 
@@ -35,10 +37,33 @@ class Server(object):
                  packets. Custom json modules must have ``dumps`` and ``loads``
                  functions that are compatible with the standard library
                  versions.
+    :param serializer: An alternative serializer to use for encoding and
+                       decoding packet payloads, such as
+                       :class:`OrjsonSerializer`. When this is given, the
+                       ``json`` argument is only used by Engine.IO.
     :param async_handlers: If set to ``True``, event handlers for a client are
                            executed in separate threads. To run handlers for a
                            client synchronously, set to ``False``. The default
                            is ``True``.
+    :param handler_workers: When ``async_handlers`` is ``True``, the number of
+                            worker threads that run the event handlers. The
+                            events of different clients are handled in
+                            parallel, while the events of a client are
+                            handled one at a time, in the order they were
+                            received. The default of ``None`` starts a new
+                            thread for each event.
+    :param handler_queue_size: The maximum number of events waiting for a
+                               handler worker. The default is 1000.
+    :param handler_overflow: What to do when an event arrives and the maximum
+                             number of events are waiting. Use ``'block'`` (the
+                             default) to stop reading from the client until
+                             there is room in the queue, ``'drop'`` to
+                             discard the event, or ``'disconnect'`` to discard
+                             the event and disconnect the client.
+    :param handler_ordering: With ``handler_workers``, use ``'client'`` (the
+                             default) to handle all the events of a client in
+                             order, or ``'namespace'`` to only keep the order
+                             of the events of a client in each namespace.
     :param always_connect: When set to ``False``, new connections are
                            provisory until the connect handler returns
                            something other than ``False``, at which point they
@@ -49,6 +74,24 @@ class Server(object):
                            connect handler and your client is confused when it
                            receives events before the connection acceptance.
                            In any other case use the default of ``False``.
+    :param text_only: Set to ``True`` if the application never emits binary
+                      payloads. This skips the inspection of outgoing
+                      payloads looking for binary components, which makes
+                      emitting large payloads faster. The default is
+                      ``False``.
+    :param log_categories: The categories of activity that are logged when
+                           logging is enabled. The available categories are
+                           ``'emit'``, ``'receive'``, ``'rooms'`` and
+                           ``'pubsub'``. The default is to log all of them.
+    :param log_sample_rates: A dictionary with the fraction of the messages of
+                             each category that are logged, as a number
+                             between 0 and 1. The default is to log all the
+                             messages.
+    :param callback_timeout: The time in seconds after which the callbacks of
+                             emitted events that were not acknowledged by the
+                             client are discarded. The default of ``None``
+                             keeps the callbacks until they are acknowledged
+                             or the client disconnects.
     :param kwargs: Connection parameters for the underlying Engine.IO server.
 
     The Engine.IO configuration supports the following settings:
@@ -99,7 +142,10 @@ class Server(object):
     """
     def __init__(self, client_manager=None, logger=False, binary=False,
                  json=None, async_handlers=True, always_connect=False,
-                 **kwargs):
+                 text_only=False, serializer=None, callback_timeout=None,
+                 handler_workers=None, handler_queue_size=1000,
+                 handler_overflow='block', handler_ordering='client',
+                 log_categories=None, log_sample_rates=None, **kwargs):
         engineio_v3_options = kwargs
         engineio_v3_logger = engineio_v3_options.pop('engineio_v3_logger', None)
         if engineio_v3_logger is not None:
@@ -107,6 +153,8 @@ class Server(object):
         if json is not None:
             packet.Packet.json = json
             engineio_v3_options['json'] = json
+        if serializer is not None:
+            packet.Packet.serializer = serializer
         engineio_v3_options['async_handlers'] = False
         self.eio = self._engineio_v3_server_class()(**engineio_v3_options)
         self.eio.on('connect', self._handle_eio_connect)
@@ -117,6 +165,7 @@ class Server(object):
         self.environ = {}
         self.handlers = {}
         self.namespace_handlers = {}
+        self._event_table = {}
 
         self._binary_packet = {}
 
@@ -131,15 +180,26 @@ class Server(object):
                 else:
                     self.logger.setLevel(logging.ERROR)
                 self.logger.addHandler(logging.StreamHandler())
+        self.log = instrumentation.Instrumentation(
+            self.logger, categories=log_categories,
+            sample_rates=log_sample_rates)
 
         if client_manager is None:
             client_manager = base_manager.BaseManager()
         self.manager = client_manager
         self.manager.set_server(self)
+        if callback_timeout is not None:
+            self.manager.callback_timeout = callback_timeout
         self.manager_initialized = False
 
         self.async_handlers = async_handlers
+        self.dispatcher = None
+        if async_handlers and handler_workers:
+            self.dispatcher = self._dispatcher_class()(
+                self, handler_workers, queue_size=handler_queue_size,
+                overflow=handler_overflow, ordering=handler_ordering)
         self.always_connect = always_connect
+        self.text_only = text_only
 
         self.async_mode = self.eio.async_mode
 
@@ -189,6 +249,7 @@ class Server(object):
             if namespace not in self.handlers:
                 self.handlers[namespace] = {}
             self.handlers[namespace][event] = handler
+            self._update_event_table(namespace)
             return handler
 
         if handler is None:
@@ -244,6 +305,7 @@ class Server(object):
         namespace_handler._set_server(self)
         self.namespace_handlers[namespace_handler.namespace] = \
             namespace_handler
+        self._update_event_table(namespace_handler.namespace)
 
     def emit(self, event, data=None, to=None, room=None, skip_sid=None,
              namespace=None, callback=None, **kwargs):
@@ -290,8 +352,9 @@ class Server(object):
         """
         namespace = namespace or '/'
         room = to or room
-        self.logger.info('emitting event "%s" to %s [%s]', event,
-                         room or 'all', namespace)
+        if self.log.emit:
+            self.log.emit('emitting event "%s" to %s [%s]', event,
+                          room or 'all', namespace)
         self.manager.emit(event, data, namespace, room=room,
                           skip_sid=skip_sid, callback=callback, **kwargs)
 
@@ -335,6 +398,37 @@ class Server(object):
         self.emit('message', data=data, to=to, room=room, skip_sid=skip_sid,
                   namespace=namespace, callback=callback, **kwargs)
 
+    def emit_many(self, events, skip_sid=None, namespace=None, **kwargs):
+        """Emit a batch of custom events to connected clients.
+
+        :param events: A list of ``(event, data, to)`` tuples, each describing
+                       one event with the same meaning as the arguments of
+                       the same name in :func:`emit`. Set ``to`` to ``None``
+                       to broadcast an event to all connected clients.
+        :param skip_sid: The session ID of a client to skip when broadcasting
+                         the events. To skip multiple sids, pass a list.
+        :param namespace: The Socket.IO namespace for the events. If this
+                          argument is omitted the events are emitted to the
+                          default namespace.
+        :param ignore_queue: Only used when a message queue is configured. If
+                             set to ``True``, the events are emitted to the
+                             clients directly, without going through the
+                             queue. It is recommended to always leave this
+                             parameter with its default value of ``False``.
+
+        This is more efficient than calling :func:`emit` once per event,
+        because each event is encoded only once and the recipients of the
+        whole batch are resolved in a single pass. Each packet is still handed
+        to the Engine.IO server on its own, so a client receives as many
+        Engine.IO messages as events are addressed to it. When a message queue
+        is configured, the whole batch is published as a single message.
+        Callbacks are not supported for batched events.
+        """
+        namespace = namespace or '/'
+        if self.log.emit:
+            self.log.emit('emitting %d events [%s]', len(events), namespace)
+        self.manager.emit_many(events, namespace, skip_sid=skip_sid, **kwargs)
+
     def call(self, event, data=None, to=None, sid=None, namespace=None,
              timeout=60, **kwargs):
         """Emit a custom event to a client and wait for the response.
@@ -401,7 +495,9 @@ class Server(object):
                           argument is omitted the default namespace is used.
         """
         namespace = namespace or '/'
-        self.logger.info('%s is entering room %s [%s]', sid, room, namespace)
+        if self.log.rooms:
+            self.log.rooms('%s is entering room %s [%s]', sid, room,
+                           namespace)
         self.manager.enter_room(sid, namespace, room)
 
     def leave_room(self, sid, room, namespace=None):
@@ -415,7 +511,8 @@ class Server(object):
                           argument is omitted the default namespace is used.
         """
         namespace = namespace or '/'
-        self.logger.info('%s is leaving room %s [%s]', sid, room, namespace)
+        if self.log.rooms:
+            self.log.rooms('%s is leaving room %s [%s]', sid, room, namespace)
         self.manager.leave_room(sid, namespace, room)
 
     def close_room(self, room, namespace=None):
@@ -428,7 +525,8 @@ class Server(object):
                           argument is omitted the default namespace is used.
         """
         namespace = namespace or '/'
-        self.logger.info('room %s is closing [%s]', room, namespace)
+        if self.log.rooms:
+            self.log.rooms('room %s is closing [%s]', room, namespace)
         self.manager.close_room(room, namespace)
 
     def rooms(self, sid, namespace=None):
@@ -533,6 +631,7 @@ class Server(object):
                                                  namespace=namespace))
             self._trigger_event('disconnect', namespace, sid)
             self.manager.disconnect(sid, namespace=namespace)
+            self._discard_events(sid, namespace)
             if namespace == '/':
                 self.eio.disconnect(sid)
 
@@ -591,8 +690,12 @@ class Server(object):
 
     def _emit_internal(self, sid, event, data, namespace=None, id=None):
         """Send a message to a client."""
-        if six.PY2 and not self.binary:
-            binary = False  # pragma: nocover
+        self._send_packet(sid, self._event_packet(event, data, namespace, id))
+
+    def _event_packet(self, event, data, namespace=None, id=None):
+        """Build the Socket.IO packet for an event."""
+        if self.text_only or (six.PY2 and not self.binary):
+            binary = False
         else:
             binary = None
         # tuples are expanded to multiple arguments, everything else is sent
@@ -603,13 +706,19 @@ class Server(object):
             data = [data]
         else:
             data = []
-        self._send_packet(sid, packet.Packet(packet.EVENT, namespace=namespace,
-                                             data=[event] + data, id=id,
-                                             binary=binary))
+        return packet.Packet(packet.EVENT, namespace=namespace,
+                             data=[event] + data, id=id, binary=binary)
 
     def _send_packet(self, sid, pkt):
         """Send a Socket.IO packet to a client."""
-        encoded_packet = pkt.encode()
+        self._send_encoded_packet(sid, pkt.encode())
+
+    def _send_encoded_packet(self, sid, encoded_packet):
+        """Send an already encoded Socket.IO packet to a client.
+
+        This allows a packet to be encoded once and then delivered to any
+        number of clients, which is what broadcasts do.
+        """
         if isinstance(encoded_packet, list):
             binary = False
             for ep in encoded_packet:
@@ -618,6 +727,15 @@ class Server(object):
         else:
             self.eio.send(sid, encoded_packet, binary=False)
 
+    def _send_encoded_packets(self, sid, encoded_packets):
+        """Send a list of already encoded Socket.IO packets to a client.
+
+        The Engine.IO server does not accept a batch of packets, so they are
+        sent one by one, in order.
+        """
+        for encoded_packet in encoded_packets:
+            self._send_encoded_packet(sid, encoded_packet)
+
     def _handle_connect(self, sid, namespace):
         """Handle a client connection request."""
         namespace = namespace or '/'
@@ -661,26 +779,38 @@ class Server(object):
                 self.manager.pre_disconnect(sid, namespace=n)
                 self._trigger_event('disconnect', n, sid)
                 self.manager.disconnect(sid, n)
+                self._discard_events(sid, n)
         if namespace == '/' and self.manager.is_connected(sid, namespace):
             self.manager.pre_disconnect(sid, namespace='/')
             self._trigger_event('disconnect', '/', sid)
             self.manager.disconnect(sid, '/')
+            self._discard_events(sid, '/')
 
     def _handle_event(self, sid, namespace, id, data):
         """Handle an incoming client event."""
         namespace = namespace or '/'
-        self.logger.info('received event "%s" from %s [%s]', data[0], sid,
-                         namespace)
+        if self.log.receive:
+            self.log.receive('received event "%s" from %s [%s]', data[0], sid,
+                             namespace)
         if not self.manager.is_connected(sid, namespace):
             self.logger.warning('%s is not connected to namespace %s',
                                 sid, namespace)
             return
-        if self.async_handlers:
+        if self.dispatcher is not None:
+            self.dispatcher.dispatch(sid, namespace,
+                                     self._handle_event_internal, self, sid,
+                                     data, namespace, id)
+        elif self.async_handlers:
             self.start_background_task(self._handle_event_internal, self, sid,
                                        data, namespace, id)
         else:
             self._handle_event_internal(self, sid, data, namespace, id)
 
+    def _discard_events(self, sid, namespace):
+        """Discard the queued events of a client that disconnected."""
+        if self.dispatcher is not None:
+            self.dispatcher.discard(sid, namespace)
+
     def _handle_event_internal(self, server, sid, data, namespace, id):
         r = server._trigger_event(data[0], namespace, sid, *data[1:])
         if id is not None:
@@ -692,8 +822,8 @@ class Server(object):
                 data = list(r)
             else:
                 data = [r]
-            if six.PY2 and not self.binary:
-                binary = False  # pragma: nocover
+            if self.text_only or (six.PY2 and not self.binary):
+                binary = False
             else:
                 binary = None
             server._send_packet(sid, packet.Packet(packet.ACK,
@@ -704,19 +834,45 @@ class Server(object):
     def _handle_ack(self, sid, namespace, id, data):
         """Handle ACK packets from the client."""
         namespace = namespace or '/'
-        self.logger.info('received ack from %s [%s]', sid, namespace)
+        if self.log.receive:
+            self.log.receive('received ack from %s [%s]', sid, namespace)
         self.manager.trigger_callback(sid, namespace, id, data)
 
+    def _update_event_table(self, namespace):
+        """Resolve the handlers of a namespace into the event table.
+
+        The table maps each ``(namespace, event)`` pair to a tuple with the
+        handler function and a flag that indicates if the handler is a
+        coroutine. Handlers registered with :meth:`on` take precedence over
+        the methods of a class-based namespace.
+        """
+        for key in [key for key in self._event_table
+                    if key[0] == namespace]:
+            del self._event_table[key]
+        handlers = {}
+        if namespace in self.namespace_handlers:
+            handlers.update(self.namespace_handlers[
+                namespace]._get_event_handlers() or {})
+        handlers.update(self.handlers.get(namespace, {}))
+        for event, handler in six.iteritems(handlers):
+            self._event_table[(namespace, event)] = (
+                handler, self._is_coroutine(handler))
+
+    def _is_coroutine(self, handler):
+        return False
+
     def _trigger_event(self, event, namespace, *args):
         """Invoke an application event handler."""
-        # first see if we have an explicit handler for the event
-        if namespace in self.handlers and event in self.handlers[namespace]:
-            return self.handlers[namespace][event](*args)
-
-        # or else, forward the event to a namespace handler if one exists
-        elif namespace in self.namespace_handlers:
-            return self.namespace_handlers[namespace].trigger_event(
-                event, *args)
+        try:
+            handler, _ = self._event_table[(namespace, event)]
+        except KeyError:
+            # a namespace handler that does not have a method for the event
+            # can still handle it if it overrides trigger_event()
+            if namespace in self.namespace_handlers:
+                return self.namespace_handlers[namespace].trigger_event(
+                    event, *args)
+            return
+        return handler(*args)
 
     def _handle_eio_connect(self, sid, environ):
         """Handle the Engine.IO connection event."""
@@ -762,3 +918,6 @@ class Server(object):
 
     def _engineio_v3_server_class(self):
         return engineio_v3.Server
+
+    def _dispatcher_class(self):
+        return dispatcher.Dispatcher
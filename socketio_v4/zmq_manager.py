@@ -1,4 +1,3 @@
-import pickle
 import re
 
 try:
@@ -10,6 +9,19 @@ import six
 from .pubsub_manager import PubSubManager
 
 
+def _parse_zmq_url(url):
+    """Return the sink and subscriber URLs for a zmq connection string."""
+    r = re.compile(r':\d+\+\d+$')
+    if not (url.startswith('zmq+tcp://') and r.search(url)):
+        raise RuntimeError('unexpected connection string: ' + url)
+
+    url = url.replace('zmq+', '')
+    (sink_url, sub_port) = url.split('+')
+    sink_port = sink_url.split(':')[-1]
+    sub_url = sink_url.replace(sink_port, sub_port)
+    return sink_url, sub_url
+
+
 class ZmqManager(PubSubManager):  # pragma: no cover
     """zmq based client manager.
 
@@ -30,6 +42,16 @@ class ZmqManager(PubSubManager):  # pragma: no cover
     :param write_only: If set to ``True``, only initialize to emit events. The
                        default of ``False`` initializes the class for emitting
                        and receiving.
+    :param codec: The codec used to encode the messages sent to the other
+                  servers. Can be ``'pickle'`` (the default), ``'json'`` or
+                  ``'msgpack'``. Must be the same in all the servers.
+    :param forward_encoded: If set to ``True``, events without a callback
+                            are encoded once by the server that emits them,
+                            and the receiving servers forward the encoded
+                            packets to their clients. Servers running older
+                            releases cannot handle these messages, so this
+                            option must only be enabled once all the servers
+                            have been upgraded. The default is ``False``.
 
     A zmq message broker must be running for the zmq_manager to work.
     you can write your own or adapt one from the following simple broker
@@ -51,20 +73,15 @@ class ZmqManager(PubSubManager):  # pragma: no cover
     def __init__(self, url='zmq+tcp://localhost:5555+5556',
                  channel='socketio_v4',
                  write_only=False,
-                 logger=None):
+                 logger=None,
+                 codec='pickle',
+                 forward_encoded=False):
         if zmq is None:
             raise RuntimeError('zmq package is not installed '
                                '(Run "pip install pyzmq" in your '
                                'virtualenv).')
 
-        r = re.compile(r':\d+\+\d+$')
-        if not (url.startswith('zmq+tcp://') and r.search(url)):
-            raise RuntimeError('unexpected connection string: ' + url)
-
-        url = url.replace('zmq+', '')
-        (sink_url, sub_port) = url.split('+')
-        sink_port = sink_url.split(':')[-1]
-        sub_url = sink_url.replace(sink_port, sub_port)
+        sink_url, sub_url = _parse_zmq_url(url)
 
         sink = zmq.Context().socket(zmq.PUSH)
         sink.connect(sink_url)
@@ -78,17 +95,18 @@ class ZmqManager(PubSubManager):  # pragma: no cover
         self.channel = channel
         super(ZmqManager, self).__init__(channel=channel,
                                          write_only=write_only,
-                                         logger=logger)
+                                         logger=logger, codec=codec,
+                                         forward_encoded=forward_encoded)
 
     def _publish(self, data):
-        pickled_data = pickle.dumps(
+        encoded_data = self._encode_message(
             {
                 'type': 'message',
                 'channel': self.channel,
                 'data': data
             }
         )
-        return self.sink.send(pickled_data)
+        return self.sink.send(encoded_data)
 
     def zmq_listen(self):
         while True:
@@ -99,10 +117,7 @@ class ZmqManager(PubSubManager):  # pragma: no cover
     def _listen(self):
         for message in self.zmq_listen():
             if isinstance(message, six.binary_type):
-                try:
-                    message = pickle.loads(message)
-                except Exception:
-                    pass
+                message = self._decode_message(message)
             if isinstance(message, dict) and \
                     message['type'] == 'message' and \
                     message['channel'] == self.channel and \
@@ -0,0 +1,164 @@
+import asyncio
+import sys
+import unittest
+
+import six
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
+from socketio_v4 import asyncio_aiopika_manager
+
+
+def _run(coro):
+    """Run the given coroutine."""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+class FakeExchange(object):
+    """In-process stand-in for an ``aio_pika`` exchange."""
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.published = []
+
+    async def publish(self, message, routing_key=None):
+        self.published.append(message)
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError('message not confirmed')
+
+
+class FakeQueue(object):
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.consumers = []
+
+    async def consume(self, callback):
+        if self.fail:
+            raise RuntimeError('channel closed')
+        self.consumers.append(callback)
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'only for Python 3.5+')
+class TestAsyncAioPikaManager(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(asyncio_aiopika_manager, 'aio_pika')
+        aio_pika = patcher.start()
+        aio_pika.Message = lambda body, delivery_mode: body
+        self.addCleanup(patcher.stop)
+
+    def _manager(self, exchanges, **kwargs):
+        pm = asyncio_aiopika_manager.AsyncAioPikaManager(write_only=True,
+                                                         **kwargs)
+        pm.connections = []
+
+        async def connection():
+            pm.connections.append(FakeConnection())
+            return pm.connections[-1]
+
+        async def channel(connection):
+            return mock.MagicMock()
+
+        async def exchange(channel):
+            return exchanges.pop(0)
+
+        pm._connection = connection
+        pm._channel = channel
+        pm._exchange = exchange
+        return pm
+
+    def _settle(self):
+        # let the confirmation callbacks and the recovery tasks run
+        for _ in range(5):
+            _run(asyncio.sleep(0))
+
+    def test_publish(self):
+        exchange = FakeExchange()
+        pm = self._manager([exchange])
+        _run(pm._publish({'method': 'emit'}))
+        _run(pm._publish({'method': 'emit'}))
+        self._settle()
+        encoded = pm._encode_message({'method': 'emit'})
+        assert exchange.published == [encoded, encoded]
+        assert len(pm.connections) == 1
+        assert not pm.connections[0].closed
+
+    def test_confirm_batch(self):
+        exchange = FakeExchange()
+        pm = self._manager([exchange], confirm_batch_size=2)
+
+        async def publish():
+            await pm._publish({'method': 'emit'})
+            assert len(pm.pending_confirms) == 1
+            await pm._publish({'method': 'emit'})
+
+        _run(publish())
+        assert pm.pending_confirms == []
+        assert len(exchange.published) == 2
+
+    def test_publish_not_confirmed(self):
+        failed = FakeExchange(fail=1)
+        exchange = FakeExchange()
+        pm = self._manager([failed, exchange])
+        _run(pm._publish({'method': 'emit'}))
+        self._settle()
+        assert len(failed.published) == 1
+        assert exchange.published == failed.published
+        assert len(pm.connections) == 2
+        assert pm.connections[0].closed
+        assert pm.publisher_exchange is exchange
+
+    def test_publish_not_confirmed_twice(self):
+        failed = FakeExchange(fail=1)
+        failed_again = FakeExchange(fail=1)
+        pm = self._manager([failed, failed_again, FakeExchange()])
+        _run(pm._publish({'method': 'emit'}))
+        self._settle()
+        assert len(failed_again.published) == 1
+        assert pm.connections[1].closed
+        assert pm.publisher_exchange is None
+
+    def test_listen_reconnect_closes_connection(self):
+        pm = self._manager([mock.MagicMock(), mock.MagicMock()])
+        queues = [FakeQueue(fail=True), FakeQueue()]
+        sleep = asyncio.sleep
+
+        async def channel(connection):
+            channel = mock.MagicMock()
+            channel.set_qos.return_value = sleep(0)
+            return channel
+
+        async def queue(channel, exchange):
+            return queues.pop(0)
+
+        async def no_sleep(seconds):
+            await sleep(0)
+
+        async def listen():
+            listener = asyncio.ensure_future(pm._listen())
+            while pm.listener_queue is None or \
+                    not pm.listener_queue.consumers:
+                await sleep(0)
+            message = mock.MagicMock(body=b'foo')
+            message.ack.return_value = None
+            await pm.listener_queue.consumers[0](message)
+            return await listener
+
+        pm._channel = channel
+        pm._queue = queue
+        with mock.patch.object(asyncio_aiopika_manager.asyncio, 'sleep',
+                               new=no_sleep):
+            assert _run(listen()) == b'foo'
+        assert len(pm.connections) == 2
+        assert pm.connections[0].closed
+        assert not pm.connections[1].closed
@@ -0,0 +1,174 @@
+import asyncio
+import sys
+import unittest
+
+import six
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
+from socketio_v4 import asyncio_dispatcher
+import pytest
+
+
+def AsyncMock(*args, **kwargs):
+    """Return a mock asynchronous function."""
+    m = mock.MagicMock(*args, **kwargs)
+
+    async def mock_coro(*args, **kwargs):
+        return m(*args, **kwargs)
+
+    mock_coro.mock = m
+    return mock_coro
+
+
+def _run(coro):
+    """Run the given coroutine."""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'only for Python 3.5+')
+class TestAsyncDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.server = mock.MagicMock()
+        self.server.start_background_task = \
+            lambda target, *args: asyncio.ensure_future(target(*args))
+        self.server.disconnect = AsyncMock()
+
+    def tearDown(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def _dispatcher(self, *args, **kwargs):
+        d = asyncio_dispatcher.AsyncDispatcher(self.server, *args, **kwargs)
+        self.tasks = d.tasks
+        return d
+
+    def test_invalid_overflow(self):
+        self.tasks = []
+        with pytest.raises(ValueError):
+            asyncio_dispatcher.AsyncDispatcher(self.server, 2,
+                                               overflow='foo')
+
+    def test_dispatch_in_order(self):
+        d = self._dispatcher(2)
+        calls = []
+
+        async def handler(sid, n):
+            await asyncio.sleep(0.01 if n == 0 else 0)
+            calls.append((sid, n))
+
+        async def dispatch():
+            for n in range(3):
+                await d.dispatch('a', '/', handler, 'a', n)
+                await d.dispatch('b', '/', handler, 'b', n)
+            while d.get_stats()['processed'] < 6:
+                await asyncio.sleep(0.01)
+
+        _run(dispatch())
+        self.tasks = d.tasks
+        assert len(d.tasks) == 2
+        assert [n for sid, n in calls if sid == 'a'] == [0, 1, 2]
+        assert [n for sid, n in calls if sid == 'b'] == [0, 1, 2]
+        assert d.get_stats()['queued'] == 0
+        assert d.get_stats()['dropped'] == 0
+        assert d.mailboxes == {}
+
+    def test_clients_concurrently(self):
+        d = self._dispatcher(2)
+        calls = []
+
+        async def handler(sid, n, event):
+            calls.append((sid, n))
+            if event is not None:
+                await event.wait()
+
+        async def dispatch():
+            event = asyncio.Event()
+            await d.dispatch('a', '/', handler, 'a', 0, event)
+            await d.dispatch('a', '/', handler, 'a', 1, None)
+            await d.dispatch('b', '/', handler, 'b', 0, None)
+            while d.get_stats()['processed'] < 1:
+                await asyncio.sleep(0.01)
+            # the second event of the blocked client must wait for the first
+            result = list(calls)
+            event.set()
+            while d.get_stats()['processed'] < 3:
+                await asyncio.sleep(0.01)
+            return result
+
+        assert _run(dispatch()) == [('a', 0), ('b', 0)]
+        self.tasks = d.tasks
+        assert calls == [('a', 0), ('b', 0), ('a', 1)]
+
+    def test_discard(self):
+        d = self._dispatcher(1, ordering='namespace')
+        handler = AsyncMock()
+
+        async def dispatch():
+            await d.dispatch('a', '/', handler, 0)
+            await d.dispatch('a', '/foo', handler, 1)
+            await d.dispatch('a', '/', handler, 2)
+            d.discard('a', '/')
+            d.discard('b', '/')
+            stats = d.get_stats()
+            while d.mailboxes:
+                await asyncio.sleep(0.01)
+            return stats
+
+        stats = _run(dispatch())
+        self.tasks = d.tasks
+        assert stats['queued'] == 1
+        assert stats['discarded'] == 2
+        handler.mock.assert_called_once_with(1)
+
+    def test_handler_error(self):
+        d = self._dispatcher(1)
+        handler = AsyncMock(side_effect=[RuntimeError, None])
+
+        async def dispatch():
+            await d.dispatch('a', '/', handler)
+            await d.dispatch('a', '/', handler)
+            while d.get_stats()['processed'] < 2:
+                await asyncio.sleep(0.01)
+
+        _run(dispatch())
+        self.tasks = d.tasks
+        assert handler.mock.call_count == 2
+        self.server.logger.exception.assert_called_once_with(
+            'event handler error')
+
+    def test_overflow_drop(self):
+        d = self._dispatcher(1, queue_size=2, overflow='drop')
+        handler = AsyncMock()
+
+        async def dispatch():
+            for n in range(3):
+                await d.dispatch('a', '/', handler, n)
+            stats = d.get_stats()
+            while d.get_stats()['processed'] < 2:
+                await asyncio.sleep(0.01)
+            return stats
+
+        stats = _run(dispatch())
+        self.tasks = d.tasks
+        assert stats['queued'] == 2
+        assert stats['dropped'] == 1
+        assert handler.mock.call_count == 2
+        self.server.disconnect.mock.assert_not_called()
+
+    def test_overflow_disconnect(self):
+        d = self._dispatcher(1, queue_size=1, overflow='disconnect')
+        handler = AsyncMock()
+
+        async def dispatch():
+            await d.dispatch('a', '/foo', handler)
+            await d.dispatch('a', '/foo', handler)
+
+        _run(dispatch())
+        self.tasks = d.tasks
+        assert d.get_stats()['dropped'] == 1
+        self.server.disconnect.mock.assert_called_once_with(
+            'a', namespace='/foo')
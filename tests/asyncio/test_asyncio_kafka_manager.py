@@ -0,0 +1,115 @@
+import asyncio
+import sys
+import unittest
+
+import six
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
+from socketio_v4 import asyncio_kafka_manager
+from socketio_v4 import pubsub_codec
+
+
+def _run(coro):
+    """Run the given coroutine."""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+class FakeMessage(object):
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeProducer(object):
+    """In-process stand-in for ``aiokafka.AIOKafkaProducer``."""
+    def __init__(self, **kwargs):
+        self.options = kwargs
+        self.started = False
+        self.sent = []
+        self.fail = False
+
+    async def start(self):
+        self.started = True
+
+    async def send(self, topic, value=None, key=None):
+        self.sent.append((topic, value, key))
+        future = asyncio.get_event_loop().create_future()
+        if self.fail:
+            future.set_exception(RuntimeError('delivery failed'))
+        else:
+            future.set_result(None)
+        return future
+
+    async def flush(self):
+        pass
+
+
+class FakeConsumer(object):
+    """In-process stand-in for ``aiokafka.AIOKafkaConsumer``."""
+    def __init__(self, topic, **kwargs):
+        self.topic = topic
+        self.options = kwargs
+        self.batches = []
+
+    async def start(self):
+        pass
+
+    async def getone(self):
+        return self.batches.pop(0)[0]
+
+    async def getmany(self, timeout_ms=0, max_records=None):
+        if not self.batches:
+            return {}
+        return {'partition': self.batches.pop(0)}
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'only for Python 3.5+')
+class TestAsyncKafkaManager(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(asyncio_kafka_manager, 'aiokafka')
+        aiokafka = patcher.start()
+        aiokafka.AIOKafkaProducer = FakeProducer
+        aiokafka.AIOKafkaConsumer = FakeConsumer
+        self.addCleanup(patcher.stop)
+
+    def test_publish(self):
+        km = asyncio_kafka_manager.AsyncKafkaManager(
+            'kafka://', max_pending=2, producer_options={'linger_ms': 5})
+        _run(km._publish({'method': 'emit', 'namespace': '/',
+                          'room': 'foo'}))
+        assert km.producer.started
+        assert km.producer.options == {'bootstrap_servers': 'localhost:9092',
+                                       'linger_ms': 5}
+        assert km.producer.sent == [
+            ('socketio_v4',
+             pubsub_codec.PickleCodec().encode(
+                 {'method': 'emit', 'namespace': '/', 'room': 'foo'}),
+             b'/\x00foo')]
+        assert len(km.pending_deliveries) == 1
+        _run(km._publish({'method': 'emit'}))
+        assert km.pending_deliveries == []
+        assert km.delivery_errors == 0
+
+    def test_delivery_errors(self):
+        km = asyncio_kafka_manager.AsyncKafkaManager('kafka://')
+        _run(km._publish({'method': 'emit'}))
+        km.producer.fail = True
+        _run(km._publish({'method': 'emit'}))
+        _run(km.flush())
+        assert km.pending_deliveries == []
+        assert km.delivery_errors == 1
+
+    def test_listen(self):
+        km = asyncio_kafka_manager.AsyncKafkaManager(
+            'kafka://', consumer_options={'auto_offset_reset': 'latest'})
+        _run(km._consumer())
+        assert km.consumer.topic == 'socketio_v4'
+        assert km.consumer.options == {'bootstrap_servers': 'localhost:9092',
+                                       'auto_offset_reset': 'latest'}
+        km.consumer.batches = [[FakeMessage(b'a')],
+                               [FakeMessage(b'b'), FakeMessage(b'c')]]
+        assert _run(km._listen()) == b'a'
+        assert _run(km._listen_batch()) == [b'b', b'c']
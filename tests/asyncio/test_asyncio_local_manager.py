@@ -0,0 +1,66 @@
+import asyncio
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import unittest
+
+from socketio_v4 import asyncio_local_manager
+
+
+def _run(coro):
+    """Run the given coroutine."""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'only for Python 3.5+')
+@unittest.skipIf(not hasattr(socket, 'AF_UNIX'), 'requires unix sockets')
+class TestAsyncLocalManager(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def _manager(self, **kwargs):
+        lm = asyncio_local_manager.AsyncLocalManager(path=self.path,
+                                                     codec='json', **kwargs)
+        self.addCleanup(lm.close)
+        return lm
+
+    def test_publish_to_all_workers(self):
+        lm1 = self._manager()
+        lm2 = self._manager()
+        lm1._bind()
+        lm2._bind()
+        _run(lm1._publish({'method': 'emit'}))
+        assert lm1._decode_message(_run(lm1._listen())) == {'method': 'emit'}
+        assert lm2._decode_message(_run(lm2._listen())) == {'method': 'emit'}
+
+    def test_listen_batch(self):
+        lm = self._manager(listen_batch_size=2)
+        lm._bind()
+        for i in range(3):
+            _run(lm._publish({'method': 'emit', 'n': i}))
+        batch = _run(lm._listen_batch())
+        assert [lm._decode_message(m)['n'] for m in batch] == [0, 1]
+        batch = _run(lm._listen_batch())
+        assert [lm._decode_message(m)['n'] for m in batch] == [2]
+
+    def test_stale_worker(self):
+        stale_path = os.path.join(self.path, 'stale.sock')
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(stale_path)
+        stale.close()
+        lm = self._manager()
+        _run(lm._publish({'method': 'emit'}))
+        assert not os.path.exists(stale_path)
+
+    def test_send_timeout(self):
+        lm1 = self._manager(max_message_size=4096)
+        lm1._bind()
+        lm2 = self._manager(write_only=True, send_timeout=0)
+        # the socket of lm1 fills up, and the messages that do not fit are
+        # dropped instead of blocking the sender
+        for i in range(1000):
+            _run(lm2._publish({'method': 'emit', 'n': i}))
+        assert lm1._decode_message(_run(lm1._listen()))['n'] == 0
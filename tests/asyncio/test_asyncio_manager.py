@@ -33,6 +33,9 @@ class TestAsyncManager(unittest.TestCase):
     def setUp(self):
         mock_server = mock.MagicMock()
         mock_server._emit_internal = AsyncMock()
+        mock_server._event_packet.return_value.encode.return_value = 'pkt'
+        mock_server._send_encoded_packet = AsyncMock()
+        mock_server._send_encoded_packets = AsyncMock()
         self.bm = asyncio_manager.AsyncManager()
         self.bm.set_server(mock_server)
         self.bm.initialize()
@@ -223,8 +226,8 @@ class TestAsyncManager(unittest.TestCase):
                 'my event', {'foo': 'bar'}, namespace='/foo', room='123'
             )
         )
-        self.bm.server._emit_internal.mock.assert_called_once_with(
-            '123', 'my event', {'foo': 'bar'}, '/foo', None
+        self.bm.server._send_encoded_packet.mock.assert_called_once_with(
+            '123', 'pkt'
         )
 
     def test_emit_to_room(self):
@@ -238,13 +241,12 @@ class TestAsyncManager(unittest.TestCase):
                 'my event', {'foo': 'bar'}, namespace='/foo', room='bar'
             )
         )
-        assert self.bm.server._emit_internal.mock.call_count == 2
-        self.bm.server._emit_internal.mock.assert_any_call(
-            '123', 'my event', {'foo': 'bar'}, '/foo', None
-        )
-        self.bm.server._emit_internal.mock.assert_any_call(
-            '456', 'my event', {'foo': 'bar'}, '/foo', None
+        self.bm.server._event_packet.assert_called_once_with(
+            'my event', {'foo': 'bar'}, '/foo'
         )
+        assert self.bm.server._send_encoded_packet.mock.call_count == 2
+        self.bm.server._send_encoded_packet.mock.assert_any_call('123', 'pkt')
+        self.bm.server._send_encoded_packet.mock.assert_any_call('456', 'pkt')
 
     def test_emit_to_all(self):
         self.bm.connect('123', '/foo')
@@ -254,16 +256,10 @@ class TestAsyncManager(unittest.TestCase):
         self.bm.connect('789', '/foo')
         self.bm.connect('abc', '/bar')
         _run(self.bm.emit('my event', {'foo': 'bar'}, namespace='/foo'))
-        assert self.bm.server._emit_internal.mock.call_count == 3
-        self.bm.server._emit_internal.mock.assert_any_call(
-            '123', 'my event', {'foo': 'bar'}, '/foo', None
-        )
-        self.bm.server._emit_internal.mock.assert_any_call(
-            '456', 'my event', {'foo': 'bar'}, '/foo', None
-        )
-        self.bm.server._emit_internal.mock.assert_any_call(
-            '789', 'my event', {'foo': 'bar'}, '/foo', None
-        )
+        assert self.bm.server._send_encoded_packet.mock.call_count == 3
+        self.bm.server._send_encoded_packet.mock.assert_any_call('123', 'pkt')
+        self.bm.server._send_encoded_packet.mock.assert_any_call('456', 'pkt')
+        self.bm.server._send_encoded_packet.mock.assert_any_call('789', 'pkt')
 
     def test_emit_to_all_skip_one(self):
         self.bm.connect('123', '/foo')
@@ -277,13 +273,9 @@ class TestAsyncManager(unittest.TestCase):
                 'my event', {'foo': 'bar'}, namespace='/foo', skip_sid='456'
             )
         )
-        assert self.bm.server._emit_internal.mock.call_count == 2
-        self.bm.server._emit_internal.mock.assert_any_call(
-            '123', 'my event', {'foo': 'bar'}, '/foo', None
-        )
-        self.bm.server._emit_internal.mock.assert_any_call(
-            '789', 'my event', {'foo': 'bar'}, '/foo', None
-        )
+        assert self.bm.server._send_encoded_packet.mock.call_count == 2
+        self.bm.server._send_encoded_packet.mock.assert_any_call('123', 'pkt')
+        self.bm.server._send_encoded_packet.mock.assert_any_call('789', 'pkt')
 
     def test_emit_to_all_skip_two(self):
         self.bm.connect('123', '/foo')
@@ -300,10 +292,8 @@ class TestAsyncManager(unittest.TestCase):
                 skip_sid=['123', '789'],
             )
         )
-        assert self.bm.server._emit_internal.mock.call_count == 1
-        self.bm.server._emit_internal.mock.assert_any_call(
-            '456', 'my event', {'foo': 'bar'}, '/foo', None
-        )
+        assert self.bm.server._send_encoded_packet.mock.call_count == 1
+        self.bm.server._send_encoded_packet.mock.assert_any_call('456', 'pkt')
 
     def test_emit_with_callback(self):
         self.bm.connect('123', '/foo')
@@ -319,6 +309,50 @@ class TestAsyncManager(unittest.TestCase):
             '123', 'my event', {'foo': 'bar'}, '/foo', 11
         )
 
+    def test_emit_many(self):
+        self.bm.connect('123', '/foo')
+        self.bm.enter_room('123', '/foo', 'bar')
+        self.bm.connect('456', '/foo')
+        self.bm.server._event_packet.side_effect = \
+            lambda event, data, namespace: mock.MagicMock(
+                encode=mock.MagicMock(return_value=event))
+        _run(self.bm.emit_many([('a', 1, None), ('b', 2, 'bar')],
+                               namespace='/foo'))
+        assert self.bm.server._send_encoded_packets.mock.call_count == 2
+        self.bm.server._send_encoded_packets.mock.assert_any_call(
+            '123', ['a', 'b']
+        )
+        self.bm.server._send_encoded_packets.mock.assert_any_call(
+            '456', ['a']
+        )
+        _run(self.bm.emit_many([('a', 1, None)], namespace='/bar'))
+        assert self.bm.server._send_encoded_packets.mock.call_count == 2
+
+    def test_emit_encoded(self):
+        self.bm.connect('123', '/foo')
+        self.bm.connect('456', '/foo')
+        _run(self.bm.emit_encoded('pkt', namespace='/foo', skip_sid='456'))
+        self.bm.server._event_packet.assert_not_called()
+        self.bm.server._send_encoded_packet.mock.assert_called_once_with(
+            '123', 'pkt')
+        _run(self.bm.emit_encoded('pkt', namespace='/foo', room='bar'))
+        assert self.bm.server._send_encoded_packet.mock.call_count == 1
+
+    def test_emit_many_encoded(self):
+        self.bm.connect('123', '/foo')
+        self.bm.enter_room('123', '/foo', 'bar')
+        self.bm.connect('456', '/foo')
+        _run(self.bm.emit_many_encoded([['a', None], ['b', 'bar']],
+                                       namespace='/foo'))
+        self.bm.server._event_packet.assert_not_called()
+        assert self.bm.server._send_encoded_packets.mock.call_count == 2
+        self.bm.server._send_encoded_packets.mock.assert_any_call(
+            '123', ['a', 'b']
+        )
+        self.bm.server._send_encoded_packets.mock.assert_any_call(
+            '456', ['a']
+        )
+
     def test_emit_to_invalid_room(self):
         _run(
             self.bm.emit('my event', {'foo': 'bar'}, namespace='/', room='123')
@@ -129,6 +129,20 @@ class TestAsyncNamespace(unittest.TestCase):
             callback='cb',
         )
 
+    def test_emit_many(self):
+        ns = asyncio_namespace.AsyncNamespace('/foo')
+        mock_server = mock.MagicMock()
+        mock_server.emit_many = AsyncMock()
+        ns._set_server(mock_server)
+        _run(ns.emit_many([('ev', 'data', 'room')], skip_sid='skip'))
+        ns.server.emit_many.mock.assert_called_with(
+            [('ev', 'data', 'room')], skip_sid='skip', namespace='/foo'
+        )
+        _run(ns.emit_many([('ev', 'data', 'room')], namespace='/bar'))
+        ns.server.emit_many.mock.assert_called_with(
+            [('ev', 'data', 'room')], skip_sid=None, namespace='/bar'
+        )
+
     def test_send(self):
         ns = asyncio_namespace.AsyncNamespace('/foo')
         mock_server = mock.MagicMock()
@@ -1,5 +1,6 @@
 import asyncio
 import functools
+import json
 import sys
 import unittest
 
@@ -12,6 +13,7 @@ else:
 
 from socketio_v4 import asyncio_manager
 from socketio_v4 import asyncio_pubsub_manager
+from socketio_v4 import pubsub_codec
 import pytest
 
 
@@ -35,7 +37,9 @@ def _run(coro):
 class TestAsyncPubSubManager(unittest.TestCase):
     def setUp(self):
         mock_server = mock.MagicMock()
+        mock_server._event_packet.return_value.encode.return_value = 'pkt'
         mock_server._emit_internal = AsyncMock()
+        mock_server._send_encoded_packet = AsyncMock()
         mock_server.disconnect = AsyncMock()
         self.pm = asyncio_pubsub_manager.AsyncPubSubManager()
         self.pm._publish = AsyncMock()
@@ -54,6 +58,30 @@ class TestAsyncPubSubManager(unittest.TestCase):
         assert pubsub.channel == 'foo'
         assert len(pubsub.host_id) == 32
 
+    def test_custom_codec(self):
+        pubsub = asyncio_pubsub_manager.AsyncPubSubManager(codec='json')
+        assert isinstance(pubsub.codec, pubsub_codec.JSONCodec)
+        encoded = pubsub._encode_message({'method': 'emit', 'event': 'foo'})
+        assert encoded == b'\x01{"method":"emit","event":"foo"}'
+        assert pubsub._decode_message(encoded) == {'method': 'emit',
+                                                   'event': 'foo'}
+        assert pubsub._decode_message(
+            pubsub_codec.PickleCodec().encode({'method': 'emit'})) is None
+
+    def test_user_codec(self):
+        class ReversedJSONCodec(object):
+            def encode(self, message):
+                return json.dumps(message).encode('utf-8')[::-1]
+
+            def decode(self, data):
+                return json.loads(data[::-1].decode('utf-8'))
+
+        pubsub = asyncio_pubsub_manager.AsyncPubSubManager(
+            codec=ReversedJSONCodec())
+        encoded = pubsub._encode_message({'method': 'emit', 'event': 'foo'})
+        assert pubsub._decode_message(encoded) == {'method': 'emit',
+                                                   'event': 'foo'}
+
     def test_write_only_init(self):
         mock_server = mock.MagicMock()
         pm = asyncio_pubsub_manager.AsyncPubSubManager(write_only=True)
@@ -123,6 +151,70 @@ class TestAsyncPubSubManager(unittest.TestCase):
             }
         )
 
+    def test_emit_forward_encoded(self):
+        self.pm.forward_encoded = True
+        _run(self.pm.emit('foo', 'bar', namespace='/baz'))
+        self.pm.server._event_packet.assert_called_once_with(
+            'foo', 'bar', '/baz')
+        self.pm._publish.mock.assert_called_once_with(
+            {
+                'method': 'emit',
+                'event': 'foo',
+                'packet': 'pkt',
+                'namespace': '/baz',
+                'room': None,
+                'skip_sid': None,
+                'callback': None,
+                'host_id': '123456',
+            }
+        )
+
+    def test_emit_many_forward_encoded(self):
+        self.pm.forward_encoded = True
+        _run(self.pm.emit_many([('foo', 'bar', 'baz')], skip_sid='123'))
+        self.pm._publish.mock.assert_called_once_with(
+            {
+                'method': 'emit_many',
+                'packets': [('pkt', 'baz')],
+                'namespace': '/',
+                'skip_sid': '123',
+                'host_id': '123456',
+            }
+        )
+
+    def test_messages_readable_by_older_releases(self):
+        # the handlers of releases without forwarding of encoded packets
+        # read these keys unconditionally
+        _run(self.pm.emit('foo', 'bar', room='baz'))
+        message = pubsub_codec.decode(
+            self.pm._encode_message(self.pm._publish.mock.call_args[0][0]),
+            accept_pickle=True)
+        assert (message['event'], message['data']) == ('foo', 'bar')
+        _run(self.pm.emit_many([('foo', 'bar', 'baz')]))
+        message = pubsub_codec.decode(
+            self.pm._encode_message(self.pm._publish.mock.call_args[0][0]),
+            accept_pickle=True)
+        assert [tuple(event) for event in message['events']] == [
+            ('foo', 'bar', 'baz')]
+
+    def test_emit_without_server(self):
+        pm = asyncio_pubsub_manager.AsyncPubSubManager(write_only=True)
+        pm._publish = AsyncMock()
+        pm.host_id = '123456'
+        _run(pm.emit('foo', 'bar', room='baz'))
+        pm._publish.mock.assert_called_once_with(
+            {
+                'method': 'emit',
+                'event': 'foo',
+                'data': 'bar',
+                'namespace': '/',
+                'room': 'baz',
+                'skip_sid': None,
+                'callback': None,
+                'host_id': '123456',
+            }
+        )
+
     def test_emit_with_callback(self):
         with mock.patch.object(
             self.pm, '_generate_ack_id', return_value='123'
@@ -161,8 +253,11 @@ class TestAsyncPubSubManager(unittest.TestCase):
             )
         )
         self.pm._publish.mock.assert_not_called()
-        self.pm.server._emit_internal.mock.assert_called_once_with(
-            '123', 'foo', 'bar', '/', None
+        self.pm.server._event_packet.assert_called_once_with(
+            'foo', 'bar', '/'
+        )
+        self.pm.server._send_encoded_packet.mock.assert_called_once_with(
+            '123', self.pm.server._event_packet.return_value.encode()
         )
 
     def test_can_disconnect(self):
@@ -173,6 +268,29 @@ class TestAsyncPubSubManager(unittest.TestCase):
             {'method': 'disconnect', 'sid': '123', 'namespace': '/foo'}
         )
 
+    def test_emit_many(self):
+        _run(self.pm.emit_many([('foo', 'bar', 'baz')], skip_sid='123'))
+        self.pm._publish.mock.assert_called_once_with(
+            {
+                'method': 'emit_many',
+                'events': [('foo', 'bar', 'baz')],
+                'namespace': '/',
+                'skip_sid': '123',
+                'host_id': '123456',
+            }
+        )
+
+    def test_emit_many_with_ignore_queue(self):
+        with mock.patch.object(
+            asyncio_manager.AsyncManager, 'emit_many', new=AsyncMock()
+        ) as super_emit_many:
+            _run(self.pm.emit_many([('foo', 'bar', None)], namespace='/',
+                                   ignore_queue=True))
+            super_emit_many.mock.assert_called_once_with(
+                self.pm, [('foo', 'bar', None)], namespace='/', skip_sid=None
+            )
+        self.pm._publish.mock.assert_not_called()
+
     def test_close_room(self):
         _run(self.pm.close_room('foo'))
         self.pm._publish.mock.assert_called_once_with(
@@ -200,6 +318,17 @@ class TestAsyncPubSubManager(unittest.TestCase):
                 callback=None,
             )
 
+    def test_handle_emit_encoded(self):
+        with mock.patch.object(
+            asyncio_manager.AsyncManager, 'emit_encoded', new=AsyncMock()
+        ) as super_emit_encoded:
+            _run(self.pm._handle_emit({'event': 'foo', 'packet': 'pkt',
+                                       'namespace': '/baz', 'room': 'room',
+                                       'skip_sid': 'sid', 'callback': None}))
+            super_emit_encoded.mock.assert_called_once_with(
+                self.pm, 'pkt', namespace='/baz', room='room',
+                skip_sid='sid')
+
     def test_handle_emit_with_namespace(self):
         with mock.patch.object(
             asyncio_manager.AsyncManager, 'emit', new=AsyncMock()
@@ -293,6 +422,30 @@ class TestAsyncPubSubManager(unittest.TestCase):
                 }
             )
 
+    def test_handle_emit_many(self):
+        with mock.patch.object(
+            asyncio_manager.AsyncManager, 'emit_many', new=AsyncMock()
+        ) as super_emit_many:
+            _run(self.pm._handle_emit_many(
+                {'events': [['foo', 'bar', None]], 'namespace': '/baz'}
+            ))
+            super_emit_many.mock.assert_called_once_with(
+                self.pm, [['foo', 'bar', None]], namespace='/baz',
+                skip_sid=None
+            )
+
+    def test_handle_emit_many_encoded(self):
+        with mock.patch.object(
+            asyncio_manager.AsyncManager, 'emit_many_encoded',
+            new=AsyncMock()
+        ) as super_emit_many_encoded:
+            _run(self.pm._handle_emit_many(
+                {'packets': [['pkt', None]], 'namespace': '/baz'}
+            ))
+            super_emit_many_encoded.mock.assert_called_once_with(
+                self.pm, [['pkt', None]], namespace='/baz', skip_sid=None
+            )
+
     def test_handle_callback(self):
         host_id = self.pm.host_id
         with mock.patch.object(
@@ -444,3 +597,161 @@ class TestAsyncPubSubManager(unittest.TestCase):
         self.pm._handle_close_room.mock.assert_called_once_with(
             {'method': 'close_room', 'value': 'baz'}
         )
+
+    def test_shards_not_supported(self):
+        with pytest.raises(ValueError):
+            asyncio_pubsub_manager.AsyncPubSubManager(shards=4)
+
+    def _routing_manager(self):
+        class RoutingManager(asyncio_pubsub_manager.AsyncPubSubManager):
+            supports_routing = True
+
+        pm = RoutingManager(shards=4)
+        pm._publish = AsyncMock()
+        pm.set_server(mock.MagicMock())
+        pm.host_id = '123456'
+        return pm
+
+    def test_routing_subscriptions(self):
+        pm = self._routing_manager()
+        channel = pm._get_room_channel('/', 'foo')
+        pm.enter_room('123', '/', 'foo')
+        pm.enter_room('456', '/', 'foo')
+        pm.server.start_background_task.assert_called_once_with(
+            pm._subscribe, channel)
+        pm.leave_room('123', '/', 'foo')
+        pm.leave_room('456', '/', 'foo')
+        assert pm.server.start_background_task.call_count == 2
+        pm.server.start_background_task.assert_called_with(
+            pm._unsubscribe, channel)
+        assert pm.room_channels == {}
+
+    def test_routing_emit(self):
+        pm = self._routing_manager()
+        _run(pm.emit('foo', 'bar', room='baz'))
+        pm._publish.mock.assert_called_once_with(
+            mock.ANY, channel=pm._get_room_channel('/', 'baz'))
+        pm._publish.mock.reset_mock()
+        _run(pm.emit('foo', 'bar'))
+        pm._publish.mock.assert_called_once_with(mock.ANY)
+
+    def test_routing_close_room(self):
+        pm = self._routing_manager()
+        _run(pm.close_room('baz'))
+        pm._publish.mock.assert_called_once_with(
+            {'method': 'close_room', 'room': 'baz', 'namespace': '/'},
+            channel=pm._get_room_channel('/', 'baz'))
+
+    def test_routing_emit_many(self):
+        pm = self._routing_manager()
+        pm.forward_encoded = True
+        pm.server._event_packet.side_effect = \
+            lambda event, data, namespace: mock.MagicMock(
+                encode=mock.MagicMock(return_value=event))
+        _run(pm.emit_many([('a', 1, None), ('b', 2, 'baz')]))
+        assert pm._publish.mock.call_count == 2
+        pm._publish.mock.assert_any_call(
+            {'method': 'emit_many', 'namespace': '/', 'skip_sid': None,
+             'host_id': '123456', 'packets': [('a', None)]})
+        pm._publish.mock.assert_any_call(
+            {'method': 'emit_many', 'namespace': '/', 'skip_sid': None,
+             'host_id': '123456', 'packets': [('b', 'baz')]},
+            channel=pm._get_room_channel('/', 'baz'))
+
+    def _unicast_manager(self, **kwargs):
+        class RoutingManager(asyncio_pubsub_manager.AsyncPubSubManager):
+            supports_routing = True
+
+        pm = RoutingManager(unicast=True, **kwargs)
+        pm._publish = AsyncMock()
+        pm.set_server(mock.MagicMock())
+        pm.host_id = '123456'
+        return pm
+
+    def test_unicast_announcements(self):
+        pm = self._unicast_manager()
+        pm.connect('123', '/')
+        pm.server.start_background_task.assert_called_once_with(
+            pm._publish,
+            {'method': 'connected', 'sid': '123', 'host_id': '123456'})
+        pm.disconnect('123', '/')
+        pm.server.start_background_task.assert_called_with(
+            pm._publish,
+            {'method': 'disconnected', 'sid': '123', 'host_id': '123456'})
+
+    def test_unicast_emit(self):
+        pm = self._unicast_manager()
+        pm._handle_connected({'method': 'connected', 'sid': '123',
+                              'host_id': 'abc'})
+        _run(pm.emit('foo', 'bar', room='123'))
+        pm._publish.mock.assert_called_once_with(mock.ANY,
+                                                 channel='socketio_v4@abc')
+        pm._publish.mock.reset_mock()
+        pm._handle_disconnected({'method': 'disconnected', 'sid': '123',
+                                 'host_id': 'abc'})
+        _run(pm.emit('foo', 'bar', room='123'))
+        pm._publish.mock.assert_called_once_with(mock.ANY)
+
+    def test_unicast_with_shards(self):
+        pm = self._unicast_manager(shards=4)
+        pm.connect('123', '/')
+        pm.server.start_background_task.assert_any_call(
+            pm._subscribe, pm._get_room_channel('/', '123'))
+        pm.enter_room('123', '/', 'foo')
+        assert set(pm.room_channels) == {pm._get_room_channel('/', '123'),
+                                         pm._get_room_channel('/', 'foo')}
+
+    def test_unicast_write_only_emit(self):
+        pm = self._unicast_manager(shards=4, write_only=True)
+        _run(pm.emit('foo', 'bar', room='123'))
+        pm._publish.mock.assert_called_once_with(
+            mock.ANY, channel=pm._get_room_channel('/', '123'))
+
+    def test_heartbeat_thread(self):
+        pm = self._unicast_manager()
+        pm.server.sleep = AsyncMock(side_effect=[None, RuntimeError()])
+        pm._handle_connected({'method': 'connected', 'sid': '123',
+                              'host_id': 'abc'})
+        pm.hosts_seen['abc'] = 0
+        with pytest.raises(RuntimeError):
+            _run(pm._heartbeat_thread())
+        assert pm.server.sleep.mock.call_args_list == [mock.call(20)] * 2
+        pm._publish.mock.assert_called_once_with(
+            {'method': 'alive', 'host_id': '123456'})
+        assert pm.sid_hosts == {}
+
+    def test_handle_alive(self):
+        pm = self._unicast_manager()
+        pm._handle_connected({'method': 'connected', 'sid': '123',
+                              'host_id': 'abc'})
+        pm.hosts_seen['abc'] = 0
+        _run(pm._handle_message({'method': 'alive', 'host_id': 'abc'}))
+        assert pm.hosts_seen['abc'] > 0
+
+    def test_request_directory(self):
+        pm = self._unicast_manager()
+        _run(pm._request_directory())
+        pm._publish.mock.assert_called_once_with(
+            {'method': 'directory', 'host_id': '123456'})
+
+    def test_handle_directory(self):
+        pm = self._unicast_manager()
+        pm.connect('123', '/')
+        _run(pm._handle_directory({'method': 'directory',
+                                   'host_id': '123456'}))
+        pm._publish.mock.assert_not_called()
+        _run(pm._handle_directory({'method': 'directory', 'host_id': 'abc'}))
+        pm._publish.mock.assert_called_once_with(
+            {'method': 'connected', 'sids': ['123'], 'host_id': '123456'},
+            channel='socketio_v4@abc')
+        pm._handle_connected({'method': 'connected', 'sids': ['456'],
+                              'host_id': 'abc'})
+        assert pm.sid_hosts == {'456': 'abc'}
+
+    def test_unicast_return_callback(self):
+        pm = self._unicast_manager()
+        _run(pm._return_callback('abc', '123', '/', 1, 'foo'))
+        pm._publish.mock.assert_called_once_with(
+            {'method': 'callback', 'host_id': 'abc', 'sid': '123',
+             'namespace': '/', 'id': 1, 'args': ('foo',)},
+            channel='socketio_v4@abc')
@@ -1,6 +1,15 @@
+import asyncio
 import sys
+import time
 import unittest
 
+import six
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
 from socketio_v4 import asyncio_redis_manager
 import pytest
 
@@ -70,3 +79,64 @@ class TestAsyncRedisManager(unittest.TestCase):
             0,
             True,
         )
+
+    def _manager(self, **kwargs):
+        with mock.patch.object(asyncio_redis_manager, 'aioredis'):
+            return asyncio_redis_manager.AsyncRedisManager(
+                'redis://', write_only=True, **kwargs)
+
+    def test_listen_batch(self):
+        rm = self._manager(listen_batch_size=2)
+        rm.listener_task = mock.MagicMock()
+        rm.listener_messages = asyncio.Queue()
+        for i in range(3):
+            rm.listener_messages.put_nowait((time.monotonic(), i))
+        loop = asyncio.get_event_loop()
+        assert loop.run_until_complete(rm._listen_batch()) == [0, 1]
+        assert loop.run_until_complete(rm._listen()) == 2
+        stats = rm.get_listener_stats()
+        assert stats['batches'] == 2
+        assert stats['pending'] == 0
+        assert stats['lag'] >= 0
+
+    def test_listener_stats_before_listening(self):
+        rm = self._manager()
+        assert rm.get_listener_stats() == {
+            'received': 0, 'batches': 0, 'lag': 0, 'full': 0, 'pending': 0}
+
+    def test_listener_queue_full(self):
+        rm = self._manager(listen_queue_size=2)
+
+        async def messages():
+            for i in range(3):
+                yield 'channel', i
+
+        async def create_redis(*args, **kwargs):
+            sub = mock.MagicMock()
+            sub.subscribe.return_value = asyncio.sleep(0)
+            return sub
+
+        async def read():
+            rm.listener_messages = asyncio.Queue(maxsize=rm.listen_queue_size)
+            reader = asyncio.ensure_future(rm._read_messages())
+            while rm.listener_stats['received'] < 2:
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            stats = rm.get_listener_stats()
+            assert stats['received'] == 2
+            assert stats['pending'] == 2
+            assert stats['full'] == 1
+            assert (await rm.listener_messages.get())[1] == 0
+            while rm.listener_stats['received'] < 3:
+                await asyncio.sleep(0)
+            reader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await reader
+
+        with mock.patch.object(asyncio_redis_manager, 'aioredis') as aioredis:
+            aioredis.RedisError = RuntimeError
+            aioredis.create_redis = create_redis
+            aioredis.pubsub.Receiver.return_value.iter = messages
+            asyncio.get_event_loop().run_until_complete(read())
+        assert rm.listener_messages.get_nowait()[1] == 1
+        assert rm.listener_messages.get_nowait()[1] == 2
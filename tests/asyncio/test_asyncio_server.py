@@ -164,6 +164,16 @@ class TestAsyncServer(unittest.TestCase):
             callback='cb',
         )
 
+    def test_emit_many(self, eio):
+        mgr = self._get_mock_manager()
+        mgr.emit_many = AsyncMock()
+        s = asyncio_server.AsyncServer(client_manager=mgr)
+        events = [('my event', {'foo': 'bar'}, 'room'), ('other', 1, None)]
+        _run(s.emit_many(events, skip_sid='123', namespace='/foo'))
+        s.manager.emit_many.mock.assert_called_once_with(
+            events, '/foo', skip_sid='123'
+        )
+
     def test_send(self, eio):
         mgr = self._get_mock_manager()
         s = asyncio_server.AsyncServer(client_manager=mgr)
@@ -358,6 +368,24 @@ class TestAsyncServer(unittest.TestCase):
         _run(s._emit_internal('123', u'my event', b'my binary data'))
         assert s.eio.send.mock.call_count == 2
 
+    def test_send_encoded_packet_binary(self, eio):
+        eio.return_value.send = AsyncMock()
+        s = asyncio_server.AsyncServer()
+        _run(s._send_encoded_packet('123', ['51-["my event",{}]', b'foo']))
+        assert s.eio.send.mock.call_args_list == [
+            mock.call('123', '51-["my event",{}]', binary=False),
+            mock.call('123', b'foo', binary=True),
+        ]
+
+    def test_send_encoded_packets(self, eio):
+        eio.return_value.send = AsyncMock()
+        s = asyncio_server.AsyncServer()
+        _run(s._send_encoded_packets('123', ['2["a"]', '2["b"]']))
+        assert s.eio.send.mock.call_args_list == [
+            mock.call('123', '2["a"]', binary=False),
+            mock.call('123', '2["b"]', binary=False),
+        ]
+
     def test_transport(self, eio):
         eio.return_value.send = AsyncMock()
         s = asyncio_server.AsyncServer()
@@ -574,6 +602,34 @@ class TestAsyncServer(unittest.TestCase):
         s = asyncio_server.AsyncServer(client_manager=mgr)
         _run(s._handle_eio_disconnect('123'))
 
+    def test_handle_event_with_dispatcher(self, eio):
+        s = asyncio_server.AsyncServer(handler_workers=4,
+                                       handler_queue_size=10,
+                                       handler_overflow='drop')
+        assert s.dispatcher.workers == 4
+        assert s.dispatcher.queue_size == 10
+        assert s.dispatcher.overflow == 'drop'
+        s.dispatcher.dispatch = AsyncMock()
+        s.manager.connect('123', '/')
+        _run(s._handle_eio_message('123', '2["my message","a"]'))
+        s.dispatcher.dispatch.mock.assert_called_once_with(
+            '123', '/', s._handle_event_internal, s, '123',
+            ['my message', 'a'], '/', None)
+
+    def test_disconnect_discards_events(self, eio):
+        s = asyncio_server.AsyncServer(handler_workers=4)
+        s.dispatcher.discard = mock.MagicMock()
+        s.manager.connect('123', '/')
+        s.manager.connect('123', '/foo')
+        _run(s._handle_eio_disconnect('123'))
+        s.dispatcher.discard.assert_any_call('123', '/foo')
+        s.dispatcher.discard.assert_any_call('123', '/')
+
+    def test_dispatcher_requires_async_handlers(self, eio):
+        s = asyncio_server.AsyncServer(async_handlers=False,
+                                       handler_workers=4)
+        assert s.dispatcher is None
+
     def test_handle_event(self, eio):
         eio.return_value.send = AsyncMock()
         s = asyncio_server.AsyncServer(async_handlers=False)
@@ -853,6 +909,32 @@ class TestAsyncServer(unittest.TestCase):
         _run(s.disconnect('123', '/foo'))
         assert result['result'] == ('disconnect', '123')
 
+    def test_event_table(self, eio):
+        class MyNamespace(asyncio_namespace.AsyncNamespace):
+            async def on_foo(self, sid):
+                return 'ns foo'
+
+            def on_bar(self, sid):
+                return 'ns bar'
+
+        s = asyncio_server.AsyncServer(async_handlers=False)
+        ns = MyNamespace('/foo')
+        s.register_namespace(ns)
+        assert s._event_table[('/foo', 'foo')] == (ns.on_foo, True)
+        assert s._event_table[('/foo', 'bar')] == (ns.on_bar, False)
+        assert _run(s._trigger_event('foo', '/foo', '123')) == 'ns foo'
+        assert _run(s._trigger_event('bar', '/foo', '123')) == 'ns bar'
+        assert _run(s._trigger_event('baz', '/foo', '123')) is None
+
+    def test_namespace_handler_with_trigger_event(self, eio):
+        class MyNamespace(asyncio_namespace.AsyncNamespace):
+            async def trigger_event(self, event, *args):
+                return 'catch all ' + event
+
+        s = asyncio_server.AsyncServer(async_handlers=False)
+        s.register_namespace(MyNamespace('/foo'))
+        assert _run(s._trigger_event('foo', '/foo', '123')) == 'catch all foo'
+
     def test_bad_namespace_handler(self, eio):
         class Dummy(object):
             pass
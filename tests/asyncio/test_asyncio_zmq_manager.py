@@ -0,0 +1,100 @@
+import asyncio
+import sys
+import unittest
+
+import six
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
+from socketio_v4 import asyncio_zmq_manager
+import pytest
+
+
+def _run(coro):
+    """Run the given coroutine."""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+class FakeAgain(Exception):
+    pass
+
+
+class FakeSocket(object):
+    """In-process stand-in for a ``zmq.asyncio`` socket."""
+    def __init__(self, socket_type):
+        self.socket_type = socket_type
+        self.options = {}
+        self.url = None
+        self.sent = []
+        self.received = []
+
+    def setsockopt(self, option, value):
+        self.options[option] = value
+
+    def setsockopt_string(self, option, value):
+        self.options[option] = value
+
+    def connect(self, url):
+        self.url = url
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def recv(self, flags=0):
+        if not self.received:
+            raise FakeAgain()
+        return self.received.pop(0)
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'only for Python 3.5+')
+class TestAsyncZmqManager(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(asyncio_zmq_manager, 'zmq')
+        zmq = patcher.start()
+        zmq.asyncio.Context.instance.return_value.socket = FakeSocket
+        zmq.Again = FakeAgain
+        self.addCleanup(patcher.stop)
+
+    def _envelope(self, zm, data, channel='socketio_v4'):
+        return zm._encode_message({'type': 'message', 'channel': channel,
+                                   'data': data})
+
+    def test_connect(self):
+        zm = asyncio_zmq_manager.AsyncZmqManager(
+            'zmq+tcp://localhost:5555+5556', max_pending=10)
+        assert zm.sink.url == 'tcp://localhost:5555'
+        assert zm.sub.url == 'tcp://localhost:5556'
+        assert zm.sink.options[asyncio_zmq_manager.zmq.SNDHWM] == 10
+
+    def test_bad_url(self):
+        with pytest.raises(RuntimeError):
+            asyncio_zmq_manager.AsyncZmqManager('tcp://localhost:5555')
+
+    def test_publish(self):
+        zm = asyncio_zmq_manager.AsyncZmqManager(codec='json')
+        _run(zm._publish({'method': 'emit'}))
+        assert zm.sink.sent == [self._envelope(zm, {'method': 'emit'})]
+
+    def test_listen(self):
+        zm = asyncio_zmq_manager.AsyncZmqManager(codec='json')
+        zm.sub.received = [
+            self._envelope(zm, {'method': 'foo'}, channel='other'),
+            self._envelope(zm, {'method': 'emit'}),
+        ]
+        assert _run(zm._listen()) == {'method': 'emit'}
+
+    def test_listen_batch(self):
+        zm = asyncio_zmq_manager.AsyncZmqManager(codec='json',
+                                                 listen_batch_size=2)
+        zm.sub.received = [
+            self._envelope(zm, {'method': 'a'}),
+            b'bad message',
+            self._envelope(zm, {'method': 'b'}),
+            self._envelope(zm, {'method': 'c'}),
+        ]
+        assert _run(zm._listen_batch()) == [{'method': 'a'}]
+        assert _run(zm._listen_batch()) == [{'method': 'b'},
+                                            {'method': 'c'}]
@@ -13,6 +13,7 @@ from socketio_v4 import base_manager
 class TestBaseManager(unittest.TestCase):
     def setUp(self):
         mock_server = mock.MagicMock()
+        mock_server._event_packet.return_value.encode.return_value = 'pkt'
         self.bm = base_manager.BaseManager()
         self.bm.set_server(mock_server)
         self.bm.initialize()
@@ -27,6 +28,9 @@ class TestBaseManager(unittest.TestCase):
             None: {'123': True},
             '123': {'123': True},
         }
+        assert self.bm.sid_rooms['/foo'] == {
+            '123': {None: True, '123': True},
+        }
 
     def test_pre_disconnect(self):
         self.bm.connect('123', '/foo')
@@ -101,6 +105,7 @@ class TestBaseManager(unittest.TestCase):
         self.bm.disconnect('123', '/foo')
         self.bm.disconnect('456', '/foo')
         assert self.bm.rooms == {}
+        assert self.bm.sid_rooms == {}
 
     def test_disconnect_with_callbacks(self):
         self.bm.connect('123', '/')
@@ -140,6 +145,84 @@ class TestBaseManager(unittest.TestCase):
         self.bm.trigger_callback('123', '/', id + 1, ['foo'])
         assert cb.call_count == 0
 
+    @mock.patch('socketio_v4.base_manager.time.time')
+    def test_callback_timeout(self, time):
+        self.bm.callback_timeout = 10
+        self.bm.connect('123', '/')
+        cb = mock.MagicMock()
+        time.return_value = 100
+        id1 = self.bm._generate_ack_id('123', '/', cb)
+        id2 = self.bm._generate_ack_id('123', '/', cb)
+        time.return_value = 105
+        id3 = self.bm._generate_ack_id('123', '/', cb)
+        self.bm.trigger_callback('123', '/', id2, ['foo'])
+        assert self.bm.get_callback_stats() == {'pending': 2, 'expired': 0}
+        time.return_value = 110
+        assert self.bm.get_callback_stats() == {'pending': 1, 'expired': 1}
+        assert id1 not in self.bm.callbacks['123']['/']
+        assert id3 in self.bm.callbacks['123']['/']
+        self.bm.trigger_callback('123', '/', id1, ['foo'])
+        assert cb.call_count == 1
+        time.return_value = 115
+        self.bm.disconnect('123', '/')
+        assert self.bm.get_callback_stats() == {'pending': 0, 'expired': 1}
+        assert self.bm._callback_deadlines == []
+
+    @mock.patch('socketio_v4.base_manager.time.time')
+    def test_expired_callbacks_removed(self, time):
+        self.bm.callback_timeout = 10
+        time.return_value = 100
+        for i in range(1000):
+            # callbacks addressed to rooms or clients of other servers
+            self.bm._generate_ack_id('room{}'.format(i), '/', 'f')
+        time.return_value = 110
+        assert self.bm.get_callback_stats() == {'pending': 0,
+                                                'expired': 1000}
+        assert self.bm.callbacks == {}
+
+    def test_triggered_callbacks_removed(self):
+        cb = mock.MagicMock()
+        id1 = self.bm._generate_ack_id('room', '/', cb)
+        id2 = self.bm._generate_ack_id('room', '/foo', cb)
+        self.bm.trigger_callback('room', '/', id1, ['foo'])
+        assert self.bm.callbacks == {'room': {'/foo': mock.ANY}}
+        self.bm.trigger_callback('room', '/foo', id2, ['foo'])
+        assert self.bm.callbacks == {}
+        assert cb.call_count == 2
+
+    @mock.patch('socketio_v4.base_manager.time.time')
+    def test_stale_deadline_after_entry_removed(self, time):
+        self.bm.callback_timeout = 10
+        cb = mock.MagicMock()
+        time.return_value = 100
+        id1 = self.bm._generate_ack_id('123', '/', cb)
+        self.bm.trigger_callback('123', '/', id1, ['foo'])
+        time.return_value = 105
+        id2 = self.bm._generate_ack_id('123', '/', cb)
+        time.return_value = 110
+        assert self.bm.get_callback_stats() == {'pending': 1, 'expired': 0}
+        self.bm.trigger_callback('123', '/', id2, ['bar'])
+        cb.assert_called_with('bar')
+
+    def test_ack_ids_not_reused(self):
+        cb1 = mock.MagicMock()
+        cb2 = mock.MagicMock()
+        id1 = self.bm._generate_ack_id('room', '/', cb1)
+        self.bm.trigger_callback('room', '/', id1, ['foo'])
+        assert self.bm.callbacks == {}
+        id2 = self.bm._generate_ack_id('room', '/', cb2)
+        assert id2 != id1
+        # a late ack for the first emit does not reach the second callback
+        self.bm.trigger_callback('room', '/', id1, ['bar'])
+        cb1.assert_called_once_with('foo')
+        cb2.assert_not_called()
+
+    def test_no_callback_timeout(self):
+        self.bm.connect('123', '/')
+        self.bm._generate_ack_id('123', '/', 'f')
+        assert self.bm._callback_deadlines == []
+        assert self.bm.get_callback_stats() == {'pending': 1, 'expired': 0}
+
     def test_get_namespaces(self):
         assert list(self.bm.get_namespaces()) == []
         self.bm.connect('123', '/')
@@ -159,6 +242,56 @@ class TestBaseManager(unittest.TestCase):
         assert len(participants) == 2
         assert '789' not in participants
 
+    def test_get_participants_snapshot(self):
+        self.bm.snapshot_threshold = 2
+        self.bm.connect('123', '/')
+        self.bm.connect('456', '/')
+        participants = self.bm.get_participants('/', None)
+        assert self.bm._room_snapshots[('/', None)][1] == ('123', '456')
+        self.bm.disconnect('123', '/')
+        assert ('/', None) not in self.bm._room_snapshots
+        assert list(participants) == ['123', '456']
+        self.bm.connect('789', '/')
+        assert list(self.bm.get_participants('/', None)) == ['456', '789']
+
+    def test_get_participants_stale_snapshot(self):
+        self.bm.snapshot_threshold = 2
+        self.bm.connect('123', '/')
+        version = self.bm._room_versions[('/', None)]
+        self.bm.connect('456', '/')
+        # a snapshot stored by a thread that read the room before the change
+        self.bm._room_snapshots[('/', None)] = (version, ('123',))
+        assert list(self.bm.get_participants('/', None)) == ['123', '456']
+        assert self.bm._room_snapshots[('/', None)] == (
+            self.bm._room_versions[('/', None)], ('123', '456'))
+
+    def test_get_participants_small_room(self):
+        self.bm.connect('123', '/')
+        participants = self.bm.get_participants('/', '123')
+        self.bm.enter_room('456', '/', '123')
+        assert list(participants) == ['123']
+        assert list(self.bm.get_participants('/', '123')) == ['123', '456']
+        assert self.bm._room_snapshots == {}
+
+    def test_room_versions_removed(self):
+        self.bm.enter_room('123', '/', 'foo')
+        list(self.bm.get_participants('/', 'foo'))
+        self.bm.leave_room('123', '/', 'foo')
+        assert ('/', 'foo') not in self.bm._room_versions
+        assert ('/', 'foo') not in self.bm._room_snapshots
+
+    def test_leave_room(self):
+        self.bm.connect('123', '/foo')
+        self.bm.enter_room('123', '/foo', 'bar')
+        self.bm.enter_room('456', '/foo', 'bar')
+        self.bm.leave_room('123', '/foo', 'bar')
+        assert self.bm.rooms['/foo']['bar'] == {'456': True}
+        assert self.bm.sid_rooms['/foo']['123'] == {None: True, '123': True}
+        assert self.bm.get_rooms('123', '/foo') == ['123']
+        self.bm.leave_room('456', '/foo', 'bar')
+        assert 'bar' not in self.bm.rooms['/foo']
+        assert '456' not in self.bm.sid_rooms['/foo']
+
     def test_leave_invalid_room(self):
         self.bm.connect('123', '/foo')
         self.bm.leave_room('123', '/foo', 'baz')
@@ -176,6 +309,7 @@ class TestBaseManager(unittest.TestCase):
         self.bm.enter_room('123', '/foo', 'bar')
         self.bm.close_room('bar', '/foo')
         assert 'bar' not in self.bm.rooms['/foo']
+        assert 'bar' not in self.bm.sid_rooms['/foo']['123']
 
     def test_close_invalid_room(self):
         self.bm.close_room('bar', '/foo')
@@ -192,8 +326,8 @@ class TestBaseManager(unittest.TestCase):
         self.bm.connect('123', '/foo')
         self.bm.connect('456', '/foo')
         self.bm.emit('my event', {'foo': 'bar'}, namespace='/foo', room='123')
-        self.bm.server._emit_internal.assert_called_once_with(
-            '123', 'my event', {'foo': 'bar'}, '/foo', None
+        self.bm.server._send_encoded_packet.assert_called_once_with(
+            '123', 'pkt'
         )
 
     def test_emit_to_room(self):
@@ -203,13 +337,12 @@ class TestBaseManager(unittest.TestCase):
         self.bm.enter_room('456', '/foo', 'bar')
         self.bm.connect('789', '/foo')
         self.bm.emit('my event', {'foo': 'bar'}, namespace='/foo', room='bar')
-        assert self.bm.server._emit_internal.call_count == 2
-        self.bm.server._emit_internal.assert_any_call(
-            '123', 'my event', {'foo': 'bar'}, '/foo', None
-        )
-        self.bm.server._emit_internal.assert_any_call(
-            '456', 'my event', {'foo': 'bar'}, '/foo', None
+        self.bm.server._event_packet.assert_called_once_with(
+            'my event', {'foo': 'bar'}, '/foo'
         )
+        assert self.bm.server._send_encoded_packet.call_count == 2
+        self.bm.server._send_encoded_packet.assert_any_call('123', 'pkt')
+        self.bm.server._send_encoded_packet.assert_any_call('456', 'pkt')
 
     def test_emit_to_all(self):
         self.bm.connect('123', '/foo')
@@ -219,16 +352,10 @@ class TestBaseManager(unittest.TestCase):
         self.bm.connect('789', '/foo')
         self.bm.connect('abc', '/bar')
         self.bm.emit('my event', {'foo': 'bar'}, namespace='/foo')
-        assert self.bm.server._emit_internal.call_count == 3
-        self.bm.server._emit_internal.assert_any_call(
-            '123', 'my event', {'foo': 'bar'}, '/foo', None
-        )
-        self.bm.server._emit_internal.assert_any_call(
-            '456', 'my event', {'foo': 'bar'}, '/foo', None
-        )
-        self.bm.server._emit_internal.assert_any_call(
-            '789', 'my event', {'foo': 'bar'}, '/foo', None
-        )
+        assert self.bm.server._send_encoded_packet.call_count == 3
+        self.bm.server._send_encoded_packet.assert_any_call('123', 'pkt')
+        self.bm.server._send_encoded_packet.assert_any_call('456', 'pkt')
+        self.bm.server._send_encoded_packet.assert_any_call('789', 'pkt')
 
     def test_emit_to_all_skip_one(self):
         self.bm.connect('123', '/foo')
@@ -240,13 +367,9 @@ class TestBaseManager(unittest.TestCase):
         self.bm.emit(
             'my event', {'foo': 'bar'}, namespace='/foo', skip_sid='456'
         )
-        assert self.bm.server._emit_internal.call_count == 2
-        self.bm.server._emit_internal.assert_any_call(
-            '123', 'my event', {'foo': 'bar'}, '/foo', None
-        )
-        self.bm.server._emit_internal.assert_any_call(
-            '789', 'my event', {'foo': 'bar'}, '/foo', None
-        )
+        assert self.bm.server._send_encoded_packet.call_count == 2
+        self.bm.server._send_encoded_packet.assert_any_call('123', 'pkt')
+        self.bm.server._send_encoded_packet.assert_any_call('789', 'pkt')
 
     def test_emit_to_all_skip_two(self):
         self.bm.connect('123', '/foo')
@@ -261,10 +384,8 @@ class TestBaseManager(unittest.TestCase):
             namespace='/foo',
             skip_sid=['123', '789'],
         )
-        assert self.bm.server._emit_internal.call_count == 1
-        self.bm.server._emit_internal.assert_any_call(
-            '456', 'my event', {'foo': 'bar'}, '/foo', None
-        )
+        assert self.bm.server._send_encoded_packet.call_count == 1
+        self.bm.server._send_encoded_packet.assert_any_call('456', 'pkt')
 
     def test_emit_with_callback(self):
         self.bm.connect('123', '/foo')
@@ -278,6 +399,54 @@ class TestBaseManager(unittest.TestCase):
             '123', 'my event', {'foo': 'bar'}, '/foo', 11
         )
 
+    def test_emit_many(self):
+        self.bm.connect('123', '/foo')
+        self.bm.enter_room('123', '/foo', 'bar')
+        self.bm.connect('456', '/foo')
+        self.bm.connect('789', '/foo')
+        self.bm.server._event_packet.side_effect = \
+            lambda event, data, namespace: mock.MagicMock(
+                encode=mock.MagicMock(return_value=event))
+        self.bm.emit_many([('a', 1, None), ('b', 2, 'bar'), ('c', 3, 'baz')],
+                          namespace='/foo', skip_sid='789')
+        assert self.bm.server._event_packet.call_count == 2
+        assert self.bm.server._send_encoded_packets.call_count == 2
+        self.bm.server._send_encoded_packets.assert_any_call(
+            '123', ['a', 'b']
+        )
+        self.bm.server._send_encoded_packets.assert_any_call('456', ['a'])
+
+    def test_emit_encoded(self):
+        self.bm.connect('123', '/foo')
+        self.bm.connect('456', '/foo')
+        self.bm.connect('789', '/foo')
+        self.bm.emit_encoded('pkt', namespace='/foo', skip_sid='789')
+        self.bm.server._event_packet.assert_not_called()
+        assert self.bm.server._send_encoded_packet.call_count == 2
+        self.bm.server._send_encoded_packet.assert_any_call('123', 'pkt')
+        self.bm.server._send_encoded_packet.assert_any_call('456', 'pkt')
+
+    def test_emit_encoded_to_invalid_room(self):
+        self.bm.emit_encoded('pkt', namespace='/', room='123')
+        self.bm.server._send_encoded_packet.assert_not_called()
+
+    def test_emit_many_encoded(self):
+        self.bm.connect('123', '/foo')
+        self.bm.enter_room('123', '/foo', 'bar')
+        self.bm.connect('456', '/foo')
+        self.bm.emit_many_encoded([['a', None], ['b', 'bar'], ['c', 'baz']],
+                                  namespace='/foo')
+        self.bm.server._event_packet.assert_not_called()
+        assert self.bm.server._send_encoded_packets.call_count == 2
+        self.bm.server._send_encoded_packets.assert_any_call(
+            '123', ['a', 'b']
+        )
+        self.bm.server._send_encoded_packets.assert_any_call('456', ['a'])
+
+    def test_emit_many_invalid_namespace(self):
+        self.bm.emit_many([('a', 1, None)], namespace='/foo')
+        self.bm.server._send_encoded_packets.assert_not_called()
+
     def test_emit_to_invalid_room(self):
         self.bm.emit('my event', {'foo': 'bar'}, namespace='/', room='123')
 
@@ -0,0 +1,210 @@
+import threading
+import time
+import unittest
+
+import six
+from six.moves import queue
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
+from socketio_v4 import dispatcher
+import pytest
+
+
+def _start_thread(target, *args):
+    t = threading.Thread(target=target, args=args)
+    t.daemon = True
+    t.start()
+    return t
+
+
+class TestDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.server = mock.MagicMock()
+        self.server.eio.create_queue = queue.Queue
+        self.server.start_background_task = _start_thread
+
+    def _wait_for(self, d, processed):
+        for _ in range(100):
+            if d.get_stats()['processed'] >= processed:
+                return
+            time.sleep(0.01)
+
+    def _wait_for_queued(self, d, queued):
+        for _ in range(100):
+            if d.get_stats()['queued'] == queued:
+                return
+            time.sleep(0.01)
+
+    def test_invalid_overflow(self):
+        with pytest.raises(ValueError):
+            dispatcher.Dispatcher(self.server, 2, overflow='foo')
+
+    def test_invalid_ordering(self):
+        with pytest.raises(ValueError):
+            dispatcher.Dispatcher(self.server, 2, ordering='foo')
+
+    def test_dispatch_in_order(self):
+        d = dispatcher.Dispatcher(self.server, 2)
+        calls = []
+
+        def handler(sid, n):
+            time.sleep(0.01 if n == 0 else 0)
+            calls.append((sid, n))
+
+        for n in range(3):
+            d.dispatch('a', '/', handler, 'a', n)
+            d.dispatch('b', '/', handler, 'b', n)
+        self._wait_for(d, 6)
+        assert len(d.threads) == 2
+        assert [n for sid, n in calls if sid == 'a'] == [0, 1, 2]
+        assert [n for sid, n in calls if sid == 'b'] == [0, 1, 2]
+        assert d.get_stats()['queued'] == 0
+        assert d.get_stats()['dropped'] == 0
+        assert d.get_stats()['mailboxes'] == 0
+        assert d.mailboxes == {}
+
+    def test_clients_in_parallel(self):
+        d = dispatcher.Dispatcher(self.server, 2)
+        event = threading.Event()
+        calls = []
+
+        def handler(sid, n):
+            calls.append((sid, n))
+            if sid == 'a':
+                event.wait(1)
+
+        d.dispatch('a', '/', handler, 'a', 0)
+        d.dispatch('a', '/', handler, 'a', 1)
+        d.dispatch('b', '/', handler, 'b', 0)
+        self._wait_for(d, 1)
+        # the second event of the blocked client must wait for the first
+        assert calls == [('a', 0), ('b', 0)]
+        assert d.get_stats()['queued'] == 1
+        event.set()
+        self._wait_for(d, 3)
+        assert calls == [('a', 0), ('b', 0), ('a', 1)]
+
+    def test_ordering_by_namespace(self):
+        d = dispatcher.Dispatcher(self.server, 2, ordering='namespace')
+        event = threading.Event()
+        calls = []
+
+        def handler(namespace):
+            calls.append(namespace)
+            if namespace == '/':
+                event.wait(1)
+
+        d.dispatch('a', '/', handler, '/')
+        d.dispatch('a', '/foo', handler, '/foo')
+        self._wait_for(d, 1)
+        assert calls == ['/', '/foo']
+        event.set()
+        self._wait_for(d, 2)
+
+    def test_discard(self):
+        d = dispatcher.Dispatcher(self.server, 1)
+        event = threading.Event()
+        handler = mock.MagicMock(side_effect=lambda n: event.wait(1))
+        d.dispatch('a', '/', handler, 0)
+        self._wait_for_queued(d, 0)
+        d.dispatch('a', '/foo', handler, 1)
+        d.dispatch('a', '/', handler, 2)
+        d.dispatch('a', '/foo', handler, 3)
+        d.discard('a', '/foo')
+        d.discard('b', '/foo')
+        assert d.get_stats()['queued'] == 1
+        assert d.get_stats()['discarded'] == 2
+        d.discard('a', '/')
+        assert d.get_stats()['queued'] == 0
+        assert d.get_stats()['discarded'] == 3
+        event.set()
+        for _ in range(100):
+            if not d.mailboxes:
+                break
+            time.sleep(0.01)
+        assert d.mailboxes == {}
+        handler.assert_called_once_with(0)
+
+    def test_workers_are_reused(self):
+        d = dispatcher.Dispatcher(self.server, 1)
+        handler = mock.MagicMock()
+        for n in range(10):
+            d.dispatch('a', '/', handler, n)
+        self._wait_for(d, 10)
+        assert len(d.threads) == 1
+        assert handler.call_count == 10
+
+    def test_handler_error(self):
+        d = dispatcher.Dispatcher(self.server, 1)
+        handler = mock.MagicMock(side_effect=[RuntimeError, None])
+        d.dispatch('a', '/', handler)
+        d.dispatch('a', '/', handler)
+        self._wait_for(d, 2)
+        assert handler.call_count == 2
+        self.server.logger.exception.assert_called_once_with(
+            'event handler error')
+
+    def test_overflow_drop(self):
+        d = dispatcher.Dispatcher(self.server, 1, queue_size=1,
+                                  overflow='drop')
+        event = threading.Event()
+        handler = mock.MagicMock(side_effect=lambda: event.wait(1))
+        d.dispatch('a', '/', handler)
+        self._wait_for_queued(d, 0)
+        d.dispatch('a', '/', handler)
+        d.dispatch('a', '/', handler)
+        assert d.get_stats()['queued'] == 1
+        assert d.get_stats()['dropped'] == 1
+        event.set()
+        self._wait_for(d, 2)
+        assert handler.call_count == 2
+        self.server.disconnect.assert_not_called()
+
+    def test_overflow_disconnect(self):
+        d = dispatcher.Dispatcher(self.server, 1, queue_size=1,
+                                  overflow='disconnect')
+        event = threading.Event()
+        handler = mock.MagicMock(side_effect=lambda: event.wait(1))
+        d.dispatch('a', '/foo', handler)
+        self._wait_for_queued(d, 0)
+        d.dispatch('a', '/foo', handler)
+        d.dispatch('a', '/foo', handler)
+        event.set()
+        assert d.get_stats()['dropped'] == 1
+        self.server.disconnect.assert_called_once_with('a',
+                                                       namespace='/foo')
+
+    def test_overflow_block(self):
+        queues = []
+
+        def create_queue(*args):
+            queues.append(queue.Queue(*args))
+            return queues[-1]
+
+        self.server.eio.create_queue = create_queue
+        d = dispatcher.Dispatcher(self.server, 1, queue_size=1)
+        event = threading.Event()
+        handler = mock.MagicMock(side_effect=lambda n: event.wait(1))
+        d.dispatch('a', '/', handler, 0)
+        self._wait_for_queued(d, 0)
+        d.dispatch('a', '/', handler, 1)
+        # the slots are a queue of the async model of the server, so that
+        # waiting for one does not block the whole process under eventlet
+        # or gevent
+        assert queues[0].maxsize == 1
+        assert queues[0].full()
+        reader = _start_thread(d.dispatch, 'a', '/', handler, 2)
+        reader.join(0.05)
+        assert reader.is_alive()
+        assert d.get_stats()['queued'] == 1
+        event.set()
+        reader.join(1)
+        self._wait_for(d, 3)
+        assert handler.call_args_list == [mock.call(0), mock.call(1),
+                                          mock.call(2)]
+        assert d.get_stats()['dropped'] == 0
+        assert queues[0].empty()
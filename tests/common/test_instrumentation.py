@@ -0,0 +1,73 @@
+import logging
+import unittest
+
+import six
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
+from socketio_v4 import instrumentation
+import pytest
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_all_categories(self):
+        logger = mock.MagicMock()
+        log = instrumentation.Instrumentation(logger)
+        for category in ['emit', 'receive', 'rooms', 'pubsub']:
+            getattr(log, category)('foo %s', category)
+            logger.info.assert_called_with('foo %s', category)
+        assert logger.info.call_count == 4
+
+    def test_categories(self):
+        logger = mock.MagicMock()
+        log = instrumentation.Instrumentation(logger,
+                                              categories=['emit', 'rooms'])
+        assert log.emit is not None
+        assert log.rooms is not None
+        assert log.receive is None
+        assert log.pubsub is None
+
+    def test_invalid_category(self):
+        with pytest.raises(ValueError):
+            instrumentation.Instrumentation(mock.MagicMock(),
+                                            categories=['foo'])
+        with pytest.raises(ValueError):
+            instrumentation.Instrumentation(mock.MagicMock(),
+                                            sample_rates={'foo': 0.5})
+
+    def test_sample_rates(self):
+        logger = mock.MagicMock()
+        log = instrumentation.Instrumentation(
+            logger, sample_rates={'emit': 0.25, 'receive': 0})
+        assert log.receive is None
+        for i in range(8):
+            log.emit('emit %d', i)
+        assert logger.info.call_args_list == [mock.call('emit %d', 0),
+                                              mock.call('emit %d', 4)]
+        log.rooms('rooms')
+        logger.info.assert_called_with('rooms')
+
+    def test_unsampled_category_uses_logger(self):
+        logger = mock.MagicMock()
+        log = instrumentation.Instrumentation(logger)
+        assert log.emit == logger.info
+
+    def test_logger_level_changed_later(self):
+        logger = logging.getLogger('socketio_v4.test_instrumentation')
+        logger.setLevel(logging.ERROR)
+        log = instrumentation.Instrumentation(logger)
+        for category in ['emit', 'receive', 'rooms', 'pubsub']:
+            assert getattr(log, category) == logger.info
+        logger.setLevel(logging.INFO)
+        with mock.patch.object(logger, 'handle') as handle:
+            log.emit('foo %s', 'bar')
+        assert handle.call_count == 1
+        assert handle.call_args[0][0].getMessage() == 'foo bar'
+
+    def test_not_a_logger(self):
+        log = instrumentation.Instrumentation('foo')
+        for category in ['emit', 'receive', 'rooms', 'pubsub']:
+            assert getattr(log, category) is None
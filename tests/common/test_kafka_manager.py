@@ -0,0 +1,64 @@
+import unittest
+
+import six
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
+from socketio_v4 import kafka_manager
+
+
+class TestKafkaManager(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(kafka_manager, 'kafka')
+        self.kafka = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_options(self):
+        kafka_manager.KafkaManager(
+            'kafka://', producer_options={'linger_ms': 5},
+            consumer_options={'group_id': 'foo'})
+        self.kafka.KafkaProducer.assert_called_once_with(
+            bootstrap_servers='localhost:9092', linger_ms=5)
+        self.kafka.KafkaConsumer.assert_called_once_with(
+            'socketio_v4', bootstrap_servers='localhost:9092',
+            group_id='foo')
+
+    def test_publish_and_flush(self):
+        km = kafka_manager.KafkaManager('kafka://')
+        km._publish({'method': 'emit', 'namespace': '/', 'room': 'foo'})
+        km.producer.send.assert_called_once_with(
+            'socketio_v4',
+            value=km._encode_message({'method': 'emit', 'namespace': '/',
+                                      'room': 'foo'}),
+            key=b'/\x00foo')
+        km.producer.flush.assert_called_once_with()
+
+    def test_publish_without_flush(self):
+        km = kafka_manager.KafkaManager('kafka://', flush_interval=None)
+        km._publish({'method': 'close_room', 'namespace': '/foo'})
+        km.producer.send.assert_called_once_with(
+            'socketio_v4', value=mock.ANY, key=b'/foo')
+        km.producer.flush.assert_not_called()
+        assert km.flusher is None
+
+    def test_periodic_flush(self):
+        km = kafka_manager.KafkaManager('kafka://', flush_interval=1)
+        km.set_server(mock.MagicMock())
+        km._publish({'method': 'emit'})
+        km._publish({'method': 'emit'})
+        km.producer.flush.assert_not_called()
+        km.server.start_background_task.assert_called_once_with(mock.ANY)
+
+    def test_delivery_error(self):
+        on_error = mock.MagicMock()
+        km = kafka_manager.KafkaManager('kafka://',
+                                        on_delivery_error=on_error)
+        km._publish({'method': 'emit'})
+        errback = km.producer.send.return_value.add_errback.call_args[0][0]
+        exc = RuntimeError('foo')
+        errback(exc)
+        assert km.delivery_errors == 1
+        on_error.assert_called_once_with(exc)
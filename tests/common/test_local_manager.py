@@ -0,0 +1,107 @@
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+import six
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
+from socketio_v4 import local_manager
+import pytest
+
+
+@unittest.skipIf(not hasattr(socket, 'AF_UNIX'), 'requires unix sockets')
+class TestLocalManager(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def _manager(self, **kwargs):
+        lm = local_manager.LocalManager(path=self.path, codec='json',
+                                        **kwargs)
+        self.addCleanup(lm.close)
+        return lm
+
+    def test_default_path(self):
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': ''}):
+            lm = local_manager.LocalManager(channel='test-local-manager')
+        assert lm.socket_dir == os.path.join(
+            tempfile.gettempdir(),
+            'socketio_v4-{}-test-local-manager'.format(os.getuid()))
+        assert os.path.isdir(lm.socket_dir)
+        assert os.stat(lm.socket_dir).st_mode & 0o777 == 0o700
+        os.rmdir(lm.socket_dir)
+
+    def test_default_path_runtime_dir(self):
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': self.path}):
+            lm = local_manager.LocalManager(channel='foo')
+        assert lm.socket_dir == os.path.join(
+            self.path, 'socketio_v4-{}-foo'.format(os.getuid()))
+        assert os.path.isdir(lm.socket_dir)
+
+    def test_path_writable_by_others(self):
+        os.chmod(self.path, 0o777)
+        with pytest.raises(RuntimeError):
+            self._manager()
+        os.chmod(self.path, 0o770)
+        with pytest.raises(RuntimeError):
+            self._manager()
+
+    def test_path_owned_by_other_user(self):
+        with mock.patch.object(local_manager.os, 'getuid',
+                               return_value=os.getuid() + 1):
+            with pytest.raises(RuntimeError):
+                self._manager()
+
+    def test_default_path_symlink(self):
+        target = os.path.join(self.path, 'target')
+        os.mkdir(target, 0o700)
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': self.path}):
+            os.symlink(target, os.path.join(
+                self.path, 'socketio_v4-{}-foo'.format(os.getuid())))
+            with pytest.raises(RuntimeError):
+                local_manager.LocalManager(channel='foo')
+
+    def test_publish_to_all_workers(self):
+        lm1 = self._manager()
+        lm2 = self._manager()
+        listener1 = lm1._listen()
+        listener2 = lm2._listen()
+        lm1._bind()
+        lm2._bind()
+        lm1.receiver.settimeout(1)
+        lm2.receiver.settimeout(1)
+        lm1._publish({'method': 'emit'})
+        assert lm1._decode_message(next(listener1)) == {'method': 'emit'}
+        assert lm2._decode_message(next(listener2)) == {'method': 'emit'}
+
+    def test_write_only(self):
+        lm1 = self._manager()
+        lm1._bind()
+        lm1.receiver.settimeout(1)
+        lm2 = self._manager(write_only=True)
+        lm2._publish({'method': 'emit'})
+        assert not os.path.exists(lm2.socket_path)
+        assert lm1._decode_message(next(lm1._listen())) == {'method': 'emit'}
+
+    def test_stale_worker(self):
+        stale_path = os.path.join(self.path, 'stale.sock')
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(stale_path)
+        stale.close()
+        lm = self._manager()
+        lm._publish({'method': 'emit'})
+        assert not os.path.exists(stale_path)
+
+    def test_close(self):
+        lm = self._manager()
+        lm._bind()
+        assert os.path.exists(lm.socket_path)
+        lm.close()
+        assert not os.path.exists(lm.socket_path)
+        assert lm.receiver is None
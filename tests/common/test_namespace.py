@@ -87,6 +87,18 @@ class TestNamespace(unittest.TestCase):
             callback='cb',
         )
 
+    def test_emit_many(self):
+        ns = namespace.Namespace('/foo')
+        ns._set_server(mock.MagicMock())
+        ns.emit_many([('ev', 'data', 'room')], skip_sid='skip')
+        ns.server.emit_many.assert_called_with(
+            [('ev', 'data', 'room')], skip_sid='skip', namespace='/foo'
+        )
+        ns.emit_many([('ev', 'data', 'room')], namespace='/bar')
+        ns.server.emit_many.assert_called_with(
+            [('ev', 'data', 'room')], skip_sid=None, namespace='/bar'
+        )
+
     def test_send(self):
         ns = namespace.Namespace('/foo')
         ns._set_server(mock.MagicMock())
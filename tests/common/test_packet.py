@@ -2,6 +2,11 @@ import unittest
 
 import six
 
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
 from socketio_v4 import packet
 import pytest
 
@@ -248,16 +253,62 @@ class TestPacket(unittest.TestCase):
         with pytest.raises(ValueError):
             pkt.add_attachment(b'123')
 
-    def test_data_is_binary_list(self):
+    def test_deconstruct_binary_text_only(self):
         pkt = packet.Packet()
-        assert not pkt._data_is_binary([six.text_type('foo')])
-        assert not pkt._data_is_binary([])
-        assert pkt._data_is_binary([b'foo'])
-        assert pkt._data_is_binary([six.text_type('foo'), b'bar'])
+        data = ['foo', {'a': [1, 2], 'b': 'bar'}]
+        new_data, attachments = pkt._deconstruct_binary(data)
+        assert new_data is data
+        assert attachments == []
 
-    def test_data_is_binary_dict(self):
+    def test_deconstruct_binary_copies_binary_containers(self):
         pkt = packet.Packet()
-        assert not pkt._data_is_binary({'a': six.text_type('foo')})
-        assert not pkt._data_is_binary({})
-        assert pkt._data_is_binary({'a': b'foo'})
-        assert pkt._data_is_binary({'a': six.text_type('foo'), 'b': b'bar'})
+        text = {'a': [1, 2]}
+        data = ['foo', text, {'b': b'bar', 'c': 'baz'}]
+        new_data, attachments = pkt._deconstruct_binary(data)
+        assert new_data == ['foo', text,
+                            {'b': {'_placeholder': True, 'num': 0},
+                             'c': 'baz'}]
+        assert new_data[1] is text
+        assert data[2] == {'b': b'bar', 'c': 'baz'}
+        assert attachments == [b'bar']
+
+    def test_binary_detection_single_pass(self):
+        with mock.patch.object(packet.Packet, '_deconstruct_binary',
+                               wraps=packet.Packet()._deconstruct_binary) \
+                as deconstruct:
+            pkt = packet.Packet(data=['foo', b'bar'])
+            assert pkt.packet_type == packet.BINARY_EVENT
+            assert pkt.encode() == [
+                '51-["foo",{"_placeholder":true,"num":0}]', b'bar']
+        assert deconstruct.call_count == 1
+
+    def test_text_only_packet_skips_binary_detection(self):
+        with mock.patch.object(packet.Packet, '_deconstruct_binary') \
+                as deconstruct:
+            pkt = packet.Packet(data=['foo', {'a': 'bar'}], binary=False)
+            assert pkt.encode() == '2["foo",{"a":"bar"}]'
+        deconstruct.assert_not_called()
+
+    def test_decode_long_id(self):
+        pkt = packet.Packet(encoded_packet='2/foo,12345678901234567890["x"]')
+        assert pkt.namespace == '/foo'
+        assert pkt.id == 12345678901234567890
+        assert pkt.data == ['x']
+
+    def test_decode_dash_in_payload(self):
+        pkt = packet.Packet(encoded_packet='212["a-b",-1]')
+        assert pkt.packet_type == packet.EVENT
+        assert pkt.attachment_count == 0
+        assert pkt.id == 12
+        assert pkt.data == ['a-b', -1]
+
+    def test_decode_binary_with_namespace_and_id(self):
+        pkt = packet.Packet(
+            encoded_packet='52-/foo?a=b,7[{"_placeholder":true,"num":0},'
+                           '{"_placeholder":true,"num":1}]')
+        assert pkt.attachment_count == 2
+        assert pkt.namespace == '/foo'
+        assert pkt.id == 7
+        assert not pkt.add_attachment(b'1')
+        assert pkt.add_attachment(b'2')
+        assert pkt.data == [b'1', b'2']
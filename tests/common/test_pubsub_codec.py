@@ -0,0 +1,105 @@
+import pickle
+import unittest
+
+import six
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
+from socketio_v4 import pubsub_codec
+import pytest
+
+
+class TestPubSubCodec(unittest.TestCase):
+    def test_get_codec_by_name(self):
+        assert isinstance(pubsub_codec.get_codec('pickle'),
+                          pubsub_codec.PickleCodec)
+        assert isinstance(pubsub_codec.get_codec('json'),
+                          pubsub_codec.JSONCodec)
+
+    def test_get_codec_instance(self):
+        codec = mock.MagicMock()
+        assert pubsub_codec.get_codec(codec) == codec
+
+    def test_get_codec_unknown(self):
+        with pytest.raises(ValueError):
+            pubsub_codec.get_codec('bogus')
+
+    def test_pickle_codec(self):
+        codec = pubsub_codec.PickleCodec()
+        encoded = codec.encode({'method': 'emit', 'data': b'\x01'})
+        assert encoded[0:1] == pubsub_codec.PickleCodec.format
+        assert pickle.loads(encoded) == {'method': 'emit', 'data': b'\x01'}
+        assert pubsub_codec.decode(encoded, accept_pickle=True) == {
+            'method': 'emit', 'data': b'\x01'}
+
+    def test_pickle_refused(self):
+        encoded = pubsub_codec.PickleCodec().encode({'method': 'emit'})
+        assert pubsub_codec.decode(encoded) is None
+
+    def test_json_codec(self):
+        codec = pubsub_codec.JSONCodec()
+        encoded = codec.encode({'method': 'emit', 'data': ['foo', 1]})
+        assert encoded == b'\x01{"method":"emit","data":["foo",1]}'
+        assert codec.decode(encoded) == {'method': 'emit',
+                                         'data': ['foo', 1]}
+        assert pubsub_codec.decode(encoded) == {'method': 'emit',
+                                                'data': ['foo', 1]}
+
+    def test_msgpack_codec(self):
+        with mock.patch.object(pubsub_codec, 'msgpack') as msgpack:
+            msgpack.packb.return_value = b'packed'
+            msgpack.unpackb.return_value = {'method': 'emit'}
+            codec = pubsub_codec.MsgPackCodec()
+            encoded = codec.encode({'method': 'emit'})
+            assert encoded == b'\x02packed'
+            assert pubsub_codec.decode(encoded) == {'method': 'emit'}
+            msgpack.packb.assert_called_once_with({'method': 'emit'},
+                                                  use_bin_type=True)
+            msgpack.unpackb.assert_called_once_with(b'packed', raw=False)
+
+    def test_msgpack_not_installed(self):
+        with mock.patch.object(pubsub_codec, 'msgpack', None):
+            with pytest.raises(RuntimeError):
+                pubsub_codec.MsgPackCodec()
+
+    def test_decode_dict(self):
+        message = {'method': 'emit'}
+        assert pubsub_codec.decode(message) is message
+
+    def test_decode_legacy_json(self):
+        assert pubsub_codec.decode('{"method":"emit"}') == {'method': 'emit'}
+        assert pubsub_codec.decode(b'{"method":"emit"}') == {
+            'method': 'emit'}
+
+    def test_decode_invalid(self):
+        assert pubsub_codec.decode('bad json') is None
+        assert pubsub_codec.decode(b'bad data') is None
+        assert pubsub_codec.decode(b'\x01bad json') is None
+        assert pubsub_codec.decode(b'') is None
+
+    def test_decode_with_codec(self):
+        codec = mock.MagicMock(format=b'\x10')
+        codec.decode.return_value = {'method': 'emit'}
+        assert pubsub_codec.decode(b'\x10foo', codec=codec) == {
+            'method': 'emit'}
+        codec.decode.assert_called_once_with(b'\x10foo')
+        assert pubsub_codec.decode(b'\x01{"a":1}', codec=codec) == {'a': 1}
+        assert codec.decode.call_count == 1
+
+    def test_decode_with_codec_without_format(self):
+        codec = mock.MagicMock(spec=['encode', 'decode'])
+        codec.decode.return_value = {'method': 'emit'}
+        assert pubsub_codec.decode(b'\x01foo', codec=codec) == {
+            'method': 'emit'}
+        codec.decode.side_effect = ValueError
+        assert pubsub_codec.decode(b'\x01foo', codec=codec) is None
+
+    def test_decode_with_pickle_codec(self):
+        encoded = pubsub_codec.PickleCodec().encode({'method': 'emit'})
+        assert pubsub_codec.decode(
+            encoded, codec=pubsub_codec.PickleCodec()) == {'method': 'emit'}
+        assert pubsub_codec.decode(
+            encoded, codec=pubsub_codec.JSONCodec()) is None
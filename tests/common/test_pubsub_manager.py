@@ -1,4 +1,5 @@
 import functools
+import json
 import unittest
 import logging
 
@@ -10,13 +11,16 @@ else:
     import mock
 
 from socketio_v4 import base_manager
+from socketio_v4 import pubsub_codec
 from socketio_v4 import pubsub_manager
+from socketio_v4 import pubsub_routing
 import pytest
 
 
 class TestBaseManager(unittest.TestCase):
     def setUp(self):
         mock_server = mock.MagicMock()
+        mock_server._event_packet.return_value.encode.return_value = 'pkt'
         self.pm = pubsub_manager.PubSubManager()
         self.pm._publish = mock.MagicMock()
         self.pm.set_server(mock_server)
@@ -34,6 +38,50 @@ class TestBaseManager(unittest.TestCase):
         assert pubsub.channel == 'foo'
         assert len(pubsub.host_id) == 32
 
+    def test_default_codec(self):
+        assert isinstance(self.pm.codec, pubsub_codec.PickleCodec)
+
+    def test_custom_codec(self):
+        pubsub = pubsub_manager.PubSubManager(codec='json')
+        assert isinstance(pubsub.codec, pubsub_codec.JSONCodec)
+        encoded = pubsub._encode_message({'method': 'emit', 'event': 'foo'})
+        assert encoded == b'\x01{"method":"emit","event":"foo"}'
+        assert pubsub._decode_message(encoded) == {'method': 'emit',
+                                                   'event': 'foo'}
+
+    def test_custom_codec_refuses_pickle(self):
+        pubsub = pubsub_manager.PubSubManager(codec='json')
+        encoded = pubsub_codec.PickleCodec().encode({'method': 'emit'})
+        assert pubsub._decode_message(encoded) is None
+        assert self.pm._decode_message(encoded) == {'method': 'emit'}
+
+    def test_user_codec(self):
+        class ReversedJSONCodec(object):
+            def encode(self, message):
+                return json.dumps(message).encode('utf-8')[::-1]
+
+            def decode(self, data):
+                return json.loads(data[::-1].decode('utf-8'))
+
+        pubsub = pubsub_manager.PubSubManager(codec=ReversedJSONCodec())
+        encoded = pubsub._encode_message({'method': 'emit', 'event': 'foo'})
+        assert pubsub._decode_message(encoded) == {'method': 'emit',
+                                                   'event': 'foo'}
+
+    def test_user_codec_with_format(self):
+        class UpperJSONCodec(pubsub_codec.JSONCodec):
+            format = b'\x10'
+
+        pubsub = pubsub_manager.PubSubManager(codec=UpperJSONCodec())
+        encoded = pubsub._encode_message({'method': 'emit'})
+        assert encoded[0:1] == b'\x10'
+        assert pubsub._decode_message(encoded) == {'method': 'emit'}
+        assert pubsub._decode_message(
+            pubsub_codec.JSONCodec().encode({'method': 'foo'})) == {
+                'method': 'foo'}
+        assert pubsub._decode_message(
+            pubsub_codec.PickleCodec().encode({'method': 'emit'})) is None
+
     def test_write_only_init(self):
         mock_server = mock.MagicMock()
         pm = pubsub_manager.PubSubManager(write_only=True)
@@ -118,6 +166,85 @@ class TestBaseManager(unittest.TestCase):
             }
         )
 
+    def test_emit_forward_encoded(self):
+        self.pm.forward_encoded = True
+        self.pm.emit('foo', 'bar', namespace='/baz')
+        self.pm.server._event_packet.assert_called_once_with(
+            'foo', 'bar', '/baz')
+        self.pm._publish.assert_called_once_with(
+            {
+                'method': 'emit',
+                'event': 'foo',
+                'packet': 'pkt',
+                'namespace': '/baz',
+                'room': None,
+                'skip_sid': None,
+                'callback': None,
+                'host_id': '123456',
+            }
+        )
+
+    def test_emit_many_forward_encoded(self):
+        self.pm.forward_encoded = True
+        self.pm.emit_many([('foo', 'bar', 'baz')], skip_sid='123')
+        self.pm._publish.assert_called_once_with(
+            {
+                'method': 'emit_many',
+                'packets': [('pkt', 'baz')],
+                'namespace': '/',
+                'skip_sid': '123',
+                'host_id': '123456',
+            }
+        )
+
+    def test_messages_readable_by_older_releases(self):
+        # the handlers of releases without forwarding of encoded packets
+        # read these keys unconditionally
+        self.pm.emit('foo', 'bar', room='baz')
+        message = pubsub_codec.decode(
+            self.pm._encode_message(self.pm._publish.call_args[0][0]),
+            accept_pickle=True)
+        assert (message['event'], message['data']) == ('foo', 'bar')
+        self.pm.emit_many([('foo', 'bar', 'baz')])
+        message = pubsub_codec.decode(
+            self.pm._encode_message(self.pm._publish.call_args[0][0]),
+            accept_pickle=True)
+        assert [tuple(event) for event in message['events']] == [
+            ('foo', 'bar', 'baz')]
+
+    def test_emit_without_server(self):
+        pm = pubsub_manager.PubSubManager(write_only=True)
+        pm._publish = mock.MagicMock()
+        pm.host_id = '123456'
+        pm.emit('foo', 'bar', room='baz')
+        pm._publish.assert_called_once_with(
+            {
+                'method': 'emit',
+                'event': 'foo',
+                'data': 'bar',
+                'namespace': '/',
+                'room': 'baz',
+                'skip_sid': None,
+                'callback': None,
+                'host_id': '123456',
+            }
+        )
+
+    def test_emit_many_without_server(self):
+        pm = pubsub_manager.PubSubManager(write_only=True)
+        pm._publish = mock.MagicMock()
+        pm.host_id = '123456'
+        pm.emit_many([('foo', 'bar', 'baz')])
+        pm._publish.assert_called_once_with(
+            {
+                'method': 'emit_many',
+                'events': [('foo', 'bar', 'baz')],
+                'namespace': '/',
+                'skip_sid': None,
+                'host_id': '123456',
+            }
+        )
+
     def test_emit_with_callback(self):
         with mock.patch.object(
             self.pm, '_generate_ack_id', return_value='123'
@@ -154,8 +281,11 @@ class TestBaseManager(unittest.TestCase):
             'foo', 'bar', room='123', namespace='/', ignore_queue=True
         )
         self.pm._publish.assert_not_called()
-        self.pm.server._emit_internal.assert_called_once_with(
-            '123', 'foo', 'bar', '/', None
+        self.pm.server._event_packet.assert_called_once_with(
+            'foo', 'bar', '/'
+        )
+        self.pm.server._send_encoded_packet.assert_called_once_with(
+            '123', self.pm.server._event_packet.return_value.encode()
         )
 
     def test_can_disconnect(self):
@@ -166,6 +296,29 @@ class TestBaseManager(unittest.TestCase):
             {'method': 'disconnect', 'sid': '123', 'namespace': '/foo'}
         )
 
+    def test_emit_many(self):
+        self.pm.emit_many([('foo', 'bar', 'baz')], skip_sid='123')
+        self.pm._publish.assert_called_once_with(
+            {
+                'method': 'emit_many',
+                'events': [('foo', 'bar', 'baz')],
+                'namespace': '/',
+                'skip_sid': '123',
+                'host_id': '123456',
+            }
+        )
+
+    def test_emit_many_with_ignore_queue(self):
+        with mock.patch.object(
+            base_manager.BaseManager, 'emit_many'
+        ) as super_emit_many:
+            self.pm.emit_many([('foo', 'bar', None)], namespace='/',
+                              ignore_queue=True)
+            super_emit_many.assert_called_once_with(
+                [('foo', 'bar', None)], namespace='/', skip_sid=None
+            )
+        self.pm._publish.assert_not_called()
+
     def test_close_room(self):
         self.pm.close_room('foo')
         self.pm._publish.assert_called_once_with(
@@ -190,6 +343,16 @@ class TestBaseManager(unittest.TestCase):
                 callback=None,
             )
 
+    def test_handle_emit_encoded(self):
+        with mock.patch.object(
+            base_manager.BaseManager, 'emit_encoded'
+        ) as super_emit_encoded:
+            self.pm._handle_emit({'event': 'foo', 'packet': 'pkt',
+                                  'namespace': '/baz', 'room': 'room',
+                                  'skip_sid': 'sid', 'callback': None})
+            super_emit_encoded.assert_called_once_with(
+                'pkt', namespace='/baz', room='room', skip_sid='sid')
+
     def test_handle_emit_with_namespace(self):
         with mock.patch.object(base_manager.BaseManager, 'emit') as super_emit:
             self.pm._handle_emit(
@@ -264,6 +427,28 @@ class TestBaseManager(unittest.TestCase):
                 }
             )
 
+    def test_handle_emit_many(self):
+        with mock.patch.object(
+            base_manager.BaseManager, 'emit_many'
+        ) as super_emit_many:
+            self.pm._handle_emit_many(
+                {'events': [['foo', 'bar', None]], 'namespace': '/baz'}
+            )
+            super_emit_many.assert_called_once_with(
+                [['foo', 'bar', None]], namespace='/baz', skip_sid=None
+            )
+
+    def test_handle_emit_many_encoded(self):
+        with mock.patch.object(
+            base_manager.BaseManager, 'emit_many_encoded'
+        ) as super_emit_many_encoded:
+            self.pm._handle_emit_many(
+                {'packets': [['pkt', None]], 'namespace': '/baz'}
+            )
+            super_emit_many_encoded.assert_called_once_with(
+                [['pkt', None]], namespace='/baz', skip_sid=None
+            )
+
     def test_handle_callback(self):
         host_id = self.pm.host_id
         with mock.patch.object(self.pm, 'trigger_callback') as trigger:
@@ -279,6 +464,28 @@ class TestBaseManager(unittest.TestCase):
             )
             trigger.assert_called_once_with('sid', '/', 123, ('one', 2))
 
+    def test_handle_late_callback_for_room(self):
+        cb1 = mock.MagicMock()
+        cb2 = mock.MagicMock()
+
+        def ack(callback, args):
+            self.pm._handle_callback(
+                {'method': 'callback', 'host_id': '123456',
+                 'sid': callback[0], 'namespace': callback[1],
+                 'id': callback[2], 'args': args})
+
+        self.pm.emit('foo', 'bar', room='room', callback=cb1)
+        first = self.pm._publish.call_args[0][0]['callback']
+        ack(first, ('one',))
+        self.pm.emit('foo', 'bar', room='room', callback=cb2)
+        second = self.pm._publish.call_args[0][0]['callback']
+        assert first[2] != second[2]
+        # a second recipient of the first emit acks after the first one
+        ack(first, ('three',))
+        ack(second, ('two',))
+        cb1.assert_called_once_with('one')
+        cb2.assert_called_once_with('two')
+
     def test_handle_callback_bad_host_id(self):
         with mock.patch.object(self.pm, 'trigger_callback') as trigger:
             self.pm._handle_callback(
@@ -385,3 +592,376 @@ class TestBaseManager(unittest.TestCase):
         self.pm._handle_close_room.assert_called_once_with(
             {'method': 'close_room', 'value': 'baz'}
         )
+        self.pm.server.log.pubsub.assert_any_call('pubsub message: %s',
+                                                  'emit')
+
+    def test_background_thread_logging_disabled(self):
+        self.pm.server.log.pubsub = None
+        self.pm.initialize()
+        self.pm._handle_emit = mock.MagicMock()
+        self.pm._listen = mock.MagicMock(
+            return_value=[{'method': 'emit', 'value': 'foo'}])
+        self.pm._thread()
+        self.pm._handle_emit.assert_called_once_with(
+            {'method': 'emit', 'value': 'foo'})
+
+    def test_shards_not_supported(self):
+        with pytest.raises(ValueError):
+            pubsub_manager.PubSubManager(shards=4)
+
+    def _routing_manager(self):
+        class RoutingManager(pubsub_manager.PubSubManager):
+            supports_routing = True
+
+        pm = RoutingManager(shards=4)
+        pm._publish = mock.MagicMock()
+        pm._subscribe = mock.MagicMock()
+        pm._unsubscribe = mock.MagicMock()
+        pm.set_server(mock.MagicMock())
+        pm.host_id = '123456'
+        return pm
+
+    def test_room_channel(self):
+        pm = self._routing_manager()
+        channel = pm._get_room_channel('/', 'foo')
+        assert channel.startswith('socketio_v4#')
+        assert 0 <= int(channel.split('#')[1]) < 4
+        assert pm._get_room_channel('/', 'foo') == channel
+        assert pm._get_room_channel('/', None) is None
+        assert self.pm._get_room_channel('/', 'foo') is None
+
+    def test_routing_subscriptions(self):
+        pm = self._routing_manager()
+        channel = pm._get_room_channel('/', 'foo')
+        pm.enter_room('123', '/', 'foo')
+        pm._subscribe.assert_called_once_with(channel)
+        pm.enter_room('456', '/', 'foo')
+        assert pm._subscribe.call_count == 1
+        pm.leave_room('123', '/', 'foo')
+        pm._unsubscribe.assert_not_called()
+        pm.leave_room('456', '/', 'foo')
+        pm._unsubscribe.assert_called_once_with(channel)
+        assert pm.room_channels == {}
+
+    def test_routing_subscriptions_on_disconnect(self):
+        pm = self._routing_manager()
+        pm.connect('123', '/')
+        pm.enter_room('123', '/', 'foo')
+        channels = set(pm.room_channels)
+        assert channels == {pm._get_room_channel('/', '123'),
+                            pm._get_room_channel('/', 'foo')}
+        pm.disconnect('123', '/')
+        assert pm.room_channels == {}
+        assert {c[0][0] for c in pm._unsubscribe.call_args_list} == channels
+
+    def test_routing_write_only(self):
+        class RoutingManager(pubsub_manager.PubSubManager):
+            supports_routing = True
+
+        pm = RoutingManager(shards=4, write_only=True)
+        pm._subscribe = mock.MagicMock()
+        pm.enter_room('123', '/', 'foo')
+        pm._subscribe.assert_not_called()
+
+    def test_routing_emit(self):
+        pm = self._routing_manager()
+        pm.emit('foo', 'bar', room='baz')
+        pm._publish.assert_called_once_with(
+            mock.ANY, channel=pm._get_room_channel('/', 'baz'))
+        pm._publish.reset_mock()
+        pm.emit('foo', 'bar')
+        pm._publish.assert_called_once_with(mock.ANY)
+
+    def test_routing_disconnect_and_close_room(self):
+        pm = self._routing_manager()
+        pm.can_disconnect('123', '/foo')
+        pm._publish.assert_called_once_with(
+            {'method': 'disconnect', 'sid': '123', 'namespace': '/foo'},
+            channel=pm._get_room_channel('/foo', '123'))
+        pm._publish.reset_mock()
+        pm.close_room('baz')
+        pm._publish.assert_called_once_with(
+            {'method': 'close_room', 'room': 'baz', 'namespace': '/'},
+            channel=pm._get_room_channel('/', 'baz'))
+
+    def test_routing_emit_many(self):
+        pm = self._routing_manager()
+        pm.forward_encoded = True
+        pm.server._event_packet.side_effect = \
+            lambda event, data, namespace: mock.MagicMock(
+                encode=mock.MagicMock(return_value=event))
+        rooms = ['room{}'.format(i) for i in range(10)]
+        pm.emit_many([('a', 1, None)] + [(room, 2, room) for room in rooms])
+        channels = {}
+        for room in rooms:
+            channel = pm._get_room_channel('/', room)
+            channels.setdefault(channel, []).append((room, room))
+        assert pm._publish.call_count == len(channels) + 1
+        pm._publish.assert_any_call(
+            {'method': 'emit_many', 'namespace': '/', 'skip_sid': None,
+             'host_id': '123456', 'packets': [('a', None)]})
+        for channel, packets in channels.items():
+            pm._publish.assert_any_call(
+                {'method': 'emit_many', 'namespace': '/', 'skip_sid': None,
+                 'host_id': '123456', 'packets': packets}, channel=channel)
+
+    def _unicast_manager(self, **kwargs):
+        class RoutingManager(pubsub_manager.PubSubManager):
+            supports_routing = True
+
+        pm = RoutingManager(unicast=True, **kwargs)
+        pm._publish = mock.MagicMock()
+        pm._subscribe = mock.MagicMock()
+        pm._unsubscribe = mock.MagicMock()
+        pm.set_server(mock.MagicMock())
+        pm.host_id = '123456'
+        return pm
+
+    def test_unicast_not_supported(self):
+        with pytest.raises(ValueError):
+            pubsub_manager.PubSubManager(unicast=True)
+
+    def test_unicast_subscriptions(self):
+        pm = self._unicast_manager()
+        assert pm._get_subscriptions() == ['socketio_v4',
+                                           'socketio_v4@123456']
+        assert self.pm._get_subscriptions() == ['socketio_v4']
+
+    def test_unicast_announcements(self):
+        pm = self._unicast_manager()
+        pm.connect('123', '/')
+        pm.connect('123', '/foo')
+        pm._publish.assert_called_once_with(
+            {'method': 'connected', 'sid': '123', 'host_id': '123456'})
+        pm._publish.reset_mock()
+        pm.disconnect('123', '/foo')
+        pm._publish.assert_not_called()
+        pm.disconnect('123', '/')
+        pm._publish.assert_called_once_with(
+            {'method': 'disconnected', 'sid': '123', 'host_id': '123456'})
+
+    def test_unicast_announcements_disabled(self):
+        self.pm.connect('123', '/')
+        self.pm.disconnect('123', '/')
+        self.pm._publish.assert_not_called()
+
+    def test_handle_connected_and_disconnected(self):
+        pm = self._unicast_manager()
+        pm._handle_connected({'method': 'connected', 'sid': '123',
+                              'host_id': 'abc'})
+        pm._handle_connected({'method': 'connected', 'sid': '456',
+                              'host_id': '123456'})
+        assert pm.sid_hosts == {'123': 'abc'}
+        pm._handle_disconnected({'method': 'disconnected', 'sid': '123',
+                                 'host_id': 'def'})
+        assert pm.sid_hosts == {'123': 'abc'}
+        pm._handle_disconnected({'method': 'disconnected', 'sid': '123',
+                                 'host_id': 'abc'})
+        assert pm.sid_hosts == {}
+
+    def test_unicast_emit(self):
+        pm = self._unicast_manager()
+        pm.sid_hosts['123'] = 'abc'
+        pm.connect('456', '/')
+        pm._publish.reset_mock()
+        pm.emit('foo', 'bar', room='123')
+        pm._publish.assert_called_once_with(mock.ANY,
+                                            channel='socketio_v4@abc')
+        pm._publish.reset_mock()
+        pm.emit('foo', 'bar', room='456')
+        pm._publish.assert_called_once_with(mock.ANY,
+                                            channel='socketio_v4@123456')
+        pm._publish.reset_mock()
+        pm.emit('foo', 'bar', room='789')
+        pm._publish.assert_called_once_with(mock.ANY)
+
+    def test_unicast_disconnect(self):
+        pm = self._unicast_manager()
+        pm.sid_hosts['123'] = 'abc'
+        pm.can_disconnect('123', '/')
+        pm._publish.assert_called_once_with(
+            {'method': 'disconnect', 'sid': '123', 'namespace': '/'},
+            channel='socketio_v4@abc')
+
+    def test_unicast_with_shards(self):
+        pm = self._unicast_manager(shards=4)
+        pm.connect('123', '/')
+        pm._subscribe.assert_called_once_with(
+            pm._get_room_channel('/', '123'))
+        pm.enter_room('123', '/', 'foo')
+        assert set(pm.room_channels) == {pm._get_room_channel('/', '123'),
+                                         pm._get_room_channel('/', 'foo')}
+        pm._publish.reset_mock()
+        pm.emit('foo', 'bar', room='123')
+        pm._publish.assert_called_once_with(mock.ANY,
+                                            channel='socketio_v4@123456')
+        pm.disconnect('123', '/')
+        assert pm.room_channels == {}
+
+    def test_unicast_write_only_emit(self):
+        pm = self._unicast_manager(shards=4, write_only=True)
+        pm.emit('foo', 'bar', room='123')
+        pm._publish.assert_called_once_with(
+            mock.ANY, channel=pm._get_room_channel('/', '123'))
+
+    def test_unicast_with_shards_before_directory(self):
+        # the other server emits to a client it has not seen announced yet
+        published = []
+        managers = []
+        for host_id in ['aaa', 'bbb']:
+            pm = self._unicast_manager(shards=4)
+            pm.host_id = host_id
+            pm._publish = mock.MagicMock(
+                side_effect=lambda data, channel=None: published.append(
+                    (data, channel)))
+            managers.append(pm)
+        a, b = managers
+        a.connect('sidx', '/')
+        assert published == [({'method': 'connected', 'sid': 'sidx',
+                               'host_id': 'aaa'}, None)]
+        del published[:]
+        b.emit('foo', 'bar', room='sidx')
+        b.can_disconnect('sidx', '/')
+        b.close_room('sidx')
+        assert len(published) == 3
+        for message, channel in published:
+            assert channel == b._get_room_channel('/', 'sidx')
+            assert channel in a._get_subscriptions()
+            a._listen = mock.MagicMock(return_value=[message])
+            a._thread()
+        a.server._send_encoded_packet.assert_called_once_with(
+            'sidx', a.server._event_packet.return_value.encode.return_value)
+        a.server.disconnect.assert_called_once_with(
+            sid='sidx', namespace='/', ignore_queue=True)
+        assert 'sidx' not in a.rooms['/']
+
+    def test_heartbeat_started(self):
+        pm = self._unicast_manager()
+        pm.initialize()
+        pm.server.start_background_task.assert_any_call(
+            pm._heartbeat_thread)
+        assert pm._get_heartbeat_interval() == 20
+        pm = self._unicast_manager(host_timeout=0)
+        pm.initialize()
+        pm.server.start_background_task.assert_called_once_with(pm._thread)
+        pm = self._unicast_manager(write_only=True)
+        pm.initialize()
+        pm.server.start_background_task.assert_not_called()
+
+    def test_heartbeat_thread(self):
+        pm = self._unicast_manager()
+        pm._expire_hosts = mock.MagicMock()
+        pm.server.sleep.side_effect = [None, None, RuntimeError()]
+        with pytest.raises(RuntimeError):
+            pm._heartbeat_thread()
+        assert pm.server.sleep.call_args_list == [mock.call(20)] * 3
+        assert pm._publish.call_args_list == [
+            mock.call({'method': 'alive', 'host_id': '123456'})] * 2
+        assert pm._expire_hosts.call_count == 2
+
+    def test_directory_expires(self):
+        pm = self._unicast_manager(shards=4)
+        with mock.patch.object(pubsub_routing.time, 'time',
+                               return_value=100):
+            pm._handle_connected({'method': 'connected',
+                                  'sids': ['123', '456'], 'host_id': 'abc'})
+            pm._handle_connected({'method': 'connected', 'sid': '789',
+                                  'host_id': 'def'})
+        with mock.patch.object(pubsub_routing.time, 'time',
+                               return_value=150):
+            pm._handle_alive({'method': 'alive', 'host_id': 'def'})
+            pm._handle_alive({'method': 'alive', 'host_id': 'ghi'})
+        assert pm.hosts_seen == {'abc': 100, 'def': 150}
+        with mock.patch.object(pubsub_routing.time, 'time',
+                               return_value=170):
+            pm._expire_hosts()
+        assert pm.sid_hosts == {'789': 'def'}
+        assert pm.host_sids == {'def': {'789'}}
+        assert pm.hosts_seen == {'def': 150}
+        # messages for the clients of the dead server use the room shard
+        assert pm._get_target_channel('/', '123') == \
+            pm._get_room_channel('/', '123')
+        assert pm._get_target_channel('/', '789') == 'socketio_v4@def'
+
+    def test_directory_host_bookkeeping(self):
+        pm = self._unicast_manager()
+        pm._handle_connected({'method': 'connected', 'sids': ['123', '456'],
+                              'host_id': 'abc'})
+        pm._handle_connected({'method': 'connected', 'sid': '456',
+                              'host_id': 'def'})
+        assert pm.host_sids == {'abc': {'123'}, 'def': {'456'}}
+        pm._handle_disconnected({'method': 'disconnected', 'sid': '123',
+                                 'host_id': 'abc'})
+        pm._handle_disconnected({'method': 'disconnected', 'sid': '456',
+                                 'host_id': 'abc'})
+        assert pm.sid_hosts == {'456': 'def'}
+        assert pm.host_sids == {'def': {'456'}}
+        assert list(pm.hosts_seen) == ['def']
+
+    def test_background_thread_alive(self):
+        pm = self._unicast_manager()
+        pm._handle_connected({'method': 'connected', 'sid': '123',
+                              'host_id': 'abc'})
+        pm.hosts_seen['abc'] = 0
+        pm._listen = mock.MagicMock(
+            return_value=[{'method': 'alive', 'host_id': 'abc'}])
+        pm._thread()
+        assert pm.hosts_seen['abc'] > 0
+
+    def test_handle_connected_many(self):
+        pm = self._unicast_manager()
+        pm._handle_connected({'method': 'connected', 'sids': ['123', '456'],
+                              'host_id': 'abc'})
+        assert pm.sid_hosts == {'123': 'abc', '456': 'abc'}
+
+    def test_request_directory(self):
+        pm = self._unicast_manager()
+        pm._request_directory()
+        pm._publish.assert_called_once_with(
+            {'method': 'directory', 'host_id': '123456'})
+
+    def test_handle_directory(self):
+        pm = self._unicast_manager()
+        pm._handle_directory({'method': 'directory', 'host_id': 'abc'})
+        pm._publish.assert_not_called()
+        pm.connect('123', '/')
+        pm.connect('456', '/foo')
+        pm._publish.reset_mock()
+        pm._handle_directory({'method': 'directory', 'host_id': '123456'})
+        pm._publish.assert_not_called()
+        pm._handle_directory({'method': 'directory', 'host_id': 'abc'})
+        pm._publish.assert_called_once_with(
+            {'method': 'connected', 'sids': mock.ANY, 'host_id': '123456'},
+            channel='socketio_v4@abc')
+        assert sorted(pm._publish.call_args[0][0]['sids']) == ['123', '456']
+
+    def test_handle_directory_without_unicast(self):
+        self.pm.connect('123', '/')
+        self.pm._handle_directory({'method': 'directory', 'host_id': 'abc'})
+        self.pm._publish.assert_not_called()
+
+    def test_unicast_return_callback(self):
+        pm = self._unicast_manager()
+        pm._return_callback('abc', '123', '/', 1, 'foo')
+        pm._publish.assert_called_once_with(
+            {'method': 'callback', 'host_id': 'abc', 'sid': '123',
+             'namespace': '/', 'id': 1, 'args': ('foo',)},
+            channel='socketio_v4@abc')
+
+    def test_background_thread_directory(self):
+        pm = self._unicast_manager()
+
+        def messages():
+            yield {'method': 'connected', 'sid': '123', 'host_id': 'abc'}
+            yield {'method': 'connected', 'sid': '456', 'host_id': 'abc'}
+            yield {'method': 'disconnected', 'sid': '123', 'host_id': 'abc'}
+            yield {'method': 'directory', 'host_id': 'def'}
+
+        pm.connect('789', '/')
+        pm._publish.reset_mock()
+        pm._listen = mock.MagicMock(side_effect=messages)
+        pm._thread()
+        assert pm.sid_hosts == {'456': 'abc'}
+        pm._publish.assert_called_once_with(
+            {'method': 'connected', 'sids': ['789'], 'host_id': '123456'},
+            channel='socketio_v4@def')
@@ -0,0 +1,133 @@
+import unittest
+
+import six
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
+from socketio_v4 import redis_manager
+
+
+class TestRedisManager(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(redis_manager, 'redis')
+        self.redis = patcher.start()
+        self.redis.exceptions.ConnectionError = ConnectionError
+        self.addCleanup(patcher.stop)
+
+    def test_synchronous_publish(self):
+        rm = redis_manager.RedisManager('redis://', write_only=True)
+        rm._publish({'method': 'emit'})
+        rm.redis.publish.assert_called_once_with(
+            'socketio_v4', rm._encode_message({'method': 'emit'}))
+        assert rm.publish_queue is None
+
+    def test_publish_reconnect_keeps_pubsub(self):
+        self.redis.Redis.from_url.side_effect = \
+            lambda *args, **kwargs: mock.MagicMock()
+        rm = redis_manager.RedisManager('redis://', shards=4)
+        failed = rm.redis
+        failed.publish.side_effect = ConnectionError()
+        pubsub = rm.pubsub
+        rm._publish({'method': 'emit'})
+        assert rm.redis is not failed
+        rm.redis.publish.assert_called_once_with(
+            'socketio_v4', rm._encode_message({'method': 'emit'}))
+        assert rm.pubsub is pubsub
+        rm._subscribe('socketio_v4#1')
+        pubsub.subscribe.assert_called_once_with('socketio_v4#1')
+
+    def test_queued_publish(self):
+        rm = redis_manager.RedisManager('redis://', write_only=True,
+                                        publish_queue_size=10)
+        rm._start_publisher = mock.MagicMock(
+            side_effect=lambda: setattr(rm, 'publish_queue',
+                                        six.moves.queue.Queue(10)))
+        rm._publish({'method': 'emit'})
+        rm._publish({'method': 'emit'}, channel='foo')
+        rm._start_publisher.assert_called_once_with()
+        rm.redis.publish.assert_not_called()
+        assert rm.get_publisher_stats() == {
+            'queued': 2, 'published': 0, 'batches': 0, 'dropped': 0}
+        assert rm.unpublished == 2
+
+    def test_queue_full(self):
+        rm = redis_manager.RedisManager('redis://', write_only=True,
+                                        publish_queue_size=1)
+        rm.publish_queue = six.moves.queue.Queue(1)
+        rm._publish({'method': 'emit'})
+        rm._publish({'method': 'emit'})
+        assert rm.get_publisher_stats() == {
+            'queued': 1, 'published': 0, 'batches': 0, 'dropped': 1}
+
+    def test_publish_batch(self):
+        rm = redis_manager.RedisManager('redis://', write_only=True)
+        rm._publish_batch([('foo', b'1'), ('bar', b'2')])
+        rm.redis.pipeline.assert_called_once_with(transaction=False)
+        pipeline = rm.redis.pipeline.return_value
+        assert pipeline.publish.call_args_list == [
+            mock.call('foo', b'1'), mock.call('bar', b'2')]
+        pipeline.execute.assert_called_once_with()
+        assert rm.publisher_stats == {'published': 2, 'batches': 1,
+                                      'dropped': 0}
+
+    def test_publish_batch_failure(self):
+        rm = redis_manager.RedisManager('redis://', write_only=True)
+        rm.redis.pipeline.return_value.execute.side_effect = \
+            ConnectionError()
+        rm._publish_batch([('foo', b'1')])
+        assert rm.redis.pipeline.return_value.execute.call_count == 2
+        assert rm.publisher_stats == {'published': 0, 'batches': 0,
+                                      'dropped': 1}
+
+    def test_publisher_thread_batches(self):
+        rm = redis_manager.RedisManager('redis://', write_only=True,
+                                        publish_queue_size=10,
+                                        publish_batch_size=2)
+        rm.publish_queue = six.moves.queue.Queue(10)
+        rm.queue_empty = six.moves.queue.Empty
+        for i in range(3):
+            rm._enqueue('foo', i)
+        batches = []
+
+        def publish_batch(batch):
+            batches.append(batch)
+            if len(batches) == 2:
+                raise StopIteration
+
+        rm._publish_batch = publish_batch
+        try:
+            rm._publisher_thread()
+        except StopIteration:
+            pass
+        assert batches == [[('foo', 0), ('foo', 1)], [('foo', 2)]]
+        assert rm.unpublished == 1
+
+    def test_standalone_publisher(self):
+        rm = redis_manager.RedisManager('redis://', write_only=True,
+                                        publish_queue_size=10)
+        rm._publish({'method': 'emit'})
+        rm.flush()
+        assert rm.get_publisher_stats() == {
+            'queued': 0, 'published': 1, 'batches': 1, 'dropped': 0}
+        assert rm.publisher.daemon
+
+    def test_listen_requests_directory(self):
+        rm = redis_manager.RedisManager('redis://', unicast=True)
+        rm.host_id = 'abc'
+        rm._publish = mock.MagicMock()
+        rm.pubsub.listen.return_value = [
+            {'type': 'subscribe', 'channel': b'socketio_v4', 'data': 1},
+            {'type': 'subscribe', 'channel': b'socketio_v4@abc', 'data': 2},
+            {'type': 'message', 'channel': b'socketio_v4', 'data': b'foo'},
+            {'type': 'message', 'channel': b'other', 'data': b'bar'},
+            {'type': 'message', 'channel': b'socketio_v4@abc',
+             'data': b'baz'},
+        ]
+        listener = rm._listen()
+        assert next(listener) == b'foo'
+        rm._publish.assert_called_once_with(
+            {'method': 'directory', 'host_id': 'abc'})
+        assert next(listener) == b'baz'
@@ -0,0 +1,56 @@
+import json
+import unittest
+
+import six
+
+if six.PY3:
+    from unittest import mock
+else:
+    import mock
+
+from socketio_v4 import packet
+from socketio_v4 import serializer
+import pytest
+
+
+class TestSerializer(unittest.TestCase):
+    def tearDown(self):
+        # restore the default serializer, in case a test changed it
+        packet.Packet.serializer = None
+
+    def test_json_serializer(self):
+        s = serializer.JSONSerializer()
+        assert s.json == json
+        assert s.dumps({'foo': [1, 'bar']}) == '{"foo":[1,"bar"]}'
+        assert s.loads('{"foo":[1,"bar"]}') == {'foo': [1, 'bar']}
+
+    def test_json_serializer_custom_module(self):
+        custom = mock.MagicMock()
+        s = serializer.JSONSerializer(custom)
+        s.dumps({'foo': 'bar'})
+        custom.dumps.assert_called_once_with({'foo': 'bar'},
+                                             separators=(',', ':'))
+        s.loads('{}')
+        custom.loads.assert_called_once_with('{}')
+
+    def test_orjson_serializer(self):
+        with mock.patch.object(serializer, 'orjson') as orjson:
+            s = serializer.OrjsonSerializer()
+        assert s.dumps == orjson.dumps
+        assert s.loads == orjson.loads
+
+    def test_orjson_not_installed(self):
+        with mock.patch.object(serializer, 'orjson', None):
+            with pytest.raises(RuntimeError):
+                serializer.OrjsonSerializer()
+
+    def test_packet_with_bytes_serializer(self):
+        s = mock.MagicMock()
+        s.dumps.return_value = b'["foo","\xc3\xa9"]'
+        s.loads.return_value = ['foo', u'\xe9']
+        packet.Packet.serializer = s
+        pkt = packet.Packet(data=['foo', u'\xe9'], namespace='/bar', id=1)
+        assert pkt.encode() == u'2/bar,1["foo","\xe9"]'
+        pkt = packet.Packet(encoded_packet=u'2/bar,1["foo","\xe9"]')
+        s.loads.assert_called_once_with(u'["foo","\xe9"]')
+        assert pkt.data == ['foo', u'\xe9']
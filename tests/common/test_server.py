@@ -21,6 +21,7 @@ class TestServer(unittest.TestCase):
     def tearDown(self):
         # restore JSON encoder, in case a test changed it
         packet.Packet.json = json
+        packet.Packet.serializer = None
 
     def test_create(self, eio):
         mgr = mock.MagicMock()
@@ -35,6 +36,11 @@ class TestServer(unittest.TestCase):
         assert s.binary
         assert s.async_handlers
 
+    def test_create_with_callback_timeout(self, eio):
+        s = server.Server(callback_timeout=30)
+        assert s.manager.callback_timeout == 30
+        eio.assert_called_once_with(**{'async_handlers': False})
+
     def test_on_event(self, eio):
         s = server.Server()
 
@@ -146,6 +152,19 @@ class TestServer(unittest.TestCase):
             callback='cb',
         )
 
+    def test_emit_many(self, eio):
+        mgr = mock.MagicMock()
+        s = server.Server(client_manager=mgr)
+        events = [('my event', {'foo': 'bar'}, 'room'), ('other', 1, None)]
+        s.emit_many(events, skip_sid='123', namespace='/foo')
+        s.manager.emit_many.assert_called_once_with(
+            events, '/foo', skip_sid='123'
+        )
+        s.emit_many(events, ignore_queue=True)
+        s.manager.emit_many.assert_called_with(
+            events, '/', skip_sid=None, ignore_queue=True
+        )
+
     def test_send(self, eio):
         mgr = mock.MagicMock()
         s = server.Server(client_manager=mgr)
@@ -305,11 +324,56 @@ class TestServer(unittest.TestCase):
             '123', '2["my event","my data"]', binary=False
         )
 
+    def test_emit_internal_text_only(self, eio):
+        s = server.Server(text_only=True)
+        with mock.patch.object(packet.Packet, '_deconstruct_binary') \
+                as deconstruct:
+            s._emit_internal('123', 'my event', 'my data')
+        deconstruct.assert_not_called()
+        s.eio.send.assert_called_once_with(
+            '123', '2["my event","my data"]', binary=False
+        )
+
     def test_emit_internal_binary(self, eio):
         s = server.Server(binary=True)
         s._emit_internal('123', u'my event', b'my binary data')
         assert s.eio.send.call_count == 2
 
+    def test_emit_broadcast_encodes_once(self, eio):
+        s = server.Server()
+        s.manager.connect('123', '/')
+        s.manager.connect('456', '/')
+        with mock.patch.object(packet.Packet, 'encode',
+                               return_value='2["my event","my data"]') as enc:
+            s.emit('my event', 'my data')
+        assert enc.call_count == 1
+        assert s.eio.send.call_count == 2
+        s.eio.send.assert_any_call('123', '2["my event","my data"]',
+                                   binary=False)
+        s.eio.send.assert_any_call('456', '2["my event","my data"]',
+                                   binary=False)
+
+    def test_emit_many_groups_by_recipient(self, eio):
+        s = server.Server()
+        s.manager.connect('123', '/')
+        s.manager.connect('456', '/')
+        s.manager.enter_room('123', '/', 'room')
+        s.emit_many([('a', 1, None), ('b', 2, 'room'), ('c', 3, '456')])
+        assert s.eio.send.call_args_list == [
+            mock.call('123', '2["a",1]', binary=False),
+            mock.call('123', '2["b",2]', binary=False),
+            mock.call('456', '2["a",1]', binary=False),
+            mock.call('456', '2["c",3]', binary=False),
+        ]
+
+    def test_send_encoded_packet_binary(self, eio):
+        s = server.Server()
+        s._send_encoded_packet('123', ['51-["my event",{}]', b'foo'])
+        assert s.eio.send.call_args_list == [
+            mock.call('123', '51-["my event",{}]', binary=False),
+            mock.call('123', b'foo', binary=True),
+        ]
+
     def test_transport(self, eio):
         s = server.Server()
         s.eio.transport = mock.MagicMock(return_value='polling')
@@ -501,6 +565,34 @@ class TestServer(unittest.TestCase):
         s = server.Server(client_manager=mgr)
         s._handle_eio_disconnect('123')
 
+    def test_handle_event_with_dispatcher(self, eio):
+        s = server.Server(handler_workers=4, handler_queue_size=10,
+                          handler_overflow='disconnect',
+                          handler_ordering='namespace')
+        assert s.dispatcher.workers == 4
+        assert s.dispatcher.ordering == 'namespace'
+        assert s.dispatcher.queue_size == 10
+        assert s.dispatcher.overflow == 'disconnect'
+        s.dispatcher.dispatch = mock.MagicMock()
+        s.manager.connect('123', '/')
+        s._handle_eio_message('123', '2["my message","a"]')
+        s.dispatcher.dispatch.assert_called_once_with(
+            '123', '/', s._handle_event_internal, s, '123',
+            ['my message', 'a'], '/', None)
+
+    def test_disconnect_discards_events(self, eio):
+        s = server.Server(handler_workers=4)
+        s.dispatcher.discard = mock.MagicMock()
+        s.manager.connect('123', '/')
+        s.manager.connect('123', '/foo')
+        s._handle_eio_disconnect('123')
+        s.dispatcher.discard.assert_any_call('123', '/foo')
+        s.dispatcher.discard.assert_any_call('123', '/')
+
+    def test_dispatcher_requires_async_handlers(self, eio):
+        s = server.Server(async_handlers=False, handler_workers=4)
+        assert s.dispatcher is None
+
     def test_handle_event(self, eio):
         s = server.Server(async_handlers=False)
         s.manager.connect('123', '/')
@@ -731,6 +823,42 @@ class TestServer(unittest.TestCase):
         s.disconnect('123', '/foo')
         assert result['result'] == ('disconnect', '123')
 
+    def test_event_table(self, eio):
+        class MyNamespace(namespace.Namespace):
+            def on_foo(self, sid):
+                return 'ns foo'
+
+            def on_bar(self, sid):
+                return 'ns bar'
+
+        s = server.Server(async_handlers=False)
+        ns = MyNamespace('/foo')
+
+        @s.on('bar', namespace='/foo')
+        def bar(sid):
+            return 'bar'
+
+        s.register_namespace(ns)
+        assert s._event_table[('/foo', 'foo')] == (ns.on_foo, False)
+        assert s._event_table[('/foo', 'bar')] == (bar, False)
+        assert s._trigger_event('foo', '/foo', '123') == 'ns foo'
+        assert s._trigger_event('bar', '/foo', '123') == 'bar'
+        assert s._trigger_event('baz', '/foo', '123') is None
+        assert s._trigger_event('foo', '/', '123') is None
+
+    def test_namespace_handler_with_trigger_event(self, eio):
+        class MyNamespace(namespace.Namespace):
+            def trigger_event(self, event, *args):
+                return 'catch all ' + event
+
+            def on_foo(self, sid):
+                return 'foo'
+
+        s = server.Server(async_handlers=False)
+        s.register_namespace(MyNamespace('/foo'))
+        assert ('/foo', 'foo') not in s._event_table
+        assert s._trigger_event('foo', '/foo', '123') == 'catch all foo'
+
     def test_bad_namespace_handler(self, eio):
         class Dummy(object):
             pass
@@ -764,6 +892,19 @@ class TestServer(unittest.TestCase):
         s = server.Server(logger='foo')
         assert s.logger == 'foo'
 
+    def test_log_categories(self, eio):
+        logger = mock.MagicMock()
+        s = server.Server(logger=logger, log_categories=['rooms'],
+                          log_sample_rates={'rooms': 0.5})
+        s.emit('my event', {'foo': 'bar'})
+        logger.info.assert_not_called()
+        s.enter_room('123', 'room')
+        s.enter_room('123', 'room')
+        s.leave_room('123', 'room')
+        assert logger.info.call_args_list == [
+            mock.call('%s is entering room %s [%s]', '123', 'room', '/'),
+            mock.call('%s is leaving room %s [%s]', '123', 'room', '/')]
+
     def test_engineio_v3_logger(self, eio):
         server.Server(engineio_v3_logger='foo')
         eio.assert_called_once_with(
@@ -799,6 +940,14 @@ class TestServer(unittest.TestCase):
         # restore the default JSON module
         packet.Packet.json = json
 
+    def test_custom_serializer(self, eio):
+        custom = mock.MagicMock()
+        custom.dumps.return_value = '"*** encoded ***"'
+        server.Server(serializer=custom)
+        pkt = packet.Packet(packet_type=packet.EVENT, data=['foo'])
+        assert pkt.encode() == '2"*** encoded ***"'
+        custom.dumps.assert_called_once_with(['foo'])
+
     def test_async_handlers(self, eio):
         s = server.Server(async_handlers=True)
         s.manager.connect('123', '/')